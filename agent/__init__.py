@@ -1,5 +1,36 @@
-"""Agent module for the Research Assistant."""
+"""Agent module for the Research Assistant.
 
-from .agent import create_research_agent
+The exports are imported on first access (PEP 562), so that importing a
+submodule or checking the configuration does not load LangChain.
+"""
 
-__all__ = ["create_research_agent"] 
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "create_research_agent": ".agent",
+    "MetricsCallbackHandler": ".metrics",
+    "MetricsRegistry": ".metrics",
+    "get_metrics": ".metrics",
+    "ParallelAgentExecutor": ".parallel",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .agent import create_research_agent
+    from .metrics import MetricsCallbackHandler, MetricsRegistry, get_metrics
+    from .parallel import ParallelAgentExecutor
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
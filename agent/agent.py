@@ -1,12 +1,21 @@
 """Research Assistant Agent implementation."""
 
+from os import getenv
 from typing import List, Optional
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+from langchain.agents import AgentExecutor, create_react_agent, create_tool_calling_agent
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.language_models import BaseChatModel
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 
-from tools import WikipediaTool, CalculatorTool, WeatherTool
+from tools.compaction import ObservationCompactor
+from .answer_cache import AnswerCache, get_answer_cache
+from .fast_path import FastPathAgentExecutor, FastPathParallelAgentExecutor
+from .memory import TokenBudgetMemory
+from .metrics import MetricsCallbackHandler, MetricsRegistry, register_cache, register_rate_limits, register_tool_caches
+from .resources import ResourceRegistry, build_tools, get_resources
+from .router import FastPathRouter, get_router
+
+AGENT_TYPES = ("react", "tool_calling")
 
 
 def get_prompt_template() -> str:
@@ -36,11 +45,27 @@ Question: {input}
 {agent_scratchpad}"""
 
 
+def get_tool_calling_system_prompt() -> str:
+    """Get the system prompt for the tool-calling research assistant agent."""
+    return """You are an advanced Research Assistant Agent that can answer complex questions by using external tools.
+
+When a question needs several pieces of information that do not depend on each other
+(for example a fact from Wikipedia and the current weather), request all of those tool
+calls at once in the same response instead of one at a time. Only wait for a result
+when the next call needs it. When you have everything you need, answer the question directly."""
+
+
 def create_research_agent(
     model_name: str = "gpt-4o",
     temperature: float = 0,
     verbose: bool = False,
-    memory: Optional[ConversationBufferMemory] = None
+    memory: Optional[BaseChatMemory] = None,
+    agent_type: Optional[str] = None,
+    llm: Optional[BaseChatModel] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    resources: Optional[ResourceRegistry] = None,
+    answer_cache: Optional[AnswerCache] = None,
+    router: Optional[FastPathRouter] = None,
 ) -> AgentExecutor:
     """Create a research assistant agent with the specified tools and model.
     
@@ -48,49 +73,109 @@ def create_research_agent(
         model_name: The name of the OpenAI model to use
         temperature: The temperature parameter for the model
         verbose: Whether to enable verbose output
-        memory: Optional conversation memory to use
-        
+        memory: Optional conversation memory to use (default: a
+            ``TokenBudgetMemory`` of MEMORY_TOKEN_LIMIT tokens, summarizing
+            older turns with MEMORY_SUMMARY_MODEL if set)
+        agent_type: "react" for the text ReAct agent (one tool per step) or
+            "tool_calling" for native tool calls, with independent calls of
+            a step run concurrently (default from AGENT_TYPE, or "react")
+        llm: Optional chat model to use instead of ChatOpenAI, e.g. the
+            scripted model of the offline benchmarks
+        metrics: Registry receiving LLM, tool and run metrics (default:
+            the process-wide registry from ``get_metrics()``); its handler
+            is added to the config of each run, so the model and tool runs
+            inherit it and the shared model and tools are left unchanged
+        resources: Registry of the model and tools shared between agents
+            (default: the process-wide one from ``get_resources()``); only
+            the memory and the executor are created per call. Tools are
+            created for this agent when ``llm`` is given.
+        answer_cache: Semantic cache answering near-duplicate questions
+            without running the agent (default: the process-wide one if
+            ANSWER_CACHE is "true", otherwise no cache)
+        router: Router sending plain weather and arithmetic queries straight
+            to their tool (default: the process-wide one unless FAST_PATH
+            is "false")
+    
     Returns:
         An AgentExecutor instance
     """
-    # Initialize the LLM
-    llm = ChatOpenAI(model_name=model_name, temperature=temperature)
+    agent_type = agent_type or getenv("AGENT_TYPE", "react")
+    if agent_type not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type: {agent_type} (expected one of {', '.join(AGENT_TYPES)})")
     
-    # Initialize tools
-    tools = [
-        WikipediaTool(),
-        CalculatorTool(llm=llm),
-        WeatherTool()
-    ]
+    # Use the shared LLM and tools unless a model is given
+    resources = resources if resources is not None else get_resources()
+    if llm is None:
+        llm = resources.llm(model_name, temperature)
+        tools = resources.tools(model_name, temperature)
+    else:
+        tools = build_tools(llm)
     
-    # Create prompt
-    prompt = PromptTemplate.from_template(
-        template=get_prompt_template(),
-        partial_variables={"tools": ""}  # Will be filled by the agent
-    )
+    # Answer repeated questions from the semantic cache, if enabled
+    if answer_cache is None and getenv("ANSWER_CACHE", "false").lower() == "true":
+        answer_cache = get_answer_cache()
     
-    # Create agent
-    agent = create_react_agent(
-        llm=llm,
-        tools=tools,
-        prompt=prompt
-    )
+    # Answer single-tool queries without the agent loop, unless disabled
+    if router is None and getenv("FAST_PATH", "true").lower() != "false":
+        router = get_router()
+    
+    if agent_type == "tool_calling":
+        # Create prompt and agent that can request several tools per step
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", get_tool_calling_system_prompt()),
+            MessagesPlaceholder("chat_history", optional=True),
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
+        agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
+        executor_class = FastPathParallelAgentExecutor
+    else:
+        # Create prompt
+        prompt = PromptTemplate.from_template(
+            template=get_prompt_template(),
+            partial_variables={"tools": ""}  # Will be filled by the agent
+        )
+        
+        # Create agent
+        agent = create_react_agent(
+            llm=llm,
+            tools=tools,
+            prompt=prompt
+        )
+        executor_class = FastPathAgentExecutor
     
     # Create memory if not provided
     if memory is None:
-        memory = ConversationBufferMemory(
+        summary_model = getenv("MEMORY_SUMMARY_MODEL")
+        memory = TokenBudgetMemory(
             memory_key="chat_history",
-            return_messages=True
+            # Streaming runs also return "messages"; only the answer is remembered
+            output_key="output",
+            return_messages=True,
+            llm=resources.llm(summary_model, 0) if summary_model else None,
+            model_name=model_name,
         )
     
+    # Record LLM, tool and run metrics
+    metrics_handler = MetricsCallbackHandler(metrics)
+    register_tool_caches(metrics_handler.registry, tools)
+    register_rate_limits(metrics_handler.registry)
+    if answer_cache is not None:
+        register_cache(metrics_handler.registry, "answer", answer_cache)
+    
     # Create agent executor
-    agent_executor = AgentExecutor(
+    agent_executor = executor_class(
         agent=agent,
         tools=tools,
         memory=memory,
         verbose=verbose,
         handle_parsing_errors=True,
         max_iterations=10,
+        # Long observations are shortened in the prompt; full text via ObservationLookup
+        trim_intermediate_steps=ObservationCompactor(),
+        metrics_handler=metrics_handler,
+        answer_cache=answer_cache,
+        router=router,
     )
     
     return agent_executor 
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""Semantic cache of final answers, in front of the agent loop.
+
+Many questions are near-duplicates of earlier ones ("Who is the CEO of
+Microsoft?", "who's Microsoft's CEO"), and each one would otherwise run the
+whole ReAct loop. ``AnswerCache`` embeds questions locally with the
+``HashingEmbedder`` (no model download or network access) and looks them up
+in an in-process FAISS inner-product index:
+
+- Questions are embedded in a canonical form: common paraphrases are
+  spelled one way ("chief executive" is "CEO") and filler words such as
+  "current" or "please" are dropped.
+- A hit needs a cosine similarity of at least ``threshold``, the same
+  numbers in both questions ("sqrt of 144" is not "sqrt of 169") and the
+  same entities: a name capitalized in either question must appear in both
+  or in neither, so "the population of France" and "... of Germany" do not
+  match however similar they are.
+- Answers expire according to the tools they used: the shortest TTL of
+  those tools applies, so weather answers last minutes while
+  Wikipedia-only answers last a day.
+- Follow-up questions that refer to the conversation ("what is its
+  population?") are neither answered from nor stored in the cache.
+
+``FastPathAgentExecutor`` (``agent/fast_path.py``) consults the cache
+before the first planning step, so ``invoke``, ``ainvoke`` and the
+streaming paths all use it, and memory records cached turns like any other.
+"""
+
+import re
+import threading
+import time
+from os import getenv
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from tools.embeddings import STOPWORDS, HashingEmbedder
+
+# Seconds an answer stays fresh, by the tools it used
+TOOL_TTLS: Dict[str, float] = {
+    "WeatherTool": 10 * 60,
+    "WikipediaTool": 24 * 60 * 60,
+    "CalculatorTool": 7 * 24 * 60 * 60,
+    "ObservationLookup": 24 * 60 * 60,
+}
+
+# Words that make a question depend on the conversation so far
+CONTEXT_WORDS = frozenset("it its it's they them their theirs he him his she her hers that this those these there".split())
+
+# Paraphrases spelled one way before questions are embedded and compared
+PARAPHRASES = [
+    (re.compile(r"\bchief executive(?:\s+officer)?\b", re.IGNORECASE), "CEO"),
+    (re.compile(r"\bchief financial officer\b", re.IGNORECASE), "CFO"),
+    (re.compile(r"\bchief technology officer\b", re.IGNORECASE), "CTO"),
+]
+
+# Words that do not change what a question asks
+FILLER_WORDS = frozenset("current currently latest present now today please".split())
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_WORD_RE = re.compile(r"[\w']+")
+
+
+class AnswerCache:
+    """Similarity-based cache of agent answers with per-tool freshness."""
+    
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        default_ttl: Optional[float] = None,
+        maxsize: Optional[int] = None,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        embedder: Optional[HashingEmbedder] = None,
+    ):
+        """Initialize the cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a hit (default from
+                ANSWER_CACHE_THRESHOLD, or 0.85)
+            default_ttl: Seconds answers using no tool with a TTL of its own
+                stay fresh (default from ANSWER_CACHE_TTL, or 3600)
+            maxsize: Maximum number of answers kept (default from
+                ANSWER_CACHE_SIZE, or 1024); the oldest are evicted first
+            tool_ttls: Seconds answers stay fresh, by tool used (default:
+                ``TOOL_TTLS``)
+            embedder: Question embedder (default: 1024-dimensional
+                ``HashingEmbedder``)
+        """
+        self.threshold = threshold if threshold is not None else float(getenv("ANSWER_CACHE_THRESHOLD", 0.85))
+        self.default_ttl = default_ttl if default_ttl is not None else float(getenv("ANSWER_CACHE_TTL", 3600))
+        self.maxsize = maxsize if maxsize is not None else int(getenv("ANSWER_CACHE_SIZE", 1024))
+        self.tool_ttls = dict(TOOL_TTLS if tool_ttls is None else tool_ttls)
+        self.embedder = embedder or HashingEmbedder(dim=1024)
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedder.dim))
+        # id -> entry, in insertion order (oldest first)
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expirations = 0
+        self.evictions = 0
+    
+    def ttl(self, tools: Sequence[str]) -> float:
+        """Seconds an answer that used these tools stays fresh."""
+        ttls = [self.tool_ttls[tool] for tool in tools if tool in self.tool_ttls]
+        return min(ttls) if ttls else self.default_ttl
+    
+    def _embed(self, query: str) -> np.ndarray:
+        return self.embedder.embed(canonical_question(query)).reshape(1, -1)
+    
+    def _remove(self, ids: List[int]) -> None:
+        for id_ in ids:
+            del self._entries[id_]
+        self.index.remove_ids(np.array(ids, dtype=np.int64))
+    
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the most similar fresh answer, or None.
+        
+        Returns:
+            A dict with the cached "answer", the "query" it was given for,
+            the "tools" it used and the "similarity" to this query
+        """
+        vector = self._embed(query)
+        numbers = _NUMBER_RE.findall(query)
+        words, entities = question_terms(query)
+        now = time.time()
+        with self._lock:
+            if self.index.ntotal:
+                expired = [id_ for id_, entry in self._entries.items() if entry["expires_at"] <= now]
+                if expired:
+                    self._remove(expired)
+                    self.expirations += len(expired)
+            
+            if self.index.ntotal:
+                scores, ids = self.index.search(vector, min(4, self.index.ntotal))
+                for score, id_ in zip(scores[0], ids[0]):
+                    if id_ < 0 or score < self.threshold:
+                        break
+                    entry = self._entries[int(id_)]
+                    if entry["numbers"] != numbers:
+                        continue
+                    # Names capitalized in either question must be in both or neither
+                    names = entities | entry["entities"]
+                    if names & words != names & entry["words"]:
+                        continue
+                    self.hits += 1
+                    return {
+                        "answer": entry["answer"],
+                        "query": entry["query"],
+                        "tools": entry["tools"],
+                        "similarity": float(score),
+                    }
+            self.misses += 1
+            return None
+    
+    def store(self, query: str, answer: str, tools: Sequence[str] = ()) -> None:
+        """Cache the answer to a query, given the tools used to find it."""
+        vector = self._embed(query)
+        if not np.any(vector):
+            # Nothing but stopwords; every such question would look alike
+            return
+        tools = sorted(set(tools))
+        words, entities = question_terms(query)
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                oldest = list(self._entries)[:len(self._entries) - self.maxsize + 1]
+                self._remove(oldest)
+                self.evictions += len(oldest)
+            id_ = self._next_id
+            self._next_id += 1
+            self._entries[id_] = {
+                "query": query,
+                "answer": answer,
+                "tools": tools,
+                "numbers": _NUMBER_RE.findall(query),
+                "words": words,
+                "entities": entities,
+                "expires_at": time.time() + self.ttl(tools),
+            }
+            self.index.add_with_ids(vector, np.array([id_], dtype=np.int64))
+            self.stores += 1
+    
+    def clear(self) -> None:
+        """Remove all answers (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.index.reset()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/store/expiration/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+
+def canonical_question(query: str) -> str:
+    """Spell paraphrases one way and drop filler words."""
+    for pattern, replacement in PARAPHRASES:
+        query = pattern.sub(replacement, query)
+    return " ".join(word for word in query.split() if word.strip("?!.,").lower() not in FILLER_WORDS)
+
+
+def question_terms(query: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Return the words of a question and those of them that are names.
+    
+    Names are the words capitalized after the first one ("Microsoft",
+    "CEO"); words are lowercased and lose a possessive "'s".
+    """
+    tokens = [token[:-2] if token.lower().endswith("'s") else token for token in _WORD_RE.findall(canonical_question(query))]
+    words = frozenset(token.lower() for token in tokens)
+    entities = frozenset(
+        token.lower() for token in tokens[1:]
+        if token[:1].isupper() and token.lower() not in STOPWORDS
+    )
+    return words, entities
+
+
+def is_contextual(query: str, inputs: Dict[str, Any]) -> bool:
+    """Whether a question may refer to earlier turns of the conversation."""
+    if not inputs.get("chat_history"):
+        return False
+    return any(word in CONTEXT_WORDS for word in _WORD_RE.findall(query.lower()))
+
+
+_answer_cache: Optional[AnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
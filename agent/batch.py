@@ -0,0 +1,269 @@
+"""Batch mode: answer the queries of a JSONL file in one process.
+
+Nightly jobs used to start ``main.py`` once per query, paying the startup
+cost (imports, model client, tools) every time. ``run_batch_job`` reads all
+queries from a JSONL file (or stdin) and answers them concurrently on one
+event loop:
+
+- Each query gets a fresh agent (and so a fresh conversation memory); the
+  model and tools are shared through the ``ResourceRegistry``.
+- At most ``concurrency`` queries run at the same time.
+- One JSONL record (answer, error, latency and tool usage) is written and
+  flushed as soon as a query finishes, so results are usable before the
+  batch ends and a killed job loses at most the queries in flight.
+- Ctrl-C or SIGTERM cancels the queries in flight, which are not written.
+- Running the job again with the same output file resumes it: queries with
+  a successful record are skipped, and failed or cancelled ones (and a
+  partially written last line) are run again.
+
+Input lines are JSON objects with the query in "query", "input" or
+"question" (or the field given as ``query_field``) and an optional "id" or
+"request_id"; lines that are not JSON objects are taken as the query
+itself. Queries without an id are numbered by line.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, TextIO, Union
+
+from langchain.agents import AgentExecutor
+
+from .metrics import MetricsCallbackHandler, MetricsRegistry
+
+# Fields a query is read from, in order of preference
+QUERY_FIELDS = ("query", "input", "question")
+ID_FIELDS = ("id", "request_id")
+
+
+def read_queries(lines: Iterable[str], query_field: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parse the queries of a JSONL input.
+    
+    Args:
+        lines: Lines of the input
+        query_field: Field holding the query (default: the first of
+            ``QUERY_FIELDS`` present)
+    
+    Returns:
+        A list of {"id", "query"} dicts, in input order
+    
+    Raises:
+        ValueError: If a line has no query or an id is repeated
+    """
+    fields = (query_field,) if query_field else QUERY_FIELDS
+    queries: List[Dict[str, Any]] = []
+    seen: Set[str] = set()
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = line
+        if not isinstance(record, dict):
+            record = {"query": str(record)}
+            fields_used = ("query",)
+        else:
+            fields_used = fields
+        
+        query = next((record[field] for field in fields_used if isinstance(record.get(field), str)), None)
+        if not query:
+            raise ValueError(f"Line {number}: no query in field {' / '.join(fields_used)}")
+        id_ = next((record[field] for field in ID_FIELDS if record.get(field) is not None), number)
+        if str(id_) in seen:
+            raise ValueError(f"Line {number}: duplicate id {id_!r}")
+        seen.add(str(id_))
+        queries.append({"id": id_, "query": query})
+    return queries
+
+
+def resume_output(path: str) -> Set[str]:
+    """Prepare an output file for resuming and return the ids already answered.
+    
+    Records of failed queries and a partially written last line are removed
+    from the file, so that those queries are written again when they are
+    rerun.
+    """
+    if not os.path.exists(path):
+        return set()
+    
+    kept: List[str] = []
+    done: Set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Cut off while writing
+                continue
+            if not line.endswith("\n") or not isinstance(record, dict) or record.get("error") is not None:
+                continue
+            kept.append(line)
+            done.add(str(record.get("id")))
+    
+    with open(path, encoding="utf-8") as f:
+        unchanged = sum(1 for _ in f) == len(kept)
+    if not unchanged:
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(temporary, path)
+    return done
+
+
+def tool_usage(registry: MetricsRegistry) -> Dict[str, Dict[str, float]]:
+    """Return the calls and total seconds per tool recorded in a registry."""
+    usage = {}
+    for labels in registry.series("agent_tool_latency_seconds"):
+        histogram = registry.histogram("agent_tool_latency_seconds", labels)
+        usage[labels["tool"]] = {
+            "calls": histogram.count,
+            "errors": int(registry.counter("agent_tool_errors_total", labels)),
+            "seconds": round(histogram.sum, 3),
+        }
+    return usage
+
+
+async def answer_query(query: Dict[str, Any], agent_factory: Callable[[], AgentExecutor]) -> Dict[str, Any]:
+    """Answer one query on a fresh agent and return its output record."""
+    registry = MetricsRegistry()
+    start = time.perf_counter()
+    try:
+        agent = agent_factory()
+        response = await agent.ainvoke({"input": query["query"]}, config={"callbacks": [MetricsCallbackHandler(registry)]})
+        answer, error = response["output"], None
+    except Exception as e:
+        answer, error = None, f"{type(e).__name__}: {e}"
+    
+    return {
+        "id": query["id"],
+        "query": query["query"],
+        "answer": answer,
+        "error": error,
+        "latency": round(time.perf_counter() - start, 3),
+        "llm_calls": int(sum(
+            registry.counter("agent_llm_calls_total", labels) for labels in registry.series("agent_llm_calls_total")
+        )),
+        "tools": tool_usage(registry),
+    }
+
+
+async def run_batch(
+    queries: List[Dict[str, Any]],
+    output: TextIO,
+    agent_factory: Callable[[], AgentExecutor],
+    concurrency: int = 4,
+    counts: Optional[Counter] = None,
+) -> Counter:
+    """Answer queries concurrently, writing each record as it finishes.
+    
+    Args:
+        queries: Queries from ``read_queries``
+        output: Text stream the JSONL records are written to
+        agent_factory: Returns a new agent for each query
+        concurrency: Maximum number of queries answered at the same time
+        counts: Counter updated with each record written, so that it is
+            up to date even if the batch is cancelled
+    
+    Returns:
+        The number of "answered" and "failed" queries
+    """
+    counts = counts if counts is not None else Counter()
+    pending = iter(queries)
+    
+    async def worker() -> None:
+        # Workers share the iterator; nothing else runs between next() and
+        # the await, so each query is taken once
+        for query in pending:
+            record = await answer_query(query, agent_factory)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            counts["failed" if record["error"] else "answered"] += 1
+    
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(queries))))))
+    return counts
+
+
+async def _run_cancellable(coroutine) -> Any:
+    """Run a coroutine, cancelling it on SIGTERM as Ctrl-C does."""
+    task = asyncio.ensure_future(coroutine)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, task.cancel)
+    except (NotImplementedError, RuntimeError, ValueError):
+        # Not supported on this platform or outside the main thread
+        pass
+    try:
+        return await task
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGTERM)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
+
+
+def run_batch_job(
+    input_path: str,
+    output_path: Union[str, TextIO, None],
+    agent_factory: Callable[[], AgentExecutor],
+    concurrency: Optional[int] = None,
+    query_field: Optional[str] = None,
+    resume: bool = True,
+) -> Dict[str, Any]:
+    """Answer the queries of a JSONL file and write the results as JSONL.
+    
+    Args:
+        input_path: JSONL file of queries, or "-" for stdin
+        output_path: JSONL file for the results, None or "-" for stdout,
+            or an open text stream (never resumed or closed)
+        agent_factory: Returns a new agent for each query
+        concurrency: Maximum number of queries answered at the same time
+            (default from BATCH_CONCURRENCY, or 4)
+        query_field: Input field holding the query (default: "query",
+            "input" or "question")
+        resume: Append to the output file, skipping the queries it already
+            answers (otherwise the file is overwritten)
+    
+    Returns:
+        A summary with the number of queries "total", "skipped" (answered
+        by an earlier run), "answered" and "failed", the "wall_time" and
+        whether the job was "cancelled"
+    """
+    concurrency = concurrency if concurrency is not None else int(os.getenv("BATCH_CONCURRENCY", 4))
+    if input_path == "-":
+        queries = read_queries(sys.stdin, query_field)
+    else:
+        with open(input_path, encoding="utf-8") as f:
+            queries = read_queries(f, query_field)
+    
+    if output_path in (None, "-"):
+        output_path = sys.stdout
+    to_stream = not isinstance(output_path, str)
+    done = resume_output(output_path) if resume and not to_stream else set()
+    pending = [query for query in queries if str(query["id"]) not in done]
+    
+    output = output_path if to_stream else open(output_path, "a" if resume else "w", encoding="utf-8")
+    counts: Counter = Counter()
+    cancelled = False
+    start = time.perf_counter()
+    try:
+        asyncio.run(_run_cancellable(run_batch(pending, output, agent_factory, concurrency, counts)))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        cancelled = True
+    finally:
+        if not to_stream:
+            output.close()
+    
+    return {
+        "total": len(queries),
+        "skipped": len(queries) - len(pending),
+        "answered": counts["answered"],
+        "failed": counts["failed"],
+        "wall_time": time.perf_counter() - start,
+        "cancelled": cancelled,
+    }
@@ -0,0 +1,192 @@
+"""Agent executors that can answer without running the agent loop.
+
+Two shortcuts are tried before the agent plans its first step:
+
+1. The semantic ``AnswerCache``: a near-duplicate of an earlier question is
+   answered with the cached answer.
+2. The ``FastPathRouter``: a query a single tool call can answer is sent
+   straight to that tool, and the answer is written from a template.
+
+Both work at the level of ``_iter_next_step``, which ``invoke``,
+``ainvoke`` and the streaming iterators all go through, so callbacks,
+metrics, streaming events and conversation memory see shortcut runs like
+any other. A routed tool call is a regular step (with a ReAct-style log),
+so if the tool fails the agent takes over with the failed call in its
+scratchpad.
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from pydantic import Field
+
+from .answer_cache import is_contextual
+from .metrics import with_metrics
+from .parallel import ParallelAgentExecutor
+from .router import Route, format_answer
+
+
+class FastPathAction(AgentAction):
+    """Tool call chosen by the router rather than by the model."""
+    
+    confidence: float = 1.0
+    reason: str = ""
+    
+    @property
+    def route(self) -> Route:
+        return Route(self.tool, str(self.tool_input), self.confidence, self.reason)
+
+
+def _used_tools(intermediate_steps: List[Tuple[AgentAction, Any]]) -> List[str]:
+    # "_Exception" marks parsing errors handled by the executor
+    return [action.tool for action, _ in intermediate_steps if action.tool != "_Exception"]
+
+
+class FastPathAgentExecutor(AgentExecutor):
+    """``AgentExecutor`` that tries an answer cache and a router first."""
+    
+    answer_cache: Any = Field(default=None, exclude=True)
+    router: Any = Field(default=None, exclude=True)
+    # Added to the config of each run, so the model and tool runs inherit it
+    metrics_handler: Any = Field(default=None, exclude=True)
+    
+    def _run_config(self, config: Optional[RunnableConfig]) -> Optional[RunnableConfig]:
+        if self.metrics_handler is None:
+            return config
+        return with_metrics(config, self.metrics_handler)
+    
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        return super().invoke(input, self._run_config(config), **kwargs)
+    
+    async def ainvoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        return await super().ainvoke(input, self._run_config(config), **kwargs)
+    
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        return super().stream(input, self._run_config(config), **kwargs)
+    
+    def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        return super().astream(input, self._run_config(config), **kwargs)
+    
+    def _query(self, inputs: Dict[str, Any]) -> Optional[str]:
+        """The question of a run, unless it refers to earlier turns."""
+        query = inputs.get("input", "")
+        if not isinstance(query, str) or is_contextual(query, inputs):
+            return None
+        return query
+    
+    def _cached_finish(self, inputs: Dict[str, Any]) -> Optional[AgentFinish]:
+        """Return the cached answer to the run's question, if there is one."""
+        query = self._query(inputs)
+        if self.answer_cache is None or query is None:
+            return None
+        hit = self.answer_cache.lookup(query)
+        if hit is None:
+            return None
+        return AgentFinish(
+            return_values={"output": hit["answer"]},
+            log=f"Answered from cache (similarity {hit['similarity']:.2f} to {hit['query']!r})",
+        )
+    
+    def _routed_action(self, inputs: Dict[str, Any], name_to_tool_map: Dict[str, BaseTool]) -> Optional[FastPathAction]:
+        """Return the tool call the router picks for the run's question, if any."""
+        query = self._query(inputs)
+        if self.router is None or query is None:
+            return None
+        route = self.router.route(query)
+        if route is None or route.tool not in name_to_tool_map:
+            return None
+        return FastPathAction(
+            tool=route.tool,
+            tool_input=route.tool_input,
+            log=f"Thought: This is a {route.reason} query\nAction: {route.tool}\nAction Input: {route.tool_input}",
+            confidence=route.confidence,
+            reason=route.reason,
+        )
+    
+    def _routed_finish(self, intermediate_steps: List[Tuple[AgentAction, Any]]) -> Optional[AgentFinish]:
+        """Write the answer of a routed tool call, or None if the agent must take over."""
+        if len(intermediate_steps) != 1 or not isinstance(intermediate_steps[0][0], FastPathAction):
+            return None
+        action, observation = intermediate_steps[0]
+        answer = format_answer(action.route, observation)
+        if answer is None:
+            self.router.record_fallback(action.route)
+            return None
+        return AgentFinish(return_values={"output": answer}, log=f"Final Answer: {answer}")
+    
+    def _store_answer(self, inputs: Dict[str, Any], finish: AgentFinish, intermediate_steps: List[Tuple[AgentAction, Any]]) -> None:
+        query = self._query(inputs)
+        answer = finish.return_values.get("output")
+        if self.answer_cache is None or query is None or not isinstance(answer, str):
+            return
+        self.answer_cache.store(query, answer, _used_tools(intermediate_steps))
+    
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        """Take a shortcut if one applies, otherwise a regular step."""
+        if not intermediate_steps:
+            cached = self._cached_finish(inputs)
+            if cached is not None:
+                yield cached
+                return
+            action = self._routed_action(inputs, name_to_tool_map)
+            if action is not None:
+                yield action
+                yield self._perform_agent_action(name_to_tool_map, color_mapping, action, run_manager)
+                return
+        
+        finish = self._routed_finish(intermediate_steps)
+        if finish is not None:
+            self._store_answer(inputs, finish, intermediate_steps)
+            yield finish
+            return
+        
+        for item in super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager):
+            if isinstance(item, AgentFinish):
+                self._store_answer(inputs, item, intermediate_steps)
+            yield item
+    
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        """Async version of ``_iter_next_step``."""
+        if not intermediate_steps:
+            cached = self._cached_finish(inputs)
+            if cached is not None:
+                yield cached
+                return
+            action = self._routed_action(inputs, name_to_tool_map)
+            if action is not None:
+                yield action
+                yield await self._aperform_agent_action(name_to_tool_map, color_mapping, action, run_manager)
+                return
+        
+        finish = self._routed_finish(intermediate_steps)
+        if finish is not None:
+            self._store_answer(inputs, finish, intermediate_steps)
+            yield finish
+            return
+        
+        async for item in super()._aiter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager):
+            if isinstance(item, AgentFinish):
+                self._store_answer(inputs, item, intermediate_steps)
+            yield item
+
+
+class FastPathParallelAgentExecutor(FastPathAgentExecutor, ParallelAgentExecutor):
+    """``ParallelAgentExecutor`` that tries an answer cache and a router first."""
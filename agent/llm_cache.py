@@ -0,0 +1,140 @@
+"""Persistent exact-match cache of LLM completions.
+
+The agent runs at temperature 0 by default, and ``evaluate.py`` and the
+benchmarks send the same prompts on every run. ``SQLiteLLMCache`` is a
+LangChain ``BaseCache`` that stores completions in a SQLite file, keyed on
+a hash of the model's parameters (model name, temperature, stop sequences)
+and the full prompt, so a repeated run answers every model call from disk.
+
+- Only deterministic calls are cached: calls with a temperature above
+  zero are neither looked up nor stored.
+- The table is bounded (``LLM_CACHE_SIZE`` rows), evicting the least
+  recently used completions first.
+- ``enable_llm_cache`` installs the cache for every model of the process.
+  Evaluation enables it by default (``--no-llm-cache`` bypasses it); the
+  CLI and the web app only use it when ``LLM_CACHE`` is "true".
+"""
+
+import hashlib
+import json
+import os
+import threading
+from os import getenv
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from tools.cache import SQLiteCache, default_cache_dir
+from .metrics import get_metrics, register_cache
+
+
+def is_deterministic(llm_string: str) -> bool:
+    """Whether a model configuration samples at temperature 0 (or has none)."""
+    serialized = llm_string.split("---", 1)[0]
+    try:
+        temperature = json.loads(serialized).get("kwargs", {}).get("temperature")
+    except (ValueError, AttributeError):
+        return True
+    return not temperature
+
+
+def _dump_generation(generation: Generation) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"text": generation.text, "info": generation.generation_info}
+    if isinstance(generation, ChatGeneration):
+        data["message"] = message_to_dict(generation.message)
+    return data
+
+
+def _load_generation(data: Dict[str, Any]) -> Generation:
+    if "message" in data:
+        return ChatGeneration(message=messages_from_dict([data["message"]])[0], generation_info=data["info"])
+    return Generation(text=data["text"], generation_info=data["info"])
+
+
+class SQLiteLLMCache(BaseCache):
+    """LLM completion cache stored in a size-bounded SQLite table."""
+    
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """Initialize the cache.
+        
+        Args:
+            path: SQLite file (default from LLM_CACHE_PATH, or
+                llm_cache.sqlite in the cache directory)
+            max_entries: Completions kept (default from LLM_CACHE_SIZE, or
+                10000); the least recently used are evicted first
+            ttl: Seconds completions are kept, or None to keep them until
+                evicted (default from LLM_CACHE_TTL, if set)
+        """
+        path = path or getenv("LLM_CACHE_PATH") or os.path.join(default_cache_dir(), "llm_cache.sqlite")
+        max_entries = max_entries if max_entries is not None else int(getenv("LLM_CACHE_SIZE", 10000))
+        if ttl is None and getenv("LLM_CACHE_TTL"):
+            ttl = float(getenv("LLM_CACHE_TTL"))
+        self.store = SQLiteCache(path, table="llm_cache", ttl=ttl, max_entries=max_entries)
+    
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        """Return the key of a prompt for a model configuration."""
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return the cached generations of a prompt, or None."""
+        if not is_deterministic(llm_string):
+            return None
+        value = self.store.get(self.key(prompt, llm_string))
+        if value is None:
+            return None
+        return [_load_generation(generation) for generation in value]
+    
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations of a prompt."""
+        if not is_deterministic(llm_string):
+            return
+        self.store.set(self.key(prompt, llm_string), [_dump_generation(generation) for generation in return_val])
+    
+    def clear(self, **kwargs: Any) -> None:
+        """Remove all cached completions."""
+        self.store.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters."""
+        return self.store.stats()
+
+
+_llm_cache: Optional[SQLiteLLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteLLMCache:
+    """Return the process-wide LLM completion cache."""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = SQLiteLLMCache()
+    return _llm_cache
+
+
+def enable_llm_cache(enabled: Optional[bool] = None, cache: Optional[BaseCache] = None) -> Optional[BaseCache]:
+    """Install (or remove) the completion cache for every model of the process.
+    
+    Args:
+        enabled: Whether to cache completions (default: LLM_CACHE is "true")
+        cache: Cache to install (default: the process-wide SQLite cache)
+    
+    Returns:
+        The installed cache, or None if caching is disabled
+    """
+    if enabled is None:
+        enabled = getenv("LLM_CACHE", "false").lower() == "true"
+    if not enabled:
+        set_llm_cache(None)
+        return None
+    
+    cache = cache if cache is not None else get_llm_cache()
+    set_llm_cache(cache)
+    if callable(getattr(cache, "stats", None)):
+        register_cache(get_metrics(), "llm", cache)
+    return cache
@@ -0,0 +1,238 @@
+"""Conversation memory with a hard token budget.
+
+``ConversationBufferMemory`` re-sends the whole conversation on every turn,
+so prompts (and latency and cost) grow with the length of a session.
+``TokenBudgetMemory`` keeps the most recent turns verbatim and folds older
+turns into a running summary once the history exceeds its budget:
+
+- Each message is counted once, when it is added, with a local tokenizer
+  (tiktoken, or a character-based estimate when its encoding is not
+  available offline).
+- Only the turns that are pruned are folded into the summary, so the
+  summary is updated incrementally instead of being recomputed every turn.
+- Pruning goes down to a low-water mark below the budget, so summaries are
+  only updated every few turns.
+- Without a summarization model, the summary is extractive (the start of
+  each question and answer) and costs no LLM call.
+
+The summary is capped as well, so the size of ``{chat_history}`` stays
+flat however long the session runs.
+"""
+
+import functools
+import logging
+import math
+from os import getenv
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from pydantic import Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Characters per token when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Characters of each message kept by the extractive summary
+EXTRACT_CHARS = 200
+
+
+def _estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@functools.lru_cache(maxsize=None)
+def make_token_counter(model_name: str = "gpt-4o") -> Callable[[str], int]:
+    """Return a function counting the tokens of a text for a model.
+    
+    Uses tiktoken when its encoding can be loaded (it is downloaded on first
+    use), and a four-characters-per-token estimate otherwise.
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("tiktoken unavailable (%s); estimating token counts from text length", e)
+        return _estimate_tokens
+    
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Chat memory that keeps ``{chat_history}`` within a token budget."""
+    
+    memory_key: str = "chat_history"
+    # Tokens allowed for the summary plus the verbatim turns
+    max_token_limit: int = Field(default_factory=lambda: int(getenv("MEMORY_TOKEN_LIMIT", 2000)))
+    # Share of the budget the history is pruned down to once it is exceeded
+    prune_ratio: float = 0.75
+    # Tokens allowed for the running summary itself
+    summary_token_limit: Optional[int] = None
+    # Model that folds pruned turns into the summary (None: extractive summary)
+    llm: Optional[BaseLanguageModel] = None
+    summary_prompt: Any = SUMMARY_PROMPT
+    # Counts the tokens of a text (default: tiktoken for model_name)
+    count_tokens: Optional[Callable[[str], int]] = Field(default=None, exclude=True)
+    model_name: str = "gpt-4o"
+    moving_summary_buffer: str = ""
+    
+    _message_tokens: List[int] = PrivateAttr(default_factory=list)
+    _summary_tokens: int = PrivateAttr(default=0)
+    
+    def __init__(self, **kwargs: Any):
+        """Initialize the memory."""
+        super().__init__(**kwargs)
+        if self.count_tokens is None:
+            self.count_tokens = make_token_counter(self.model_name)
+        if self.summary_token_limit is None:
+            self.summary_token_limit = self.max_token_limit // 4
+        self._summary_tokens = self.count_tokens(self.moving_summary_buffer) if self.moving_summary_buffer else 0
+    
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+    
+    @property
+    def buffer(self) -> List[BaseMessage]:
+        """The summary (if any) followed by the verbatim messages."""
+        messages = list(self.chat_memory.messages)
+        if self.moving_summary_buffer:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {self.moving_summary_buffer}"))
+        return messages
+    
+    def token_count(self) -> int:
+        """Tokens currently held by the summary and the verbatim messages."""
+        self._sync_counts()
+        return self._summary_tokens + sum(self._message_tokens)
+    
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the summary and the recent turns."""
+        if self.return_messages:
+            return {self.memory_key: self.buffer}
+        return {self.memory_key: get_buffer_string(self.buffer)}
+    
+    def _message_text(self, message: BaseMessage) -> str:
+        return get_buffer_string([message])
+    
+    def _sync_counts(self) -> None:
+        """Count messages added since the last call (each message is counted once)."""
+        messages = self.chat_memory.messages
+        if len(self._message_tokens) > len(messages):
+            # The history was changed from outside; count it again
+            self._message_tokens = []
+        for message in messages[len(self._message_tokens):]:
+            self._message_tokens.append(self.count_tokens(self._message_text(message)))
+    
+    def _pop_oldest(self) -> List[BaseMessage]:
+        """Remove the messages to fold into the summary, oldest turns first."""
+        self._sync_counts()
+        if sum(self._message_tokens) + self._summary_tokens <= self.max_token_limit:
+            return []
+        
+        messages = list(self.chat_memory.messages)
+        target = int(self.max_token_limit * self.prune_ratio) - self.summary_token_limit
+        total = sum(self._message_tokens)
+        pruned = 0
+        # Keep at least the latest turn verbatim
+        while pruned < len(messages) - 2 and total > target:
+            total -= self._message_tokens[pruned]
+            pruned += 1
+        
+        self.chat_memory.clear()
+        self.chat_memory.add_messages(messages[pruned:])
+        self._message_tokens = self._message_tokens[pruned:]
+        self._truncate_latest()
+        return messages[:pruned]
+    
+    def _truncate_latest(self) -> None:
+        """Shorten the remaining messages if a single turn exceeds the budget."""
+        budget = self.max_token_limit - self.summary_token_limit
+        if sum(self._message_tokens) <= budget:
+            return
+        
+        messages = list(self.chat_memory.messages)
+        share = max(budget // max(len(messages), 1), 1)
+        for i, message in enumerate(messages):
+            content = str(message.content)
+            while self._message_tokens[i] > share and content:
+                keep = len(content) * share // self._message_tokens[i] - 8
+                content = content[:max(keep, 0)]
+                messages[i] = message.model_copy(update={"content": content + " [...]"})
+                self._message_tokens[i] = self.count_tokens(self._message_text(messages[i]))
+        self.chat_memory.clear()
+        self.chat_memory.add_messages(messages)
+    
+    def _extract(self, pruned: List[BaseMessage]) -> str:
+        """Extractive summary: the start of each pruned message."""
+        lines = []
+        for message in pruned:
+            text = " ".join(str(message.content).split())
+            if len(text) > EXTRACT_CHARS:
+                text = text[:EXTRACT_CHARS].rsplit(" ", 1)[0] + "..."
+            lines.append(f"{'User' if message.type == 'human' else 'Assistant'}: {text}")
+        return "\n".join(filter(None, [self.moving_summary_buffer] + lines))
+    
+    def _set_summary(self, summary: str) -> None:
+        """Store a new summary, dropping its oldest lines beyond the limit."""
+        summary = summary.strip()
+        tokens = self.count_tokens(summary)
+        lines = summary.split("\n")
+        while tokens > self.summary_token_limit and len(lines) > 1:
+            lines.pop(0)
+            summary = "\n".join(lines)
+            tokens = self.count_tokens(summary)
+        if tokens > self.summary_token_limit:
+            # A single line (e.g. an LLM summary) that is still too long
+            keep = len(summary) * self.summary_token_limit // tokens
+            summary = "..." + summary[len(summary) - keep + 3:]
+            tokens = self.count_tokens(summary)
+        self.moving_summary_buffer = summary
+        self._summary_tokens = tokens
+    
+    def _summary_input(self, pruned: List[BaseMessage]) -> str:
+        return self.summary_prompt.format(summary=self.moving_summary_buffer, new_lines=get_buffer_string(pruned))
+    
+    def prune(self) -> None:
+        """Fold the oldest turns into the summary if the budget is exceeded."""
+        pruned = self._pop_oldest()
+        if not pruned:
+            return
+        if self.llm is None:
+            self._set_summary(self._extract(pruned))
+            return
+        response = self.llm.invoke(self._summary_input(pruned))
+        self._set_summary(getattr(response, "content", response))
+    
+    async def aprune(self) -> None:
+        """Async version of ``prune``."""
+        pruned = self._pop_oldest()
+        if not pruned:
+            return
+        if self.llm is None:
+            self._set_summary(self._extract(pruned))
+            return
+        response = await self.llm.ainvoke(self._summary_input(pruned))
+        self._set_summary(getattr(response, "content", response))
+    
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save the turn and prune the history back under the budget."""
+        super().save_context(inputs, outputs)
+        self.prune()
+    
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Async version of ``save_context``."""
+        await super().asave_context(inputs, outputs)
+        await self.aprune()
+    
+    def clear(self) -> None:
+        """Clear the history and the summary."""
+        super().clear()
+        self._message_tokens = []
+        self.moving_summary_buffer = ""
+        self._summary_tokens = 0
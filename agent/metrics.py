@@ -0,0 +1,530 @@
+"""Metrics for the Research Assistant Agent.
+
+``MetricsCallbackHandler`` is added to the run config of every run of an
+agent built by ``create_research_agent``, so the model and tool runs inherit
+it, and records, in a ``MetricsRegistry``:
+
+- LLM call latency, call/error counts and prompt/completion tokens
+- per-tool latency, call counts and errors
+- agent runs: end-to-end latency, iterations per run and errors
+- cache hit rates of the tools, collected when metrics are exported
+- queueing and throttling of the outbound rate limiters
+
+Metrics can be exported as Prometheus text (``to_prometheus``) or as a
+JSON-serializable snapshot (``snapshot``) that includes p50/p90/p99 of
+recent observations, to see which stage dominates tail latency.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables import RunnableConfig
+
+from tools.ratelimit import rate_limiters
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds of the iterations-per-run histogram buckets
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15)
+
+# Observations kept per histogram for exact percentiles in snapshots
+RESERVOIR_SIZE = 1024
+
+HELP = {
+    "agent_llm_latency_seconds": "Latency of LLM calls",
+    "agent_llm_calls_total": "LLM calls",
+    "agent_llm_errors_total": "LLM calls that raised an error",
+    "agent_llm_tokens_total": "Tokens used by LLM calls",
+    "agent_tool_latency_seconds": "Latency of tool runs",
+    "agent_tool_calls_total": "Tool runs",
+    "agent_tool_errors_total": "Tool runs that failed or returned an error",
+    "agent_run_latency_seconds": "End-to-end latency of agent runs",
+    "agent_runs_total": "Agent runs",
+    "agent_run_errors_total": "Agent runs that raised an error",
+    "agent_iterations": "Tool-using iterations per agent run",
+    "agent_cache_hits": "Cache hits",
+    "agent_cache_misses": "Cache misses",
+    "agent_cache_hit_ratio": "Cache hit ratio",
+    "agent_upstream_requests": "Upstream tool requests run after a cache miss",
+    "agent_upstream_coalesced": "Tool calls that shared an identical upstream request in flight",
+    "agent_rate_limit_concurrency": "Adaptive concurrency limit of an upstream",
+    "agent_rate_limit_in_flight": "Requests in flight to an upstream",
+    "agent_rate_limit_waiting": "Requests waiting for a rate-limit permit",
+    "agent_rate_limit_acquired": "Rate-limit permits granted",
+    "agent_rate_limit_waited": "Rate-limit permits that had to be waited for",
+    "agent_rate_limit_wait_seconds": "Total time spent waiting for rate-limit permits",
+    "agent_rate_limit_wait_p99_seconds": "99th percentile of recent rate-limit waits",
+    "agent_rate_limit_throttled": "Responses asking us to slow down (429/503)",
+    "agent_rate_limit_decreases": "Times the concurrency limit was halved",
+    "agent_server_responses_total": "HTTP responses to queries, by status",
+    "agent_server_rejected_total": "Queries rejected by backpressure, by reason",
+    "agent_server_expired_total": "Queries whose deadline passed while queued",
+    "agent_server_queue_wait_seconds": "Time queries waited for a worker",
+    "agent_server_run_seconds": "Time workers spent on a query",
+    "agent_server_queue_depth": "Queries waiting for a worker",
+    "agent_server_in_flight": "Queries being answered",
+}
+
+
+def _labels(labels: Optional[Dict[str, Any]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    """Return the p-th percentile (0-100) of values, interpolating linearly."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class Histogram:
+    """Cumulative-bucket histogram that also keeps recent observations."""
+    
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Initialize an empty histogram with the given bucket upper bounds."""
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque = deque(maxlen=RESERVOIR_SIZE)
+    
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+    
+    def quantile(self, q: float) -> float:
+        """Return the q-quantile (0-1) of recent observations."""
+        return percentile(self.recent, q * 100)
+    
+    def cumulative_counts(self) -> List[int]:
+        """Return observation counts per bucket, cumulative as in Prometheus."""
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+    
+    def summary(self) -> Dict[str, float]:
+        """Return count, sum, mean and p50/p90/p99 of recent observations."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": max(self.recent) if self.recent else 0.0,
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms with labels."""
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Increase a counter."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+    
+    def set(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Set a gauge."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+    
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """Record an observation in a histogram."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def counter(self, name: str, labels: Optional[Dict[str, Any]] = None) -> float:
+        """Return the current value of a counter (0 if never increased)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0.0)
+    
+    def histogram(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Optional[Histogram]:
+        """Return a histogram, or None if nothing was observed."""
+        with self._lock:
+            return self._histograms.get(name, {}).get(_labels(labels))
+    
+    def series(self, name: str) -> List[Dict[str, str]]:
+        """Return the label sets recorded for a metric."""
+        with self._lock:
+            for store in (self._counters, self._gauges, self._histograms):
+                if name in store:
+                    return [dict(labels) for labels in store[name]]
+        return []
+    
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]) -> None:
+        """Register a function producing (gauge, labels, value) on export.
+        
+        Registering another collector under the same name replaces it.
+        """
+        with self._lock:
+            self._collectors[name] = collector
+    
+    def collect(self) -> None:
+        """Update gauges from the registered collectors."""
+        with self._lock:
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            for name, labels, value in collector():
+                self.set(name, value, labels)
+    
+    def reset(self) -> None:
+        """Remove all recorded values (collectors are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serializable dict."""
+        self.collect()
+        
+        def series(store: Dict[Labels, Any], value: Callable[[Any], Any]) -> List[Dict[str, Any]]:
+            return [{"labels": dict(labels), "value": value(item)} for labels, item in store.items()]
+        
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "counters": {name: series(store, float) for name, store in self._counters.items()},
+                "gauges": {name: series(store, float) for name, store in self._gauges.items()},
+                "histograms": {
+                    name: series(store, Histogram.summary) for name, store in self._histograms.items()
+                },
+            }
+    
+    def to_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        self.collect()
+        lines = []
+        
+        def header(name: str, kind: str) -> None:
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        with self._lock:
+            for name, store in sorted(self._counters.items()):
+                header(name, "counter")
+                for labels, value in store.items():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name, store in sorted(self._gauges.items()):
+                header(name, "gauge")
+                for labels, value in store.items():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name, store in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for labels, histogram in store.items():
+                    for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                        bucket_labels = _format_labels(labels, ("le", _format_value(bound)))
+                        lines.append(f"{name}_bucket{bucket_labels} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    """Return (prompt, completion) tokens reported for an LLM result."""
+    prompt_tokens = completion_tokens = 0
+    found = False
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                found = True
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if found:
+        return prompt_tokens, completion_tokens
+    
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Callback handler recording LLM, tool and agent-run metrics."""
+    
+    def __init__(self, registry: Optional["MetricsRegistry"] = None):
+        """Initialize the handler (default registry: ``get_metrics()``)."""
+        self.registry = registry if registry is not None else get_metrics()
+        self._llm_runs: Dict[UUID, Tuple[str, float]] = {}
+        self._tool_runs: Dict[UUID, Tuple[str, float]] = {}
+        self._agent_runs: Dict[UUID, float] = {}
+        self._iterations: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+    
+    # LLM calls
+    
+    def _start_llm(self, serialized: Optional[Dict[str, Any]], run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model_name")
+            or params.get("model")
+            or (serialized or {}).get("name")
+            or "unknown"
+        )
+        with self._lock:
+            self._llm_runs[run_id] = (model, time.perf_counter())
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, kwargs)
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, kwargs)
+    
+    def _finish_llm(self, run_id: UUID) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            started = self._llm_runs.pop(run_id, None)
+        if started is None:
+            return None
+        model, start = started
+        self.registry.observe("agent_llm_latency_seconds", time.perf_counter() - start, {"model": model})
+        self.registry.inc("agent_llm_calls_total", labels={"model": model})
+        return started
+    
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish_llm(run_id)
+        if started is None:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens:
+            self.registry.inc("agent_llm_tokens_total", prompt_tokens, {"model": started[0], "type": "prompt"})
+        if completion_tokens:
+            self.registry.inc("agent_llm_tokens_total", completion_tokens, {"model": started[0], "type": "completion"})
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish_llm(run_id)
+        if started is not None:
+            self.registry.inc("agent_llm_errors_total", labels={"model": started[0]})
+    
+    # Tool runs
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        with self._lock:
+            self._tool_runs[run_id] = (name, time.perf_counter())
+    
+    def _finish_tool(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            started = self._tool_runs.pop(run_id, None)
+        if started is None:
+            return
+        name, start = started
+        self.registry.observe("agent_tool_latency_seconds", time.perf_counter() - start, {"tool": name})
+        self.registry.inc("agent_tool_calls_total", labels={"tool": name})
+        if error:
+            self.registry.inc("agent_tool_errors_total", labels={"tool": name})
+    
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        # Tools report failures as "Error ..." observations rather than raising
+        text = getattr(output, "content", output)
+        self._finish_tool(run_id, error=isinstance(text, str) and text.startswith("Error"))
+    
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id, error=True)
+    
+    # Agent runs
+    
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        if parent_run_id is None:
+            with self._lock:
+                self._agent_runs[run_id] = time.perf_counter()
+                self._iterations[run_id] = 0
+    
+    def on_agent_action(self, action: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id in self._iterations:
+                self._iterations[run_id] += 1
+    
+    def _finish_run(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            start = self._agent_runs.pop(run_id, None)
+            iterations = self._iterations.pop(run_id, 0)
+        if start is None:
+            return
+        self.registry.observe("agent_run_latency_seconds", time.perf_counter() - start)
+        self.registry.observe("agent_iterations", iterations, buckets=ITERATION_BUCKETS)
+        self.registry.inc("agent_runs_total")
+        if error:
+            self.registry.inc("agent_run_errors_total")
+    
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_run(run_id, error=False)
+    
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_run(run_id, error=True)
+
+
+def _cache_gauges(cache: str, stats: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], float]]:
+    hits = stats.get("hits", 0)
+    misses = stats.get("misses", 0)
+    lookups = hits + misses
+    labels = {"cache": cache}
+    return [
+        ("agent_cache_hits", labels, hits),
+        ("agent_cache_misses", labels, misses),
+        ("agent_cache_hit_ratio", labels, hits / lookups if lookups else 0.0),
+    ]
+
+
+def _single_flight_gauges(stats: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], float]]:
+    return [
+        ("agent_upstream_requests", {}, stats["leaders"]),
+        ("agent_upstream_coalesced", {}, stats["shared"]),
+    ]
+
+
+def register_tool_caches(registry: "MetricsRegistry", tools: Sequence[Any]) -> None:
+    """Export the hit rates of the tools' caches as gauges.
+    
+    Collectors are registered per cache name, so the caches of the most
+    recently created agent are the ones reported.
+    """
+    for tool in tools:
+        if callable(getattr(tool, "cache_stats", None)):
+            def wikipedia_caches(tool=tool):
+                stats = tool.cache_stats()
+                return _cache_gauges("wikipedia_search", stats["search"]) + _cache_gauges("wikipedia_page", stats["page"])
+            registry.register_collector("wikipedia", wikipedia_caches)
+        
+        geocode_cache = getattr(tool, "geocode_cache", None)
+        if geocode_cache is not None:
+            registry.register_collector("geocode", lambda cache=geocode_cache: _cache_gauges("geocode", cache.stats()))
+        
+        weather_cache = getattr(tool, "weather_cache", None)
+        if weather_cache is not None:
+            registry.register_collector("weather", lambda cache=weather_cache: _cache_gauges("weather", cache.stats()))
+        
+        single_flight = getattr(tool, "single_flight", None)
+        if single_flight is not None:
+            registry.register_collector("single_flight", lambda group=single_flight: _single_flight_gauges(group.stats()))
+
+
+def _rate_limit_gauges(limiters: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], float]]:
+    gauges = []
+    for upstream, limiter in sorted(limiters.items()):
+        stats = limiter.stats()
+        labels = {"upstream": upstream}
+        gauges += [
+            ("agent_rate_limit_concurrency", labels, stats["concurrency_limit"]),
+            ("agent_rate_limit_in_flight", labels, stats["in_flight"]),
+            ("agent_rate_limit_waiting", labels, stats["waiting"]),
+            ("agent_rate_limit_acquired", labels, stats["acquired"]),
+            ("agent_rate_limit_waited", labels, stats["waited"]),
+            ("agent_rate_limit_wait_seconds", labels, stats["wait_seconds"]),
+            ("agent_rate_limit_wait_p99_seconds", labels, stats["wait_p99"]),
+            ("agent_rate_limit_throttled", labels, stats["throttled"]),
+            ("agent_rate_limit_decreases", labels, stats["decreases"]),
+        ]
+    return gauges
+
+
+def register_rate_limits(registry: "MetricsRegistry") -> None:
+    """Export the state of the process-wide rate limiters as gauges."""
+    registry.register_collector("rate_limits", lambda: _rate_limit_gauges(rate_limiters()))
+
+
+def register_cache(registry: "MetricsRegistry", name: str, cache: Any) -> None:
+    """Export the hit rate of a cache with a ``stats()`` method as gauges."""
+    registry.register_collector(name, lambda: _cache_gauges(name, cache.stats()))
+
+
+def with_metrics(config: Optional[RunnableConfig], handler: MetricsCallbackHandler) -> RunnableConfig:
+    """Return a copy of a run config whose callbacks include the handler.
+    
+    Callbacks of the run config are inherited by every model and tool run
+    started within it, so shared models and tools need no handler of their
+    own. A handler for the same registry already in the config is kept
+    instead of adding a second one.
+    """
+    config = RunnableConfig(**(config or {}))
+    callbacks = config.get("callbacks")
+    existing = callbacks.handlers if isinstance(callbacks, BaseCallbackManager) else list(callbacks or [])
+    if any(isinstance(other, MetricsCallbackHandler) and other.registry is handler.registry for other in existing):
+        return config
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = [*existing, handler]
+    config["callbacks"] = callbacks
+    return config
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
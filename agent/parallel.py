@@ -0,0 +1,74 @@
+"""Agent executor that runs the tool calls of one step concurrently.
+
+A tool-calling model can request several independent tools in a single
+response (e.g. a Wikipedia lookup and a weather lookup). ``AgentExecutor``
+runs those one after another when invoked synchronously; this executor
+runs them on a thread pool, so a step takes as long as its slowest tool
+rather than the sum of all of them. The async path (``ainvoke``) already
+gathers the tool calls of a step concurrently.
+"""
+
+import threading
+from concurrent.futures import Future
+from os import getenv
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.tools import BaseTool
+from pydantic import Field, PrivateAttr
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """``AgentExecutor`` that runs the actions of a step on a thread pool."""
+    
+    # Maximum tools run at the same time within one step
+    max_parallel_tools: int = Field(default_factory=lambda: int(getenv("AGENT_MAX_PARALLEL_TOOLS", 8)))
+    
+    # Pool of the step in progress, per thread so one executor can serve
+    # several concurrent invocations
+    _local: threading.local = PrivateAttr(default_factory=threading.local)
+    
+    def _perform_agent_action(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        agent_action: AgentAction,
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Union[AgentStep, Future]:
+        # Inside a step, submit the action and let _iter_next_step collect it
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        return pool.submit(
+            super()._perform_agent_action, name_to_tool_map, color_mapping, agent_action, run_manager
+        )
+    
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        """Take a single step, running all of its tool calls concurrently."""
+        pending: List[Future] = []
+        pool = self._local.pool = ContextThreadPoolExecutor(max_workers=self.max_parallel_tools)
+        try:
+            for item in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                if isinstance(item, Future):
+                    pending.append(item)
+                else:
+                    yield item
+        finally:
+            self._local.pool = None
+            pool.shutdown(wait=False)
+        
+        # Results are yielded in the order the model requested the tools
+        for future in pending:
+            yield future.result()
@@ -0,0 +1,174 @@
+"""Process-wide resources shared by all agent sessions.
+
+Building an agent used to create a new ``ChatOpenAI`` (with its own HTTP
+connection pool) and new tool instances every time, so each Streamlit
+session or evaluation query paid for client setup and fresh TLS
+connections. The ``ResourceRegistry`` builds the expensive, stateless parts
+once per process:
+
+- one pooled ``httpx.Client`` and one ``httpx.AsyncClient`` (pooled per
+  event loop) used by every OpenAI model,
+- one rate limiter for the OpenAI API, shared by those models,
+- one chat model per (model name, temperature),
+- one tool set per chat model.
+
+Only conversation memory and the ``AgentExecutor`` are created per
+session. The shared objects are only read after they are built (tools keep
+their caches behind their own locks), so they can be used from several
+sessions and threads at once. Per-session metrics should be passed as run
+callbacks rather than attached to the shared model and tools.
+"""
+
+import threading
+from os import getenv
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from langchain.tools import BaseTool
+from langchain_core.language_models import BaseChatModel
+
+from tools import WikipediaTool, CalculatorTool, WeatherTool
+from tools.compaction import ObservationLookupTool
+from tools.ratelimit import (
+    AdaptiveRateLimiter,
+    AsyncRateLimitedTransport,
+    LangChainRateLimiter,
+    RateLimitedTransport,
+    get_rate_limiter,
+)
+from tools.transport import PerLoopAsyncTransport
+
+# Upstream name of the OpenAI API's rate limiter
+OPENAI_UPSTREAM = "api.openai.com"
+
+
+def build_tools(llm: BaseChatModel) -> List[BaseTool]:
+    """Create the agent's tools, with llm as the calculator's fallback model."""
+    return [
+        WikipediaTool(),
+        CalculatorTool(llm=llm),
+        WeatherTool(),
+        ObservationLookupTool()
+    ]
+
+
+class ResourceRegistry:
+    """Lazily built models and tools, shared by every agent of a process."""
+    
+    def __init__(self, pool_size: Optional[int] = None):
+        """Initialize the registry.
+        
+        Args:
+            pool_size: Keep-alive connections to the OpenAI API (default from
+                OPENAI_POOL_SIZE, or 20)
+        """
+        self.pool_size = pool_size if pool_size is not None else int(getenv("OPENAI_POOL_SIZE", 20))
+        self._lock = threading.RLock()
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._llms: Dict[Tuple[str, float], BaseChatModel] = {}
+        self._tools: Dict[Tuple[str, float], List[BaseTool]] = {}
+    
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Return the process-wide rate limiter of the OpenAI API.
+        
+        Requests per second and burst come from OPENAI_RATE_LIMIT_RPS (or 8)
+        and OPENAI_RATE_LIMIT_BURST; model calls are slow by nature, so
+        latency does not throttle them.
+        """
+        burst = getenv("OPENAI_RATE_LIMIT_BURST")
+        return get_rate_limiter(
+            OPENAI_UPSTREAM,
+            rate=float(getenv("OPENAI_RATE_LIMIT_RPS", 8)),
+            burst=float(burst) if burst else None,
+            latency_target=0,
+        )
+    
+    def http_client(self) -> httpx.Client:
+        """Return the pooled HTTP client for the OpenAI API.
+        
+        Its responses are reported to the rate limiter, so a 429 pauses the
+        other sessions' calls for the Retry-After the API asks for.
+        """
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        transport=RateLimitedTransport(httpx.HTTPTransport(limits=self._limits()), self.rate_limiter()),
+                    )
+        return self._http_client
+    
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+    
+    def http_async_client(self) -> httpx.AsyncClient:
+        """Return the HTTP client for async calls to the OpenAI API.
+        
+        Connections are pooled per event loop (they cannot move between
+        loops) and closed when the loop shuts down; responses are reported to
+        the rate limiter like those of ``http_client``.
+        """
+        if self._http_async_client is None:
+            with self._lock:
+                if self._http_async_client is None:
+                    self._http_async_client = httpx.AsyncClient(
+                        transport=PerLoopAsyncTransport(lambda: AsyncRateLimitedTransport(
+                            httpx.AsyncHTTPTransport(limits=self._limits()), self.rate_limiter()
+                        )),
+                    )
+        return self._http_async_client
+    
+    def llm(self, model_name: str = "gpt-4o", temperature: float = 0) -> BaseChatModel:
+        """Return the shared chat model for a model name and temperature."""
+        key = (model_name, temperature)
+        if key not in self._llms:
+            with self._lock:
+                if key not in self._llms:
+                    # Imported here: langchain_openai (and openai) take about a
+                    # second to import and are not needed with a custom model
+                    from langchain_openai import ChatOpenAI
+                    self._llms[key] = ChatOpenAI(
+                        model_name=model_name,
+                        temperature=temperature,
+                        http_client=self.http_client(),
+                        http_async_client=self.http_async_client(),
+                        rate_limiter=LangChainRateLimiter(self.rate_limiter()),
+                    )
+        return self._llms[key]
+    
+    def tools(self, model_name: str = "gpt-4o", temperature: float = 0) -> List[BaseTool]:
+        """Return the shared tools for the agents of a chat model."""
+        key = (model_name, temperature)
+        if key not in self._tools:
+            with self._lock:
+                if key not in self._tools:
+                    self._tools[key] = build_tools(self.llm(model_name, temperature))
+        # A new list, so that callers cannot change the shared one
+        return list(self._tools[key])
+    
+    def close(self) -> None:
+        """Drop the shared objects and close the HTTP client.
+        
+        The async client's connections are closed with their event loops.
+        """
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._http_async_client = None
+            self._llms.clear()
+            self._tools.clear()
+
+
+_resources: Optional[ResourceRegistry] = None
+_resources_lock = threading.Lock()
+
+
+def get_resources() -> ResourceRegistry:
+    """Return the process-wide resource registry."""
+    global _resources
+    if _resources is None:
+        with _resources_lock:
+            if _resources is None:
+                _resources = ResourceRegistry()
+    return _resources
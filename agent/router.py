@@ -0,0 +1,234 @@
+"""Rule-based fast path for queries that need exactly one tool call.
+
+Plain weather questions ("what's the weather in Tokyo?") and bare
+arithmetic ("sqrt(144) / 3") still cost the ReAct agent two model calls:
+one to pick the tool and one to write the answer. ``FastPathRouter``
+recognizes these queries with local rules, and the executor then calls the
+tool directly and formats the answer from a template. Everything else
+falls through to the agent, as does a routed query whose tool returns an
+error.
+
+Each decision carries a confidence between 0 and 1 and is only taken at or
+above ``threshold``. Decisions are logged (logger ``agent.router``, at INFO
+for routed queries and DEBUG otherwise) and counted in ``stats()``, so the
+threshold can be tuned against ``evaluate.py``.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from os import getenv
+from typing import Any, Dict, NamedTuple, Optional
+
+from tools.embeddings import STOPWORDS
+from tools.math_engine import parse_expression
+
+logger = logging.getLogger(__name__)
+
+# Leading words of a calculation request that are not part of the expression
+_CALCULATION_PREFIX = re.compile(
+    r"^\s*(?:(?:what(?:'s| is)|how much is|calculate|compute|evaluate|solve)\s+)?",
+    re.IGNORECASE,
+)
+_OPERATOR_RE = re.compile(r"[-+*/^%×÷]|\w\s*\(")
+
+_WEATHER_PATTERNS = [
+    # "what's the weather (like) in Tokyo (right now)?", "weather in Tokyo"
+    (re.compile(
+        r"^\s*(?:(?:what(?:'s| is)|how(?:'s| is)|tell me|show me|get|check)\s+)?(?:the\s+)?"
+        r"(?:current\s+)?(?:weather|temperature)(?:\s+like)?\s+(?:right\s+now\s+)?(?:in|at|for)\s+"
+        r"(?P<location>.+?)(?:\s+like)?\s*(?:right now|now|currently|today)?\s*[?.!]*\s*$",
+        re.IGNORECASE,
+    ), 0.95),
+    # "Tokyo weather", "current weather Tokyo" (no stopwords in the location)
+    (re.compile(
+        r"^\s*(?:(?:current\s+)?(?:weather|temperature)\s+(?P<after>.+?)|(?P<before>.+?)\s+(?:current\s+)?(?:weather|temperature))"
+        r"\s*(?:right now|now|today)?\s*[?.!]*\s*$",
+        re.IGNORECASE,
+    ), 0.85),
+]
+
+# Words in a weather query that ask for more than the current weather at a place
+_WEATHER_VETO = re.compile(
+    r"\b(?:tomorrow|yesterday|forecast|week|weekend|next|last|will|should|average|historical|history|"
+    r"compare|than|why|how many|convert|fahrenheit|°f|population|who|capital)\b|\d{4}",
+    re.IGNORECASE,
+)
+
+# Units asked for alongside the place ("the temperature in Celsius in Paris");
+# the tool reports Celsius already
+_UNIT_PHRASE = re.compile(r"\b(?:in\s+)?(?:degrees\s+)?(?:celsius|centigrade|metric)\b|°c", re.IGNORECASE)
+
+# Words before or after "weather" that describe it rather than name a place
+# ("current weather", "best weather"); places with these names exist, so
+# routing them would answer for the wrong place
+_NOT_LOCATIONS = frozenset(
+    "current currently best worst good bad nice great perfect ideal typical usual local live today now "
+    "outside hot cold warm cool rainy sunny snowy windy stormy humid dry".split()
+)
+
+# A query about several places, or more than one place ("Paris and how about
+# London"); the tool only splits locations on ";" so the agent handles these
+_SEVERAL_LOCATIONS = re.compile(r"\b(?:and|or|also|versus|vs|how about|what about)\b|[&;|]", re.IGNORECASE)
+
+# Words that only make sense with the conversation so far
+_CONTEXT_WORDS = {"it", "its", "there", "here", "that", "this", "they", "them", "their"}
+
+# Longest location accepted, in words
+MAX_LOCATION_WORDS = 6
+
+
+class Route(NamedTuple):
+    """A routing decision: the tool to call, its input and the confidence."""
+    
+    tool: str
+    tool_input: str
+    confidence: float
+    reason: str
+
+
+class FastPathRouter:
+    """Local classifier for queries a single tool call can answer."""
+    
+    def __init__(self, threshold: Optional[float] = None):
+        """Initialize the router.
+        
+        Args:
+            threshold: Minimum confidence for taking the fast path (default
+                from ROUTER_THRESHOLD, or 0.8)
+        """
+        self.threshold = threshold if threshold is not None else float(getenv("ROUTER_THRESHOLD", 0.8))
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+    
+    def classify(self, query: str) -> Optional[Route]:
+        """Return the most confident route for a query, whatever the threshold."""
+        return self._calculation(query) or self._weather(query)
+    
+    def _calculation(self, query: str) -> Optional[Route]:
+        expression = _CALCULATION_PREFIX.sub("", query).strip()
+        if not _OPERATOR_RE.search(expression):
+            # A bare number (or a word) is not a calculation
+            return None
+        try:
+            parse_expression(expression)
+        except ValueError:
+            return None
+        return Route("CalculatorTool", expression.rstrip("=?").strip(), 0.99, "arithmetic expression")
+    
+    def _weather(self, query: str) -> Optional[Route]:
+        for pattern, confidence in _WEATHER_PATTERNS:
+            match = pattern.match(query)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            location = (groups.get("location") or groups.get("after") or groups.get("before") or "").strip(" ,")
+            location = _UNIT_PHRASE.sub(" ", location)
+            location = re.sub(r"^\s*(?:the|in|at|for)\s+|\s+(?:in|at|for)\s*$", "", location, flags=re.IGNORECASE)
+            location = " ".join(location.split()).strip(" ,")
+            words = location.lower().split()
+            if not words or {word.removesuffix("'s") for word in words} <= _NOT_LOCATIONS:
+                # "current weather", "best weather", "today's weather"
+                return None
+            if groups.get("location") is None and (len(words) > 3 or set(words) & STOPWORDS):
+                # "What is the weather?", "I love rainy weather"
+                return None
+            
+            reason = "current weather at a location"
+            if _WEATHER_VETO.search(query):
+                confidence, reason = 0.3, "asks for more than the current weather"
+            elif set(re.findall(r"\w+", location.lower())) & _CONTEXT_WORDS:
+                confidence, reason = 0.2, "location refers to the conversation"
+            elif _SEVERAL_LOCATIONS.search(location):
+                confidence, reason = 0.4, "may ask about several locations"
+            elif len(words) > MAX_LOCATION_WORDS:
+                confidence, reason = 0.5, "location is unusually long"
+            return Route("WeatherTool", location, confidence, reason)
+        return None
+    
+    def route(self, query: str) -> Optional[Route]:
+        """Return the route to take for a query, or None to use the agent.
+        
+        Every decision is logged and counted.
+        """
+        candidate = self.classify(query)
+        routed = candidate is not None and candidate.confidence >= self.threshold
+        if routed:
+            outcome = candidate.tool
+            logger.info(
+                "fast path: %s(%r) confidence=%.2f (%s) query=%r",
+                candidate.tool, candidate.tool_input, candidate.confidence, candidate.reason, query,
+            )
+        else:
+            outcome = "below_threshold" if candidate is not None else "agent"
+            logger.debug(
+                "agent: confidence=%.2f (%s) query=%r",
+                candidate.confidence if candidate else 0.0, candidate.reason if candidate else "no rule matched", query,
+            )
+        with self._lock:
+            self._counts[outcome] += 1
+        return candidate if routed else None
+    
+    def record_fallback(self, route: Route) -> None:
+        """Count a routed query whose tool failed, so the agent answered it."""
+        logger.info("fast path fell back to the agent: %s(%r)", route.tool, route.tool_input)
+        with self._lock:
+            self._counts["fallback"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of queries per routing outcome."""
+        with self._lock:
+            counts = dict(self._counts)
+        routed = sum(count for outcome, count in counts.items() if outcome.endswith("Tool"))
+        total = routed + counts.get("below_threshold", 0) + counts.get("agent", 0)
+        return {
+            "threshold": self.threshold,
+            "decisions": total,
+            "routed": routed,
+            "routed_rate": routed / total if total else 0.0,
+            "outcomes": counts,
+        }
+
+
+def _value(text: str, label: str) -> Optional[str]:
+    match = re.search(rf"^{label}:\s*(.+?)\s*$", text, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def format_answer(route: Route, observation: Any) -> Optional[str]:
+    """Write the final answer for a routed tool call, or None if it failed."""
+    text = str(observation).strip()
+    if not text or text.startswith("Error"):
+        return None
+    
+    if route.tool == "CalculatorTool":
+        result = text[len("Answer:"):].strip() if text.startswith("Answer:") else text
+        return f"{route.tool_input} = {result}"
+    
+    if route.tool == "WeatherTool":
+        location = re.match(r"Current weather for (.+?):", text)
+        temperature = _value(text, "Temperature")
+        if location is None or temperature is None or "N/A" in temperature:
+            # Several locations (a table) or an unexpected format: show it as is
+            return text
+        return (
+            f"The current weather in {location.group(1)}: {temperature}, feeling like "
+            f"{_value(text, 'Feels like')}, with {_value(text, 'Humidity')} humidity, "
+            f"{_value(text, 'Precipitation')} of precipitation and wind at {_value(text, 'Wind')}."
+        )
+    return text
+
+
+_router: Optional[FastPathRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> FastPathRouter:
+    """Return the process-wide fast-path router."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = FastPathRouter()
+    return _router
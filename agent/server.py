@@ -0,0 +1,374 @@
+"""Async HTTP service for the Research Assistant Agent.
+
+``AgentService`` puts the agent behind a bounded work queue served by a
+fixed number of workers on one event loop, and ``create_app`` exposes it as
+a Starlette application:
+
+- ``POST /query`` with ``{"query": ..., "timeout": seconds}`` answers with
+  JSON, or with server-sent events (the ``astream_agent`` events, then
+  ``done`` or ``error``) when the body has ``"stream": true`` or the client
+  accepts ``text/event-stream``.
+- ``GET /metrics`` exports the process metrics in the Prometheus format,
+  including the queue depth, queries in flight and rejections.
+- ``GET /health`` reports the queue state.
+
+Backpressure: a query is rejected with 429 (and a ``Retry-After`` estimate)
+when the queue is full or its client already has ``client_limit`` queries
+queued or running. Clients are identified by the ``X-Client-ID`` header, or
+else by their address. Every query has a deadline (``timeout``, capped by
+``max_timeout``): a query still queued at its deadline is dropped without
+running, and a running one is cancelled, both with 504. A streaming query
+whose client disconnects is cancelled too.
+
+Each query runs on a fresh agent from ``agent_factory``, so conversation
+memory is never shared between requests; the model and tools are shared
+through the ``ResourceRegistry``.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from os import getenv
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from langchain.agents import AgentExecutor
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .metrics import MetricsRegistry, get_metrics
+from .streaming import astream_agent
+
+# Marks the end of a job's event stream
+_END = None
+
+
+class Rejected(Exception):
+    """A query refused because of backpressure."""
+    
+    def __init__(self, reason: str, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """A query that did not finish before its deadline."""
+
+
+class Job:
+    """A query waiting for, or being run by, a worker."""
+    
+    def __init__(self, query: str, client: str, deadline: float, stream: bool):
+        self.query = query
+        self.client = client
+        self.deadline = deadline
+        self.stream = stream
+        self.enqueued_at = time.monotonic()
+        self.result: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        # Events for streaming jobs, ending with _END
+        self.events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+    
+    def cancel(self) -> None:
+        """Give up on the job, whether it is queued or running."""
+        self.cancelled = True
+        if self.task is not None:
+            self.task.cancel()
+        if not self.result.done():
+            self.result.cancel()
+
+
+class AgentService:
+    """Bounded queue of agent queries served by a pool of async workers."""
+    
+    def __init__(
+        self,
+        agent_factory: Callable[[], AgentExecutor],
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        client_limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_timeout: Optional[float] = None,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the service.
+        
+        Args:
+            agent_factory: Returns a new agent for each query
+            workers: Queries run at the same time (default from
+                SERVER_WORKERS, or 4)
+            queue_size: Queries waiting for a worker before new ones are
+                rejected (default from SERVER_QUEUE_SIZE, or 64)
+            client_limit: Queries one client may have queued or running
+                (default from SERVER_CLIENT_LIMIT, or 4)
+            timeout: Default deadline of a query in seconds (default from
+                SERVER_TIMEOUT, or 60)
+            max_timeout: Longest deadline a client may ask for (default from
+                SERVER_MAX_TIMEOUT, or 300)
+            registry: Metrics registry (default: the process-wide one)
+        """
+        self.agent_factory = agent_factory
+        self.workers = workers if workers is not None else int(getenv("SERVER_WORKERS", 4))
+        self.queue_size = queue_size if queue_size is not None else int(getenv("SERVER_QUEUE_SIZE", 64))
+        self.client_limit = client_limit if client_limit is not None else int(getenv("SERVER_CLIENT_LIMIT", 4))
+        self.timeout = timeout if timeout is not None else float(getenv("SERVER_TIMEOUT", 60))
+        self.max_timeout = max_timeout if max_timeout is not None else float(getenv("SERVER_MAX_TIMEOUT", 300))
+        self.registry = registry if registry is not None else get_metrics()
+        if self.workers < 1 or self.queue_size < 1 or self.client_limit < 1:
+            raise ValueError("workers, queue_size and client_limit must be at least 1")
+        
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._workers: list = []
+        self._clients: Counter = Counter()
+        self._running = 0
+        self.registry.register_collector("server", self._gauges)
+    
+    def _gauges(self):
+        return [
+            ("agent_server_queue_depth", {}, self._queue.qsize() if self._queue is not None else 0),
+            ("agent_server_in_flight", {}, self._running),
+        ]
+    
+    async def start(self) -> None:
+        """Start the workers (on the running event loop)."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        """Stop the workers and cancel the queries queued or running."""
+        if self._queue is None:
+            return
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._finish(self._queue.get_nowait(), error=Rejected("stopping", "The server is shutting down"))
+        self._queue = None
+        self._workers = []
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the state of the queue and workers."""
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "in_flight": self._running,
+            "clients": len(self._clients),
+        }
+    
+    def retry_after(self) -> int:
+        """Estimate the seconds until the queue has room again."""
+        histogram = self.registry.histogram("agent_server_run_seconds")
+        mean = histogram.sum / histogram.count if histogram is not None and histogram.count else 1.0
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return max(1, math.ceil(mean * (depth + 1) / self.workers))
+    
+    def _reject(self, reason: str, message: str) -> Rejected:
+        self.registry.inc("agent_server_rejected_total", labels={"reason": reason})
+        return Rejected(reason, message, self.retry_after())
+    
+    def submit(self, query: str, client: str, timeout: Optional[float] = None, stream: bool = False) -> Job:
+        """Queue a query.
+        
+        Args:
+            query: The question
+            client: Identifier of the client, for its concurrency limit
+            timeout: Seconds until the deadline (default: ``self.timeout``,
+                at most ``self.max_timeout``)
+            stream: Whether to record the run's events in ``job.events``
+        
+        Returns:
+            The queued job; await ``job.result`` for the answer
+        
+        Raises:
+            Rejected: If the service is stopped, the queue is full or the
+                client has too many queries
+        """
+        if self._queue is None:
+            raise Rejected("stopping", "The server is not running")
+        if self._clients[client] >= self.client_limit:
+            raise self._reject("client_limit", f"Client has {self.client_limit} queries in progress")
+        
+        timeout = min(timeout if timeout is not None else self.timeout, self.max_timeout)
+        job = Job(query, client, time.monotonic() + timeout, stream)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise self._reject("queue_full", f"The queue is full ({self.queue_size} queries)") from None
+        self._clients[client] += 1
+        return job
+    
+    def _finish(self, job: Job, result: Optional[Dict[str, Any]] = None, error: Optional[BaseException] = None) -> None:
+        self._clients[job.client] -= 1
+        if self._clients[job.client] <= 0:
+            del self._clients[job.client]
+        if isinstance(error, asyncio.CancelledError):
+            job.result.cancel()
+        elif error is not None:
+            if job.stream:
+                job.events.put_nowait({"type": "error", "error": str(error)})
+            if not job.result.done():
+                job.result.set_exception(error)
+        elif not job.result.done():
+            job.result.set_result(result)
+        if job.stream:
+            job.events.put_nowait(_END)
+    
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            waited = time.monotonic() - job.enqueued_at
+            self.registry.observe("agent_server_queue_wait_seconds", waited)
+            if job.cancelled:
+                self._finish(job, error=asyncio.CancelledError())
+                continue
+            remaining = job.deadline - time.monotonic()
+            if remaining <= 0:
+                self.registry.inc("agent_server_expired_total")
+                self._finish(job, error=DeadlineExceeded("Deadline passed while queued"))
+                continue
+            
+            self._running += 1
+            start = time.monotonic()
+            job.task = asyncio.ensure_future(asyncio.wait_for(self._run(job), remaining))
+            try:
+                # The job's own task, so that cancelling it leaves the worker running
+                await asyncio.wait([job.task])
+                result = job.task.result()
+                result.update(queue_seconds=round(waited, 3), run_seconds=round(time.monotonic() - start, 3))
+                self._finish(job, result)
+            except asyncio.TimeoutError:
+                self._finish(job, error=DeadlineExceeded("Deadline passed while running"))
+            except BaseException as e:
+                self._finish(job, error=e)
+                if isinstance(e, asyncio.CancelledError) and not job.cancelled:
+                    # The worker itself is being stopped
+                    job.task.cancel()
+                    raise
+            finally:
+                self._running -= 1
+                self.registry.observe("agent_server_run_seconds", time.monotonic() - start)
+    
+    async def _run(self, job: Job) -> Dict[str, Any]:
+        agent = self.agent_factory()
+        inputs = {"input": job.query}
+        if not job.stream:
+            response = await agent.ainvoke(inputs)
+            return {"answer": response["output"]}
+        
+        answer = ""
+        async for event in astream_agent(agent, inputs):
+            job.events.put_nowait(event)
+            if event["type"] == "final":
+                answer = event["output"]
+        return {"answer": answer}
+
+
+def _client_id(request: Request) -> str:
+    client = request.headers.get("x-client-id")
+    if client:
+        return client
+    return request.client.host if request.client else "unknown"
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def create_app(service: AgentService) -> Starlette:
+    """Create the Starlette application serving an ``AgentService``."""
+    registry = service.registry
+    
+    def respond(status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Response:
+        registry.inc("agent_server_responses_total", labels={"status": status})
+        return JSONResponse(body, status_code=status, headers=headers)
+    
+    async def query(request: Request) -> Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            return respond(400, {"error": "The body must be JSON"})
+        text = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            return respond(400, {"error": 'The body must have a non-empty "query"'})
+        timeout = body.get("timeout")
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            return respond(400, {"error": '"timeout" must be a positive number of seconds'})
+        stream = bool(body.get("stream")) or "text/event-stream" in request.headers.get("accept", "")
+        
+        try:
+            job = service.submit(text, _client_id(request), timeout, stream)
+        except Rejected as e:
+            status = 503 if e.reason == "stopping" else 429
+            return respond(status, {"error": str(e), "reason": e.reason}, {"Retry-After": str(e.retry_after)})
+        
+        if stream:
+            return StreamingResponse(
+                _stream(job),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        
+        try:
+            result = await job.result
+        except DeadlineExceeded as e:
+            return respond(504, {"error": str(e)})
+        except Rejected as e:
+            return respond(503, {"error": str(e), "reason": e.reason})
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        except Exception as e:
+            return respond(500, {"error": f"{type(e).__name__}: {e}"})
+        return respond(200, result)
+    
+    async def _stream(job: Job) -> AsyncIterator[str]:
+        status = 200
+        try:
+            while True:
+                event = await job.events.get()
+                if event is _END:
+                    break
+                if event["type"] == "error":
+                    status = 504 if isinstance(job.result.exception(), DeadlineExceeded) else 500
+                    yield _sse("error", event)
+                else:
+                    yield _sse(event["type"], event)
+            if status == 200:
+                yield _sse("done", job.result.result())
+        finally:
+            # The client disconnected before the end
+            if not job.result.done():
+                job.cancel()
+            registry.inc("agent_server_responses_total", labels={"status": status})
+    
+    async def metrics(request: Request) -> Response:
+        return PlainTextResponse(registry.to_prometheus(), media_type="text/plain; version=0.0.4")
+    
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok", **service.stats()})
+    
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+    
+    return Starlette(
+        routes=[
+            Route("/query", query, methods=["POST"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
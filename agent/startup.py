@@ -0,0 +1,116 @@
+"""Startup-time profile for the entry points.
+
+``main.py --profile-startup`` (and ``streamlit run app.py --
+--profile-startup``) report where a cold start goes: the time of each
+startup phase and how much of it was spent importing modules, and the
+import time of each top-level package. Import times are measured by wrapping
+``builtins.__import__`` while a phase runs; each import is charged its own
+time, without the nested imports of other modules, so the per-package times
+add up to the time spent importing.
+
+For a module-level view, run ``python -X importtime main.py ...``.
+"""
+
+import builtins
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+
+class StartupProfile:
+    """Times startup phases and the imports they trigger."""
+    
+    def __init__(self, enabled: bool = True):
+        """Initialize the profile.
+        
+        Args:
+            enabled: Whether to measure anything; a disabled profile costs
+                nothing, so entry points can always use one
+        """
+        self.enabled = enabled
+        self.phases: List[Dict[str, Any]] = []
+        self.import_ms: Counter = Counter()
+        self._phase_import_ms = 0.0
+        # [own time so far, time of nested imports] per import in progress
+        self._stack: List[List[float]] = []
+    
+    def _timed_import(self, original):
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level and globals:
+                package = (globals.get("__package__") or "").split(".")[0]
+            else:
+                package = name.split(".")[0]
+            start = time.perf_counter()
+            self._stack.append([0.0])
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                nested = self._stack.pop()[0]
+                elapsed = time.perf_counter() - start
+                self.import_ms[package] += (elapsed - nested) * 1000
+                if self._stack:
+                    self._stack[-1][0] += elapsed
+                else:
+                    self._phase_import_ms += elapsed * 1000
+        return timed_import
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a startup phase and the imports it triggers."""
+        if not self.enabled:
+            yield
+            return
+        
+        original = builtins.__import__
+        builtins.__import__ = self._timed_import(original)
+        modules = len(sys.modules)
+        self._phase_import_ms = 0.0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            builtins.__import__ = original
+            self.phases.append({
+                "name": name,
+                "ms": elapsed_ms,
+                "import_ms": min(self._phase_import_ms, elapsed_ms),
+                "modules": len(sys.modules) - modules,
+            })
+    
+    def total_ms(self) -> float:
+        """Return the time of all phases."""
+        return sum(phase["ms"] for phase in self.phases)
+    
+    def total_import_ms(self) -> float:
+        """Return the time all phases spent importing modules."""
+        return sum(phase["import_ms"] for phase in self.phases)
+    
+    def report(self, top: int = 10) -> str:
+        """Return the profile as a text table.
+        
+        Args:
+            top: Number of packages listed by import time
+        """
+        lines = [f"Startup profile:{'total':>25}{'import':>13}{'init':>13}"]
+        for phase in self.phases:
+            lines.append(
+                f"  {phase['name']:<26} {phase['ms']:9.1f} ms {phase['import_ms']:9.1f} ms "
+                f"{phase['ms'] - phase['import_ms']:9.1f} ms  ({phase['modules']} modules loaded)"
+            )
+        total, imports = self.total_ms(), self.total_import_ms()
+        lines.append(f"  {'total':<26} {total:9.1f} ms {imports:9.1f} ms {total - imports:9.1f} ms")
+        
+        packages = [(package, ms) for package, ms in self.import_ms.most_common(top) if ms >= 0.1]
+        if packages:
+            lines.append("Import time by package:")
+            for package, ms in packages:
+                lines.append(f"  {package:<26} {ms:9.1f} ms")
+        return "\n".join(lines)
+    
+    def print_report(self, file: Optional[TextIO] = None) -> None:
+        """Print the report (to stderr by default), if profiling is enabled."""
+        if self.enabled:
+            print(self.report(), file=file or sys.stderr, flush=True)
@@ -0,0 +1,158 @@
+"""Streaming execution of the Research Assistant Agent.
+
+``invoke`` only returns once the final answer is complete. The functions
+here run the agent on its event stream (``astream_events``) instead and
+yield simplified events as soon as they happen:
+
+- ``{"type": "tool_start", "tool": name, "input": tool_input}``
+- ``{"type": "tool_end", "tool": name, "output": observation}``
+- ``{"type": "token", "text": text}`` for each piece of the final answer
+- ``{"type": "final", "output": answer}`` once the run has finished
+
+The ReAct agent writes its reasoning and the answer into the same
+completion, so only the text after the "Final Answer:" marker is streamed
+as tokens. Tool-calling agents answer in plain content, which is streamed
+as is.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain.agents import AgentExecutor
+
+from .parallel import ParallelAgentExecutor
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# Sentinel marking the end of a stream handed between threads
+_DONE = object()
+
+
+class FinalAnswerFilter:
+    """Extract the final answer from the tokens of a ReAct completion.
+    
+    Tokens are buffered until the marker has been seen, which may be split
+    across several tokens; everything after it is passed through.
+    """
+    
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER):
+        """Initialize the filter."""
+        self.marker = marker
+        self.buffer = ""
+        self.found = False
+    
+    def feed(self, text: str) -> str:
+        """Add a token and return the part of it that belongs to the answer."""
+        if self.found:
+            return text
+        
+        self.buffer += text
+        index = self.buffer.find(self.marker)
+        if index < 0:
+            return ""
+        self.found = True
+        answer = self.buffer[index + len(self.marker):].lstrip()
+        self.buffer = ""
+        return answer
+
+
+def _final_answer_marker(agent_executor: AgentExecutor) -> Optional[str]:
+    """Return the marker preceding the answer, or None if content is the answer."""
+    if isinstance(agent_executor, ParallelAgentExecutor):
+        return None
+    return FINAL_ANSWER_MARKER
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Return the text of a chat or completion model stream chunk."""
+    content = getattr(chunk, "content", None)
+    if content is None:
+        content = getattr(chunk, "text", chunk)
+    if isinstance(content, list):
+        # Content blocks, e.g. [{"type": "text", "text": "..."}]
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return content if isinstance(content, str) else ""
+
+
+async def astream_agent(
+    agent_executor: AgentExecutor,
+    inputs: Dict[str, Any],
+    config: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run the agent and yield tool calls, observations and answer tokens.
+    
+    Args:
+        agent_executor: The agent to run
+        inputs: Agent inputs, e.g. ``{"input": question}``
+        config: Optional runnable config (callbacks, tags, ...)
+    
+    Returns:
+        An async iterator of event dicts (see the module docstring)
+    """
+    marker = _final_answer_marker(agent_executor)
+    filters: Dict[str, FinalAnswerFilter] = {}
+    
+    async for event in agent_executor.astream_events(inputs, config=config, version="v2"):
+        kind = event["event"]
+        
+        if kind in ("on_chat_model_stream", "on_llm_stream"):
+            text = _chunk_text(event["data"].get("chunk"))
+            if not text:
+                continue
+            if marker is not None:
+                # One filter per model call, since each call is a new completion
+                text_filter = filters.setdefault(event["run_id"], FinalAnswerFilter(marker))
+                text = text_filter.feed(text)
+            if text:
+                yield {"type": "token", "text": text}
+            
+        elif kind == "on_tool_start":
+            yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+            
+        elif kind == "on_tool_end":
+            output = event["data"].get("output")
+            yield {"type": "tool_end", "tool": event["name"], "output": getattr(output, "content", output)}
+            
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"].get("output") or {}
+            yield {"type": "final", "output": output.get("output", "") if isinstance(output, dict) else str(output)}
+
+
+def stream_agent(
+    agent_executor: AgentExecutor,
+    inputs: Dict[str, Any],
+    config: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Synchronous version of ``astream_agent`` for the CLI and Streamlit.
+    
+    The event stream runs on its own event loop in a background thread and
+    events are handed over through a queue as they are produced.
+    """
+    events: "queue.Queue[Any]" = queue.Queue()
+    
+    async def produce() -> None:
+        try:
+            async for event in astream_agent(agent_executor, inputs, config):
+                events.put(event)
+        except BaseException as e:
+            events.put(e)
+        finally:
+            events.put(_DONE)
+    
+    thread = threading.Thread(target=asyncio.run, args=(produce(),), daemon=True)
+    thread.start()
+    try:
+        while True:
+            event = events.get()
+            if event is _DONE:
+                break
+            if isinstance(event, BaseException):
+                raise event
+            yield event
+    finally:
+        thread.join(timeout=0.1)
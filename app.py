@@ -4,11 +4,35 @@ Streamlit web interface for the Research Assistant Agent.
 """
 
 import os
+import sys
 import time
+from typing import TYPE_CHECKING
 import streamlit as st
 from dotenv import load_dotenv
 
-from agent import create_research_agent
+from agent.startup import StartupProfile
+
+if TYPE_CHECKING:
+    from agent.resources import ResourceRegistry
+
+# streamlit run app.py -- --profile-startup
+PROFILE_STARTUP = "--profile-startup" in sys.argv[1:]
+
+
+@st.cache_resource
+def load_resources(model_name: str) -> "ResourceRegistry":
+    """Build the model and tools once per server process, for all sessions."""
+    profile = StartupProfile(enabled=PROFILE_STARTUP)
+    with profile.phase("import agent"):
+        from agent.llm_cache import enable_llm_cache
+        from agent.resources import get_resources
+    with profile.phase("LLM cache"):
+        enable_llm_cache()
+    with profile.phase("model and tools"):
+        resources = get_resources()
+        resources.tools(model_name)
+    profile.print_report()
+    return resources
 
 
 def initialize():
@@ -29,13 +53,16 @@ def initialize():
         st.info("Please set it in your environment or in a .env file.")
         st.stop()
     
-    # Create the agent if it doesn't exist in session state
+    # Create the agent if it doesn't exist in session state; only its memory
+    # and executor are per session, the model and tools are shared
     if "agent" not in st.session_state:
         with st.spinner("Initializing Research Assistant Agent..."):
+            from agent import create_research_agent
             model_name = os.getenv("MODEL_NAME", "gpt-4o")
             st.session_state.agent = create_research_agent(
                 model_name=model_name,
-                verbose=False
+                verbose=False,
+                resources=load_resources(model_name)
             )
             st.session_state.model_name = model_name
     
@@ -74,24 +101,48 @@ def main():
         
         # Generate response
         with st.chat_message("assistant"):
+            steps = st.status("Thinking...", expanded=False)
             message_placeholder = st.empty()
-            message_placeholder.markdown("Thinking...")
             
             try:
+                from agent.streaming import stream_agent
                 start_time = time.time()
-                response = st.session_state.agent.invoke({"input": prompt})
+                first_token_time = None
+                answer = ""
+                
+                # Show tool calls as they happen and the answer as it is written
+                for event in stream_agent(st.session_state.agent, {"input": prompt}):
+                    if event["type"] == "tool_start":
+                        steps.update(label=f"Using {event['tool']}...")
+                        steps.markdown(f"**{event['tool']}**: `{event['input']}`")
+                    elif event["type"] == "tool_end":
+                        steps.text(str(event["output"])[:500])
+                    elif event["type"] == "token":
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                        answer += event["text"]
+                        message_placeholder.markdown(answer + "▌")
+                    elif event["type"] == "final":
+                        answer = event["output"] or answer
                 end_time = time.time()
                 
-                answer = response["output"]
                 execution_time = end_time - start_time
+                steps.update(label="Done", state="complete")
                 
                 message_placeholder.markdown(answer)
-                st.caption(f"Response time: {execution_time:.2f} seconds")
+                if first_token_time is not None:
+                    st.caption(
+                        f"Response time: {execution_time:.2f} seconds "
+                        f"(first token after {first_token_time - start_time:.2f} seconds)"
+                    )
+                else:
+                    st.caption(f"Response time: {execution_time:.2f} seconds")
                 
                 # Add assistant message to chat history
                 st.session_state.messages.append({"role": "assistant", "content": answer})
                 
             except Exception as e:
+                steps.update(label="Failed", state="error")
                 message_placeholder.markdown(f"Error: {str(e)}")
                 st.session_state.messages.append({"role": "assistant", "content": f"Error: {str(e)}"})
     
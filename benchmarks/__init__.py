@@ -0,0 +1,16 @@
+"""Offline benchmarks for the Research Assistant Agent.
+
+The suite measures the overhead of the agent framework itself (prompt
+assembly, output parsing, tool dispatch, caching and HTTP handling)
+without OpenAI or network latency: a scripted chat model replays ReAct
+transcripts and a local stub server stands in for the Wikipedia and
+Open-Meteo APIs.
+
+Usage:
+    python -m benchmarks.run --output benchmark_results.json
+"""
+
+from .fake_llm import ScriptedChatModel
+from .stub_server import StubServer
+
+__all__ = ["ScriptedChatModel", "StubServer"]
@@ -0,0 +1,134 @@
+"""Deterministic chat model that replays scripted ReAct transcripts."""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+_ACTION_RE = re.compile(r"^Action:\s*(.+?)\s*\nAction Input:\s*(.*?)\s*$", re.MULTILINE)
+_FINAL_RE = re.compile(r"Final Answer:\s*(.*)", re.DOTALL)
+
+
+def react_step(tool: str, tool_input: str, thought: str = "I should use a tool") -> str:
+    """Return one ReAct completion that calls a tool."""
+    return f"Thought: {thought}\nAction: {tool}\nAction Input: {tool_input}"
+
+
+def react_final(answer: str) -> str:
+    """Return the ReAct completion that ends a run."""
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+def tool_call_message(response: str, tools: Sequence[Dict[str, Any]], call_id: str) -> AIMessage:
+    """Turn a ReAct completion into the equivalent native tool-call message.
+    
+    Each "Action:"/"Action Input:" pair becomes one tool call, with the input
+    passed as the tool's first parameter; a completion without actions
+    becomes a plain answer.
+    
+    Args:
+        response: Scripted ReAct completion
+        tools: Bound tools in OpenAI format
+        call_id: Prefix for the tool call IDs
+    
+    Returns:
+        The AIMessage a tool-calling model would have returned
+    """
+    parameters = {
+        tool["function"]["name"]: list(tool["function"].get("parameters", {}).get("properties", {}))
+        for tool in tools
+    }
+    tool_calls = []
+    for i, (name, tool_input) in enumerate(_ACTION_RE.findall(response)):
+        fields = parameters.get(name) or ["query"]
+        tool_calls.append({"name": name, "args": {fields[0]: tool_input}, "id": f"{call_id}_{i}"})
+    if tool_calls:
+        return AIMessage(content="", tool_calls=tool_calls)
+    
+    final = _FINAL_RE.search(response)
+    return AIMessage(content=final.group(1).strip() if final else response)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that returns scripted responses in order.
+    
+    After the last response the script starts over, so one model can serve
+    any number of repetitions of the same transcript. An optional fixed
+    latency stands in for model time when a realistic total is wanted.
+    
+    Once tools are bound (as ``create_tool_calling_agent`` does), the same
+    ReAct script is replayed as native tool-call messages, so one transcript
+    drives both agent types.
+    """
+    
+    responses: List[str]
+    # Seconds to wait before each response
+    latency: float = 0.0
+    
+    _position: int = PrivateAttr(default=0)
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+    
+    @property
+    def calls(self) -> int:
+        """Number of responses returned so far."""
+        return self._calls
+    
+    def reset(self) -> None:
+        """Restart the script from the first response."""
+        with self._lock:
+            self._position = 0
+    
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        """Bind tools so that scripted actions come back as tool calls."""
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+    
+    def _next_response(self) -> Tuple[int, str]:
+        with self._lock:
+            index = self._position % len(self.responses)
+            self._position += 1
+            self._calls += 1
+            return index, self.responses[index]
+    
+    def _next_message(self, tools: Optional[Sequence[Dict[str, Any]]]) -> ChatResult:
+        index, response = self._next_response()
+        if tools:
+            # IDs follow the script position, so repeated runs send identical prompts
+            message = tool_call_message(response, tools, f"call_{index}")
+        else:
+            message = AIMessage(content=response)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next_message(kwargs.get("tools"))
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._next_message(kwargs.get("tools"))
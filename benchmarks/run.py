@@ -0,0 +1,342 @@
+"""Offline benchmark runners for the Research Assistant Agent.
+
+Runs the agent against a scripted chat model and a local stub server, so
+timings reflect the framework (prompt assembly, parsing, tool dispatch,
+caching, HTTP handling) rather than OpenAI or network latency:
+
+- ``cold_start``: importing the agent and building it, in a fresh process
+- ``single``: one ReAct query with one Wikipedia lookup
+- ``loop``: one query with N tool steps before the final answer
+- ``concurrent``: many queries at once on a thread pool
+
+Usage:
+    python -m benchmarks.run --output benchmark_results.json
+    python -m benchmarks.run --suites single loop --steps 10 --latency 0.05
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from agent.metrics import percentile
+
+from .fake_llm import ScriptedChatModel, react_final, react_step
+from .stub_server import StubServer
+
+SUITES = ("cold_start", "single", "loop", "concurrent")
+
+# Tool calls cycled through by the multi-step transcript
+LOOP_ACTIONS = [
+    ("WikipediaTool", "Microsoft"),
+    ("WeatherTool", "Tokyo"),
+    ("CalculatorTool", "15^2 + 27"),
+]
+
+COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from agent import create_research_agent
+from benchmarks.fake_llm import ScriptedChatModel
+imported = time.perf_counter()
+create_research_agent(llm=ScriptedChatModel(responses=["Final Answer: ok"]))
+created = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_ms": (created - imported) * 1000}))
+"""
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize_ms(samples: Sequence[float]) -> Dict[str, float]:
+    """Summarize timings given in milliseconds."""
+    return {
+        "runs": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+        "min_ms": round(min(samples), 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3) if samples else 0.0,
+    }
+
+
+def single_transcript() -> List[str]:
+    """ReAct transcript of a query answered with one Wikipedia lookup."""
+    return [react_step("WikipediaTool", "Microsoft"), react_final("Satya Nadella is the CEO of Microsoft.")]
+
+
+def loop_transcript(steps: int) -> List[str]:
+    """ReAct transcript with ``steps`` tool calls before the final answer."""
+    responses = [react_step(*LOOP_ACTIONS[i % len(LOOP_ACTIONS)]) for i in range(steps)]
+    return responses + [react_final("Done.")]
+
+
+@contextlib.contextmanager
+def offline_environment(server: StubServer) -> Iterator[Dict[str, str]]:
+    """Point the tools at the stub server and keep caches in a temporary directory."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        overrides = {
+            **server.env(),
+            "CACHE_DIR": cache_dir,
+            "WIKIPEDIA_CACHE_PATH": "",
+            "GEOCODE_CACHE_PATH": "",
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-offline-benchmark"),
+            "NO_PROXY": ",".join(filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"])),
+        }
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            yield overrides
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def make_agent(responses: List[str], llm_latency: float = 0.0, agent_type: Optional[str] = None):
+    """Build a fresh agent (new memory and tool caches) driven by a script."""
+    from agent import create_research_agent
+    from tools.weather_cache import get_weather_cache
+    
+    get_weather_cache().clear()
+    llm = ScriptedChatModel(responses=responses, latency=llm_latency)
+    return create_research_agent(llm=llm, verbose=False, agent_type=agent_type)
+
+
+def run_cold_start(repeat: int, env: Dict[str, str]) -> Dict[str, Any]:
+    """Time importing and building the agent in fresh interpreter processes."""
+    import_ms, create_ms, process_ms = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            cwd=ROOT_DIR,
+            env={**os.environ, **env},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        process_ms.append((time.perf_counter() - start) * 1000)
+        timings = json.loads(output.strip().splitlines()[-1])
+        import_ms.append(timings["import_ms"])
+        create_ms.append(timings["create_ms"])
+    
+    return {
+        "import": summarize_ms(import_ms),
+        "create_agent": summarize_ms(create_ms),
+        "process": summarize_ms(process_ms),
+    }
+
+
+def _timed_runs(
+    responses: List[str],
+    repeat: int,
+    server: StubServer,
+    llm_latency: float,
+    agent_type: Optional[str],
+) -> Dict[str, Any]:
+    """Invoke a fresh agent ``repeat`` times and time each invocation."""
+    samples = []
+    requests_before = server.total_requests()
+    for _ in range(repeat):
+        agent = make_agent(responses, llm_latency, agent_type)
+        start = time.perf_counter()
+        agent.invoke({"input": "benchmark query"})
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        "latency": summarize_ms(samples),
+        "http_requests_per_run": (server.total_requests() - requests_before) / repeat if repeat else 0.0,
+    }
+
+
+def run_single(repeat: int, server: StubServer, llm_latency: float = 0.0, agent_type: Optional[str] = None) -> Dict[str, Any]:
+    """Time a single-tool query end to end."""
+    return _timed_runs(single_transcript(), repeat, server, llm_latency, agent_type)
+
+
+def run_loop(
+    steps: int,
+    repeat: int,
+    server: StubServer,
+    llm_latency: float = 0.0,
+    agent_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Time a query with ``steps`` tool calls and derive the cost per step."""
+    result = _timed_runs(loop_transcript(steps), repeat, server, llm_latency, agent_type)
+    result["steps"] = steps
+    result["per_step_ms"] = round(result["latency"]["p50_ms"] / max(steps, 1), 3)
+    return result
+
+
+def run_concurrent(
+    workers: int,
+    queries: int,
+    server: StubServer,
+    llm_latency: float = 0.0,
+    agent_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run many single-tool queries at once and measure throughput."""
+    agents = [make_agent(single_transcript(), llm_latency, agent_type) for _ in range(queries)]
+    
+    def run(agent) -> float:
+        start = time.perf_counter()
+        agent.invoke({"input": "benchmark query"})
+        return (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        samples = list(executor.map(run, agents))
+    wall_time = time.perf_counter() - start
+    
+    return {
+        "workers": workers,
+        "queries": queries,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_qps": round(queries / wall_time, 2) if wall_time else 0.0,
+        "latency": summarize_ms(samples),
+    }
+
+
+@contextlib.contextmanager
+def suite_llm_cache(enabled: bool, cache_dir: str, suite: str) -> Iterator[Optional[Any]]:
+    """Give one suite its own empty completion cache, or none at all.
+    
+    Suites share prompts (the loop transcript starts like the single one), so
+    a shared cache would replay one suite's answers in another.
+    
+    Args:
+        enabled: Whether to cache completions
+        cache_dir: Directory for the suite's cache file
+        suite: Suite name, used for the file name
+    
+    Yields:
+        The installed cache, or None if caching is disabled
+    """
+    from langchain_core.globals import get_llm_cache, set_llm_cache
+    from agent.llm_cache import SQLiteLLMCache, enable_llm_cache
+    
+    previous_cache = get_llm_cache()
+    cache = SQLiteLLMCache(os.path.join(cache_dir, f"llm_cache_{suite}.sqlite")) if enabled else None
+    enable_llm_cache(enabled, cache)
+    try:
+        yield cache
+    finally:
+        set_llm_cache(previous_cache)
+
+
+def run_benchmarks(
+    suites: Sequence[str] = SUITES,
+    repeat: int = 20,
+    steps: int = 5,
+    workers: int = 8,
+    queries: int = 64,
+    latency: float = 0.0,
+    llm_latency: float = 0.0,
+    agent_type: Optional[str] = None,
+    llm_cache: bool = False,
+) -> Dict[str, Any]:
+    """Run the selected benchmark suites and return their results.
+    
+    Args:
+        suites: Names of the suites to run (see ``SUITES``)
+        repeat: Runs per suite for cold start, single and loop
+        steps: Tool steps in the loop suite
+        workers: Threads used by the concurrent suite
+        queries: Queries run by the concurrent suite
+        latency: Seconds the stub server delays each HTTP request
+        llm_latency: Seconds the scripted model waits before each response
+        agent_type: Agent type passed to ``create_research_agent``
+        llm_cache: Whether repeated prompts are answered from an LLM
+            completion cache (a new one per suite); off by default so every
+            run measures the full loop
+    
+    Returns:
+        A JSON-serializable dict of parameters, environment and results
+    """
+    results: Dict[str, Any] = {}
+    with StubServer(latency=latency) as server, offline_environment(server) as env:
+        if "cold_start" in suites:
+            results["cold_start"] = run_cold_start(max(1, min(repeat, 5)), env)
+        runners = {
+            "single": lambda: run_single(repeat, server, llm_latency, agent_type),
+            "loop": lambda: run_loop(steps, repeat, server, llm_latency, agent_type),
+            "concurrent": lambda: run_concurrent(workers, queries, server, llm_latency, agent_type),
+        }
+        for suite, runner in runners.items():
+            if suite not in suites:
+                continue
+            with suite_llm_cache(llm_cache, env["CACHE_DIR"], suite) as cache:
+                results[suite] = runner()
+            if cache is not None:
+                results[suite]["llm_cache"] = cache.stats()
+        stub_requests = dict(server.requests)
+    
+    return {
+        "parameters": {
+            "suites": list(suites),
+            "repeat": repeat,
+            "steps": steps,
+            "workers": workers,
+            "queries": queries,
+            "http_latency_s": latency,
+            "llm_latency_s": llm_latency,
+            "agent_type": agent_type or os.getenv("AGENT_TYPE", "react"),
+            "llm_cache": llm_cache,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "stub_requests": stub_requests,
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks from the command line and print JSON results."""
+    parser = argparse.ArgumentParser(description="Offline Research Assistant benchmarks")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES), help="Suites to run")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per suite")
+    parser.add_argument("--steps", type=int, default=5, help="Tool steps in the loop suite")
+    parser.add_argument("--workers", type=int, default=8, help="Threads in the concurrent suite")
+    parser.add_argument("--queries", type=int, default=64, help="Queries in the concurrent suite")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server delay per request in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Scripted model delay per call in seconds")
+    parser.add_argument("--agent-type", choices=["react", "tool_calling"], default=None, help="Agent type")
+    parser.add_argument("--llm-cache", action="store_true", help="Answer repeated prompts from a per-suite completion cache")
+    parser.add_argument("--output", type=str, help="File to write the JSON results to")
+    args = parser.parse_args(argv)
+    
+    results = run_benchmarks(
+        suites=args.suites,
+        repeat=args.repeat,
+        steps=args.steps,
+        workers=args.workers,
+        queries=args.queries,
+        latency=args.latency,
+        llm_latency=args.llm_latency,
+        agent_type=args.agent_type,
+        llm_cache=args.llm_cache,
+    )
+    
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
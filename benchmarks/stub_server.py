@@ -0,0 +1,180 @@
+"""Local stand-in for the Wikipedia and Open-Meteo HTTP APIs.
+
+Serves just enough of each API for the tools to work end to end:
+
+- ``/w/api.php``: MediaWiki ``generator=search`` and ``titles`` queries and
+  ``action=parse`` link lists (``formatversion=2``)
+- ``/v1/search``: Open-Meteo geocoding
+- ``/v1/forecast``: Open-Meteo current weather, including comma-separated
+  batches of coordinates
+
+Answers are derived deterministically from the request, and every request
+can be delayed by a fixed latency to emulate a remote server.
+"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+def _wikipedia_response(params: Dict[str, str]) -> Dict[str, Any]:
+    if params.get("action") == "parse":
+        title = params.get("page", "Main Page")
+        return {"parse": {"title": title, "links": [{"ns": 0, "title": f"{title} (Topic)", "exists": True}]}}
+    
+    query = params.get("gsrsearch") or params.get("titles") or ""
+    title = query.strip().title() or "Main Page"
+    return {
+        "batchcomplete": True,
+        "query": {
+            "pages": [{
+                "pageid": zlib.crc32(title.encode("utf-8")),
+                "ns": 0,
+                "title": title,
+                "index": 1,
+                "extract": f"{title} is the subject of this stub article used by the offline benchmarks.",
+                "fullurl": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+            }],
+        },
+    }
+
+
+def _geocoding_response(params: Dict[str, str]) -> Dict[str, Any]:
+    name = params.get("name", "").strip()
+    if not name:
+        return {"generationtime_ms": 0.1}
+    seed = zlib.crc32(name.lower().encode("utf-8"))
+    return {
+        "results": [{
+            "name": name.title(),
+            "country": "Stubland",
+            "latitude": round((seed % 18000) / 100 - 90, 4),
+            "longitude": round((seed // 18000 % 36000) / 100 - 180, 4),
+        }],
+    }
+
+
+def _observation(lat: str, lon: str) -> Dict[str, Any]:
+    seed = zlib.crc32(f"{lat},{lon}".encode("utf-8"))
+    return {
+        "latitude": float(lat),
+        "longitude": float(lon),
+        "utc_offset_seconds": 0,
+        "current": {
+            "time": time.strftime("%Y-%m-%dT%H:%M", time.gmtime(time.time() // 900 * 900)),
+            "interval": 900,
+            "temperature_2m": round(seed % 400 / 10 - 10, 1),
+            "relative_humidity_2m": seed % 100,
+            "apparent_temperature": round(seed % 400 / 10 - 12, 1),
+            "precipitation": 0.0,
+            "wind_speed_10m": round(seed % 300 / 10, 1),
+            "wind_direction_10m": seed % 360,
+        },
+    }
+
+
+def _forecast_response(params: Dict[str, str]) -> Any:
+    latitudes = params.get("latitude", "0").split(",")
+    longitudes = params.get("longitude", "0").split(",")
+    observations = [_observation(lat, lon) for lat, lon in zip(latitudes, longitudes)]
+    return observations if len(observations) > 1 else observations[0]
+
+
+ROUTES = {
+    "/w/api.php": _wikipedia_response,
+    "/v1/search": _geocoding_response,
+    "/v1/forecast": _forecast_response,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path)
+        self.server.stub.record(url.path)
+        if self.server.stub.latency:
+            time.sleep(self.server.stub.latency)
+        
+        if route is None:
+            status, payload = 404, {"error": f"No stub for {url.path}"}
+        else:
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = 200, route(params)
+        
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class StubServer:
+    """Threaded local HTTP server emulating the tools' upstream APIs."""
+    
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """Initialize the server.
+        
+        Args:
+            latency: Seconds each request is delayed by
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+        """
+        self.latency = latency
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing the tools at this server."""
+        return {
+            "WIKIPEDIA_API_URL": f"{self.url}/w/api.php",
+            "OPEN_METEO_GEOCODING_URL": f"{self.url}/v1/search",
+            "OPEN_METEO_FORECAST_URL": f"{self.url}/v1/forecast",
+        }
+    
+    def record(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+    
+    def total_requests(self) -> int:
+        """Number of requests served so far."""
+        with self._lock:
+            return sum(self.requests.values())
+    
+    def start(self) -> "StubServer":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop the server and close its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def __enter__(self) -> "StubServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
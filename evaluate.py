@@ -3,14 +3,22 @@
 Evaluation script for the Research Assistant Agent.
 
 This script evaluates the agent on a set of predefined queries and measures its performance.
+Queries run concurrently, each on its own agent with an isolated conversation memory.
 """
 
 import os
 import json
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
 from dotenv import load_dotenv
 
-from agent import create_research_agent
+from agent import create_research_agent, get_metrics
+from agent.llm_cache import enable_llm_cache
+from agent.metrics import MetricsCallbackHandler, MetricsRegistry, percentile
 
 
 # Test queries with expected tool usage
@@ -58,138 +66,224 @@ TEST_QUERIES = [
 ]
 
 
-class ToolTracker:
-    """Track which tools are called during agent execution."""
+def tool_metrics(registry: MetricsRegistry) -> Dict[str, List[float]]:
+    """Return the latency of every tool call recorded in a registry, by tool."""
+    latencies = {}
+    for labels in registry.series("agent_tool_latency_seconds"):
+        latencies[labels["tool"]] = list(registry.histogram("agent_tool_latency_seconds", labels).recent)
+    return latencies
+
+
+def evaluate_query(test_case: Dict[str, Any], model_name: str, agent_type: Optional[str] = None) -> Dict[str, Any]:
+    """Run one test query on a fresh agent and return its result record."""
+    query = test_case["query"]
+    expected_tools = test_case["expected_tools"]
+    
+    # A new agent per query keeps conversation memory isolated between queries
+    agent_executor = create_research_agent(model_name=model_name, verbose=False, agent_type=agent_type)
+    # Per-query registry, on top of the process-wide one the agent reports to
+    query_metrics = MetricsRegistry()
+    
+    start_time = time.perf_counter()
+    try:
+        response = agent_executor.invoke({"input": query}, config={"callbacks": [MetricsCallbackHandler(query_metrics)]})
+        answer, error = response["output"], None
+    except Exception as e:
+        answer, error = "", str(e)
+    execution_time = time.perf_counter() - start_time
+    
+    tool_latencies = tool_metrics(query_metrics)
+    called_tools = set(tool_latencies)
+    return {
+        "query": query,
+        "expected_tools": expected_tools,
+        "called_tools": sorted(called_tools),
+        "used_expected_tools": all(tool in called_tools for tool in expected_tools),
+        "used_tool": len(called_tools) > 0,
+        "execution_time": execution_time,
+        "tool_latencies": tool_latencies,
+        "answer": answer,
+        "error": error,
+    }
+
+
+def summarize(results: List[Dict[str, Any]], wall_time: float, workers: int) -> Dict[str, Any]:
+    """Aggregate per-query results into the evaluation summary."""
+    total_queries = len(results)
+    times = [r["execution_time"] for r in results]
+    exact_tool_matches = sum(1 for r in results if r["used_expected_tools"])
+    tool_usage_count = sum(1 for r in results if r["used_tool"])
+    
+    tool_samples: Dict[str, List[float]] = {}
+    for r in results:
+        for tool, latencies in r["tool_latencies"].items():
+            tool_samples.setdefault(tool, []).extend(latencies)
+    tool_latency = {
+        tool: {
+            "calls": len(samples),
+            "mean": sum(samples) / len(samples),
+            "p50": percentile(samples, 50),
+            "p90": percentile(samples, 90),
+            "max": max(samples),
+            "total": sum(samples),
+        }
+        for tool, samples in sorted(tool_samples.items())
+    }
+    
+    return {
+        "total_queries": total_queries,
+        "workers": workers,
+        "errors": sum(1 for r in results if r["error"]),
+        "exact_tool_matches": exact_tool_matches,
+        "exact_tool_match_percentage": exact_tool_matches / total_queries * 100 if total_queries else 0.0,
+        "queries_with_tool_usage": tool_usage_count,
+        "tool_usage_percentage": tool_usage_count / total_queries * 100 if total_queries else 0.0,
+        "median_execution_time": percentile(times, 50),
+        "average_execution_time": sum(times) / total_queries if total_queries else 0.0,
+        "p50_execution_time": percentile(times, 50),
+        "p90_execution_time": percentile(times, 90),
+        "p99_execution_time": percentile(times, 99),
+        "wall_time": wall_time,
+        "throughput_qpm": total_queries / wall_time * 60 if wall_time else 0.0,
+        "tool_latency": tool_latency,
+    }
+
+
+def run_evaluation(
+    queries: List[Dict[str, Any]],
+    model_name: str,
+    workers: int = 4,
+    agent_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run the queries on a pool of workers and return results plus summary.
+    
+    Args:
+        queries: Test cases with "query" and "expected_tools"
+        model_name: The OpenAI model to evaluate
+        workers: Number of queries run at the same time
+        agent_type: Agent type passed to ``create_research_agent``
     
-    def __init__(self):
-        """Initialize the tool tracker."""
-        self.called_tools = set()
+    Returns:
+        A dict with per-query "results" (in input order) and a "summary"
+    """
+    total_queries = len(queries)
+    print(f"\nEvaluating agent on {total_queries} queries with {workers} workers...\n")
     
-    def track_tool(self, tool_name):
-        """Track a tool call."""
-        self.called_tools.add(tool_name)
+    def run(indexed_case):
+        i, test_case = indexed_case
+        result = evaluate_query(test_case, model_name, agent_type)
+        print_result(i, total_queries, result)
+        return result
     
-    def get_called_tools(self):
-        """Get the set of called tools."""
-        return self.called_tools
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(run, enumerate(queries)))
+    wall_time = time.perf_counter() - start_time
+    
+    return {
+        "results": results,
+        "summary": summarize(results, wall_time, workers),
+        "metrics": get_metrics().snapshot(),
+    }
+
+
+_print_lock = threading.Lock()
+
+
+def print_result(i: int, total_queries: int, result: Dict[str, Any]) -> None:
+    """Print the result of one query without interleaving with other workers."""
+    answer = result["answer"]
+    with _print_lock:
+        print(f"Query {i+1}/{total_queries}: {result['query']}")
+        print(f"  Tools called: {', '.join(result['called_tools'])}")
+        print(f"  Expected tools: {', '.join(result['expected_tools'])}")
+        print(f"  Used expected tools: {'Yes' if result['used_expected_tools'] else 'No'}")
+        print(f"  Execution time: {result['execution_time']:.2f} seconds")
+        if result["error"]:
+            print(f"  Error: {result['error']}")
+        else:
+            print(f"  Answer: {answer[:100]}..." if len(answer) > 100 else f"  Answer: {answer}")
+        print()
 
 
-def patch_tools_for_tracking(agent_executor, tracker):
-    """Patch the tools to track which ones are called."""
-    for tool in agent_executor.tools:
-        original_run = tool._run
-        
-        def create_tracking_run(original_func, tool_name):
-            def tracking_run(self, query):
-                tracker.track_tool(tool_name)
-                return original_func(query)
-            return tracking_run
-        
-        tool._run = create_tracking_run(original_run, tool.name)
+def print_summary(summary: Dict[str, Any]) -> None:
+    """Print the evaluation summary."""
+    total_queries = summary["total_queries"]
+    print("\n===== EVALUATION SUMMARY =====")
+    print(f"Total queries: {total_queries} ({summary['workers']} workers, {summary['errors']} errors)")
+    print(f"Exact tool matches: {summary['exact_tool_matches']}/{total_queries} ({summary['exact_tool_match_percentage']:.1f}%)")
+    print(f"Queries with tool usage: {summary['queries_with_tool_usage']}/{total_queries} ({summary['tool_usage_percentage']:.1f}%)")
+    print(
+        f"Latency p50/p90/p99: {summary['p50_execution_time']:.2f} / "
+        f"{summary['p90_execution_time']:.2f} / {summary['p99_execution_time']:.2f} seconds"
+    )
+    print(f"Average execution time: {summary['average_execution_time']:.2f} seconds")
+    print(f"Wall time: {summary['wall_time']:.2f} seconds ({summary['throughput_qpm']:.1f} queries/min)")
+    
+    if summary["tool_latency"]:
+        print("\nPer-tool latency:")
+        for tool, stats in summary["tool_latency"].items():
+            print(
+                f"  {tool}: {stats['calls']} calls, mean {stats['mean']:.2f}s, "
+                f"p90 {stats['p90']:.2f}s, total {stats['total']:.2f}s"
+            )
 
 
-def evaluate_agent():
+def evaluate_agent(argv: Optional[List[str]] = None):
     """Evaluate the agent on the test queries."""
     # Load environment variables
     load_dotenv()
     
+    parser = argparse.ArgumentParser(description="Evaluate the Research Assistant Agent")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("EVAL_WORKERS", 4)),
+        help="Number of queries evaluated concurrently (default: from .env or 4)"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=os.getenv("MODEL_NAME", "gpt-4o"),
+        help="The OpenAI model to use (default: from .env or gpt-4o)"
+    )
+    parser.add_argument(
+        "--agent-type",
+        choices=["react", "tool_calling"],
+        default=os.getenv("AGENT_TYPE", "react"),
+        help="Agent type to evaluate (default: from .env or react)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="evaluation_results.json",
+        help="File to write detailed results to"
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Call the model for every prompt instead of reusing completions cached by earlier runs"
+    )
+    args = parser.parse_args(argv)
+    
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY environment variable not set.")
         print("Please set it in your environment or in a .env file.")
         return 1
     
-    # Create the agent
-    model_name = os.getenv("MODEL_NAME", "gpt-4o")
-    print(f"Initializing Research Assistant Agent with model: {model_name}")
-    agent_executor = create_research_agent(
-        model_name=model_name,
-        verbose=False
-    )
-    
-    # Results
-    results = []
-    tool_usage_count = 0
-    total_queries = len(TEST_QUERIES)
-    total_time = 0
-    
-    # Run evaluation
-    print(f"\nEvaluating agent on {total_queries} queries...\n")
-    
-    for i, test_case in enumerate(TEST_QUERIES):
-        query = test_case["query"]
-        expected_tools = test_case["expected_tools"]
-        
-        print(f"Query {i+1}/{total_queries}: {query}")
-        
-        # Create a new tool tracker for this query
-        tracker = ToolTracker()
-        patch_tools_for_tracking(agent_executor, tracker)
-        
-        # Execute the query
-        start_time = time.time()
-        response = agent_executor.invoke({"input": query})
-        end_time = time.time()
-        
-        # Calculate metrics
-        execution_time = end_time - start_time
-        total_time += execution_time
-        called_tools = tracker.get_called_tools()
-        
-        # Check if at least one tool was called
-        used_tool = len(called_tools) > 0
-        if used_tool:
-            tool_usage_count += 1
-        
-        # Store results
-        result = {
-            "query": query,
-            "expected_tools": expected_tools,
-            "called_tools": list(called_tools),
-            "used_expected_tools": all(tool in called_tools for tool in expected_tools),
-            "used_tool": used_tool,
-            "execution_time": execution_time,
-            "answer": response["output"]
-        }
-        results.append(result)
-        
-        # Print results for this query
-        print(f"  Tools called: {', '.join(called_tools)}")
-        print(f"  Expected tools: {', '.join(expected_tools)}")
-        print(f"  Used expected tools: {'Yes' if result['used_expected_tools'] else 'No'}")
-        print(f"  Execution time: {execution_time:.2f} seconds")
-        print(f"  Answer: {response['output'][:100]}..." if len(response["output"]) > 100 else f"  Answer: {response['output']}")
-        print()
-    
-    # Calculate overall metrics
-    exact_tool_matches = sum(1 for r in results if r["used_expected_tools"])
-    tool_usage_percentage = (tool_usage_count / total_queries) * 100
-    median_time = sorted([r["execution_time"] for r in results])[total_queries // 2]
+    # Repeated runs send the same prompts; answer them from the on-disk cache
+    enable_llm_cache(not args.no_llm_cache)
     
-    # Print summary
-    print("\n===== EVALUATION SUMMARY =====")
-    print(f"Total queries: {total_queries}")
-    print(f"Exact tool matches: {exact_tool_matches}/{total_queries} ({exact_tool_matches/total_queries*100:.1f}%)")
-    print(f"Queries with tool usage: {tool_usage_count}/{total_queries} ({tool_usage_percentage:.1f}%)")
-    print(f"Median execution time: {median_time:.2f} seconds")
-    print(f"Average execution time: {total_time/total_queries:.2f} seconds")
+    print(f"Initializing Research Assistant Agent with model: {args.model}")
+    evaluation = run_evaluation(TEST_QUERIES, args.model, workers=args.workers, agent_type=args.agent_type)
+    print_summary(evaluation["summary"])
     
     # Save results to file
-    with open("evaluation_results.json", "w") as f:
-        json.dump({
-            "results": results,
-            "summary": {
-                "total_queries": total_queries,
-                "exact_tool_matches": exact_tool_matches,
-                "exact_tool_match_percentage": exact_tool_matches/total_queries*100,
-                "queries_with_tool_usage": tool_usage_count,
-                "tool_usage_percentage": tool_usage_percentage,
-                "median_execution_time": median_time,
-                "average_execution_time": total_time/total_queries
-            }
-        }, f, indent=2)
-    
-    print("\nDetailed results saved to evaluation_results.json")
+    with open(args.output, "w") as f:
+        json.dump(evaluation, f, indent=2)
+    
+    print(f"\nDetailed results saved to {args.output}")
     
     return 0
 
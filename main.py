@@ -6,15 +6,97 @@ This script provides a command-line interface for interacting with the Research
 """
 
 import os
+import sys
 import time
+import json
 import argparse
+import contextlib
 from dotenv import load_dotenv
 
-from agent import create_research_agent
+from agent.startup import StartupProfile
+
+
+def run_query(agent_executor, query: str, stream: bool = True) -> None:
+    """Run one query, printing tool calls and answer tokens as they arrive."""
+    from agent.streaming import stream_agent
+    
+    start_time = time.time()
+    if not stream:
+        response = agent_executor.invoke({"input": query})
+        print("\nFinal Answer:", response["output"])
+        print(f"Time taken: {time.time() - start_time:.2f} seconds")
+        return
+    
+    first_token_time = None
+    streamed = False
+    for event in stream_agent(agent_executor, {"input": query}):
+        if event["type"] == "tool_start":
+            print(f"\n→ {event['tool']}: {event['input']}", flush=True)
+        elif event["type"] == "tool_end":
+            observation = str(event["output"]).strip().replace("\n", " ")
+            print(f"  ← {observation[:200]}{'...' if len(observation) > 200 else ''}", flush=True)
+        elif event["type"] == "token":
+            if first_token_time is None:
+                first_token_time = time.time()
+                print("\nFinal Answer: ", end="", flush=True)
+            print(event["text"], end="", flush=True)
+            streamed = True
+        elif event["type"] == "final" and not streamed:
+            # Nothing was streamed, e.g. the agent stopped at the iteration limit
+            print("\nFinal Answer:", event["output"], end="")
+    
+    print()
+    if first_token_time is not None:
+        print(f"Time to first token: {first_token_time - start_time:.2f} seconds")
+    print(f"Time taken: {time.time() - start_time:.2f} seconds")
+
+
+def print_metrics(metrics_format, file=None) -> None:
+    """Print the metrics collected during this session, if requested (to stdout by default)."""
+    from agent import get_metrics
+    
+    if metrics_format == "json":
+        print(json.dumps(get_metrics().snapshot(), indent=2), file=file)
+    elif metrics_format == "prometheus":
+        print(get_metrics().to_prometheus(), end="", file=file)
+
+
+def run_batch(args, create_research_agent) -> int:
+    """Answer the queries of a JSONL file, each on a fresh agent.
+    
+    Only the JSONL results go to stdout; verbose traces, the summary and
+    the metrics go to stderr, so the results can be piped.
+    """
+    from agent.batch import run_batch_job
+    
+    def new_agent():
+        return create_research_agent(model_name=args.model, verbose=args.verbose, agent_type=args.agent_type)
+    
+    output = sys.stdout if args.output in (None, "-") else args.output
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run_batch_job(
+            args.batch,
+            output,
+            new_agent,
+            concurrency=args.concurrency,
+            query_field=args.query_field,
+            resume=not args.no_resume,
+        )
+    sys.stderr.write(
+        f"Batch {'cancelled' if summary['cancelled'] else 'finished'}: {summary['answered']} answered, "
+        f"{summary['failed']} failed, {summary['skipped']} skipped (already answered) of {summary['total']} "
+        f"in {summary['wall_time']:.2f} seconds\n"
+    )
+    print_metrics(args.metrics, file=sys.stderr)
+    if summary["cancelled"]:
+        return 130
+    return 1 if summary["failed"] else 0
 
 
 def main():
     """Run the Research Assistant Agent CLI."""
+    profile = StartupProfile(enabled=False)
+    
     # Load environment variables
     load_dotenv()
     
@@ -32,12 +114,62 @@ def main():
         default=os.getenv("VERBOSE", "false").lower() == "true",
         help="Enable verbose output (default: from .env or false)"
     )
+    parser.add_argument(
+        "--agent-type",
+        choices=["react", "tool_calling"],
+        default=os.getenv("AGENT_TYPE", "react"),
+        help="Agent type; tool_calling runs independent tool calls in parallel (default: from .env or react)"
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Wait for the complete answer instead of streaming it"
+    )
+    parser.add_argument(
+        "--metrics",
+        choices=["json", "prometheus"],
+        help="Print LLM, tool and cache metrics in this format before exiting"
+    )
     parser.add_argument(
         "--query",
         type=str,
         help="Single query to run (if not provided, interactive mode is used)"
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="FILE",
+        help="Answer the queries of a JSONL file (- for stdin) and write JSONL results"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Batch mode: JSONL file for the results, resumed if it exists (default: stdout)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("BATCH_CONCURRENCY", 4)),
+        help="Batch mode: queries answered at the same time (default: from .env or 4)"
+    )
+    parser.add_argument(
+        "--query-field",
+        type=str,
+        help="Batch mode: input field holding the query (default: query, input or question)"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Batch mode: overwrite the output file instead of skipping the queries it already answers"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print an import-time and init-time breakdown of the startup to stderr"
+    )
     args = parser.parse_args()
+    profile.enabled = args.profile_startup
     
     # Check for OpenAI API key
     if not os.getenv("OPENAI_API_KEY"):
@@ -45,21 +177,45 @@ def main():
         print("Please set it in your environment or in a .env file.")
         return 1
     
+    # The agent and its dependencies are only imported once the
+    # configuration is known to be usable
+    with profile.phase("import agent"):
+        from agent import create_research_agent
+        from agent.llm_cache import enable_llm_cache
+        from agent.streaming import stream_agent  # noqa: F401
+    
+    # Reuse cached completions if LLM_CACHE is enabled
+    with profile.phase("LLM cache"):
+        enable_llm_cache()
+    
+    if args.batch:
+        profile.print_report()
+        return run_batch(args, create_research_agent)
+    
     # Create the agent
     print(f"Initializing Research Assistant Agent with model: {args.model}")
-    agent_executor = create_research_agent(
-        model_name=args.model,
-        verbose=args.verbose
-    )
+    with profile.phase("agent and tools"):
+        agent_executor = create_research_agent(
+            model_name=args.model,
+            verbose=args.verbose,
+            agent_type=args.agent_type
+        )
+    profile.print_report()
+    
+    # Report offline index load time and memory when running without network
+    for tool in agent_executor.tools:
+        index = getattr(tool, "index", None)
+        if index is not None:
+            stats = index.stats()
+            print(
+                f"Offline Wikipedia index: {stats['articles']} articles loaded in "
+                f"{stats['load_ms']:.1f} ms (RSS {stats['rss_mb']:.1f} MB)"
+            )
     
     # Single query mode
     if args.query:
-        start_time = time.time()
-        response = agent_executor.invoke({"input": args.query})
-        end_time = time.time()
-        
-        print("\nFinal Answer:", response["output"])
-        print(f"Time taken: {end_time - start_time:.2f} seconds")
+        run_query(agent_executor, args.query, stream=not args.no_stream)
+        print_metrics(args.metrics)
         return 0
     
     # Interactive mode
@@ -76,15 +232,11 @@ def main():
             continue
         
         try:
-            start_time = time.time()
-            response = agent_executor.invoke({"input": query})
-            end_time = time.time()
-            
-            print("\nFinal Answer:", response["output"])
-            print(f"Time taken: {end_time - start_time:.2f} seconds")
+            run_query(agent_executor, query, stream=not args.no_stream)
         except Exception as e:
             print(f"Error: {str(e)}")
     
+    print_metrics(args.metrics)
     return 0
 
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+HTTP server for the Research Assistant Agent.
+
+Serves the agent over HTTP with a bounded request queue, per-client limits,
+deadlines, server-sent-event streaming and Prometheus metrics (see
+agent/server.py). With --offline, a scripted model and a local stub of the
+Wikipedia and Open-Meteo APIs stand in for OpenAI and the network.
+"""
+
+import os
+import argparse
+import contextlib
+from dotenv import load_dotenv
+
+
+def main(argv=None):
+    """Run the Research Assistant Agent HTTP server."""
+    # Load environment variables
+    load_dotenv()
+    
+    parser = argparse.ArgumentParser(description="Research Assistant Agent HTTP server")
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=os.getenv("SERVER_HOST", "127.0.0.1"),
+        help="Address to listen on (default: from .env or 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("SERVER_PORT", 8000)),
+        help="Port to listen on (default: from .env or 8000)"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=os.getenv("MODEL_NAME", "gpt-4o"),
+        help="The OpenAI model to use (default: from .env or gpt-4o)"
+    )
+    parser.add_argument(
+        "--agent-type",
+        choices=["react", "tool_calling"],
+        default=os.getenv("AGENT_TYPE", "react"),
+        help="Agent type (default: from .env or react)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Queries answered at the same time (default: from .env or 4)"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="Queries waiting before new ones are rejected with 429 (default: from .env or 64)"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use a scripted model and a local stub server instead of OpenAI and the network"
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Offline mode: seconds the scripted model waits before each response"
+    )
+    args = parser.parse_args(argv)
+    
+    if not args.offline and not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set.")
+        print("Please set it in your environment or in a .env file, or use --offline.")
+        return 1
+    
+    import uvicorn
+    from agent import create_research_agent
+    from agent.llm_cache import enable_llm_cache
+    from agent.server import AgentService, create_app
+    
+    with contextlib.ExitStack() as stack:
+        if args.offline:
+            from benchmarks import ScriptedChatModel, StubServer
+            from benchmarks.run import loop_transcript, offline_environment
+            
+            server = stack.enter_context(StubServer())
+            stack.enter_context(offline_environment(server))
+            
+            def new_agent():
+                llm = ScriptedChatModel(responses=loop_transcript(1), latency=args.llm_latency)
+                return create_research_agent(llm=llm, verbose=False, agent_type=args.agent_type)
+        else:
+            # Reuse cached completions if LLM_CACHE is enabled
+            enable_llm_cache()
+            
+            def new_agent():
+                return create_research_agent(model_name=args.model, verbose=False, agent_type=args.agent_type)
+        
+        service = AgentService(new_agent, workers=args.workers, queue_size=args.queue_size)
+        uvicorn.run(create_app(service), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
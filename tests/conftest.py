@@ -0,0 +1,29 @@
+"""Shared fixtures for the Research Assistant tests."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.weather_cache import get_weather_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep on-disk caches out of the user's home directory during tests."""
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("WIKIPEDIA_CACHE_PATH", raising=False)
+    monkeypatch.delenv("WIKIPEDIA_INDEX_DIR", raising=False)
+    monkeypatch.delenv("GEOCODE_CACHE_PATH", raising=False)
+    monkeypatch.delenv("GEOCODE_CITIES_FILE", raising=False)
+
+
+@pytest.fixture(autouse=True)
+def empty_weather_cache():
+    """Start every test without cached weather observations."""
+    get_weather_cache().clear()
+    yield
+    get_weather_cache().clear()
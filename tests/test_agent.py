@@ -2,7 +2,7 @@
 
 import pytest
 import os
-from unittest.mock import patch, MagicMock, PropertyMock
+from unittest.mock import ANY, patch, MagicMock, PropertyMock
 
 import sys
 
@@ -10,6 +10,9 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from agent import create_research_agent
+from agent.memory import TokenBudgetMemory
+from agent.resources import ResourceRegistry
+from tools.compaction import ObservationCompactor
 from langchain_core.runnables.base import Runnable
 from langchain.tools import BaseTool
 
@@ -18,12 +21,12 @@ class TestAgent:
     """Test suite for the Research Assistant Agent."""
     
     @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-dummy-key-for-testing"})
-    @patch('agent.agent.ChatOpenAI')
-    @patch('agent.agent.WikipediaTool')
-    @patch('agent.agent.CalculatorTool')
-    @patch('agent.agent.WeatherTool')
+    @patch('langchain_openai.ChatOpenAI')
+    @patch('agent.resources.WikipediaTool')
+    @patch('agent.resources.CalculatorTool')
+    @patch('agent.resources.WeatherTool')
     @patch('agent.agent.create_react_agent')
-    @patch('agent.agent.AgentExecutor')
+    @patch('agent.agent.FastPathAgentExecutor')
     def test_create_agent(self, mock_agent_executor, mock_create_agent, 
                          mock_weather_tool, mock_calculator_tool, 
                          mock_wikipedia_tool, mock_chat_openai):
@@ -43,7 +46,7 @@ class TestAgent:
             
             def _run(self, query: str) -> str:
                 return "Mock Wikipedia result"
-                
+            
             async def _arun(self, query: str) -> str:
                 return "Mock Wikipedia result"
         
@@ -53,7 +56,7 @@ class TestAgent:
             
             def _run(self, query: str) -> str:
                 return "Mock Calculator result"
-                
+            
             async def _arun(self, query: str) -> str:
                 return "Mock Calculator result"
         
@@ -63,7 +66,7 @@ class TestAgent:
             
             def _run(self, query: str) -> str:
                 return "Mock Weather result"
-                
+            
             async def _arun(self, query: str) -> str:
                 return "Mock Weather result"
         
@@ -85,10 +88,10 @@ class TestAgent:
         mock_agent_executor.return_value = mock_agent_executor_instance
         
         # Call the function
-        agent = create_research_agent(model_name="gpt-4o", verbose=True)
+        agent = create_research_agent(model_name="gpt-4o", verbose=True, resources=ResourceRegistry())
         
         # Verify the mocks were called correctly
-        mock_chat_openai.assert_called_once_with(model_name="gpt-4o", temperature=0)
+        mock_chat_openai.assert_called_once_with(model_name="gpt-4o", temperature=0, http_client=ANY, http_async_client=ANY, rate_limiter=ANY)
         mock_wikipedia_tool.assert_called_once()
         mock_calculator_tool.assert_called_once_with(llm=mock_llm_instance)
         mock_weather_tool.assert_called_once()
@@ -97,17 +100,62 @@ class TestAgent:
         mock_create_agent.assert_called_once()
         args, kwargs = mock_create_agent.call_args
         assert kwargs["llm"] == mock_llm_instance
-        assert len(kwargs["tools"]) == 3
+        assert len(kwargs["tools"]) == 4
         assert kwargs["tools"][0] == mock_wikipedia_tool_instance
         assert kwargs["tools"][1] == mock_calculator_tool_instance
         assert kwargs["tools"][2] == mock_weather_tool_instance
+        assert kwargs["tools"][3].name == "ObservationLookup"
         
         # Check that AgentExecutor was called with the right parameters
         mock_agent_executor.assert_called_once()
         args, kwargs = mock_agent_executor.call_args
         assert kwargs["agent"] == mock_agent_instance
-        assert len(kwargs["tools"]) == 3
+        assert len(kwargs["tools"]) == 4
         assert kwargs["verbose"] == True
+        assert isinstance(kwargs["memory"], TokenBudgetMemory)
+        assert kwargs["memory"].output_key == "output"
+        assert isinstance(kwargs["trim_intermediate_steps"], ObservationCompactor)
         
         # Check that the function returns the agent executor
-        assert agent == mock_agent_executor_instance 
\ No newline at end of file
+        assert agent == mock_agent_executor_instance 
+    
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-dummy-key-for-testing"})
+    @patch('agent.agent.create_tool_calling_agent')
+    @patch('agent.agent.create_react_agent')
+    @patch('agent.agent.FastPathParallelAgentExecutor')
+    def test_create_tool_calling_agent(self, mock_parallel_executor, mock_create_react_agent,
+                                       mock_create_tool_calling_agent):
+        """Test that the tool-calling mode runs on the parallel executor."""
+        agent = create_research_agent(agent_type="tool_calling", resources=ResourceRegistry())
+        
+        mock_create_react_agent.assert_not_called()
+        mock_create_tool_calling_agent.assert_called_once()
+        args, kwargs = mock_create_tool_calling_agent.call_args
+        assert [tool.name for tool in kwargs["tools"]] == ["WikipediaTool", "CalculatorTool", "WeatherTool", "ObservationLookup"]
+        
+        mock_parallel_executor.assert_called_once()
+        assert mock_parallel_executor.call_args[1]["agent"] == mock_create_tool_calling_agent.return_value
+        assert agent == mock_parallel_executor.return_value
+    
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-dummy-key-for-testing"})
+    def test_create_agent_unknown_type(self):
+        """Test that an unknown agent type is rejected."""
+        with pytest.raises(ValueError, match="Unknown agent type"):
+            create_research_agent(agent_type="plan_and_execute")
+    
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "sk-dummy-key-for-testing"})
+    def test_sessions_share_resources(self):
+        """Test that agents share the model and tools but not memory or executor."""
+        resources = ResourceRegistry()
+        first = create_research_agent(resources=resources)
+        second = create_research_agent(resources=resources)
+        
+        assert first is not second
+        assert first.memory is not second.memory
+        assert [id(tool) for tool in first.tools] == [id(tool) for tool in second.tools]
+        assert resources.llm() is resources.llm("gpt-4o", 0)
+        assert resources.llm().http_client is resources.http_client()
+        assert resources.llm().http_async_client is resources.http_async_client()
+        assert resources.llm().rate_limiter.limiter is resources.rate_limiter()
+        assert resources.llm("gpt-4o-mini") is not resources.llm()
+        resources.close()
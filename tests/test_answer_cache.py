@@ -0,0 +1,156 @@
+"""Tests for the semantic answer cache."""
+
+import pytest
+
+import sys
+import os
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import create_research_agent
+from agent.answer_cache import AnswerCache, is_contextual
+from agent.fast_path import FastPathAgentExecutor, FastPathParallelAgentExecutor
+from agent.metrics import MetricsRegistry
+from agent.parallel import ParallelAgentExecutor
+from benchmarks.fake_llm import ScriptedChatModel, react_final, react_step
+
+
+class TestAnswerCache:
+    """Test suite for the AnswerCache."""
+    
+    def test_similar_question_hits(self):
+        """Test that a rephrased question is answered from the cache."""
+        cache = AnswerCache(threshold=0.8)
+        cache.store("Who is the CEO of Microsoft?", "Satya Nadella", ["WikipediaTool"])
+        
+        hit = cache.lookup("who's Microsoft's CEO")
+        assert hit["answer"] == "Satya Nadella"
+        assert hit["query"] == "Who is the CEO of Microsoft?"
+        assert hit["similarity"] >= 0.8
+        
+        assert cache.lookup("Who is the CEO of Apple?") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+    
+    def test_threshold(self):
+        """Test that the similarity threshold is respected."""
+        cache = AnswerCache(threshold=0.99)
+        cache.store("Who is the CEO of Microsoft?", "Satya Nadella")
+        assert cache.lookup("who's Microsoft's CEO") is None
+        assert cache.lookup("Who is the CEO of Microsoft?")["answer"] == "Satya Nadella"
+    
+    def test_numbers_must_match(self):
+        """Test that questions differing only in numbers do not share answers."""
+        cache = AnswerCache(threshold=0.5)
+        cache.store("What is the square root of 144?", "12", ["CalculatorTool"])
+        assert cache.lookup("What is the square root of 169?") is None
+        assert cache.lookup("what's the square root of 144")["answer"] == "12"
+    
+    def test_entities_must_match(self):
+        """Test that a question about another entity does not reuse an answer."""
+        france = "What was the total population recorded by the most recent national census in France including overseas regions?"
+        germany = france.replace("France", "Germany")
+        cache = AnswerCache(threshold=0.85)
+        cache.store(france, "68 million")
+        
+        # Similar enough to pass the threshold on its own
+        assert float(cache.embedder.embed(germany) @ cache.embedder.embed(france)) >= 0.85
+        assert cache.lookup(germany) is None
+        assert cache.lookup(france.lower())["answer"] == "68 million"
+    
+    def test_paraphrase_hits(self):
+        """Test that paraphrases of the same question share an answer."""
+        cache = AnswerCache()
+        cache.store("Who is the current CEO of Microsoft?", "Satya Nadella", ["WikipediaTool"])
+        
+        assert cache.lookup("who is the chief executive of microsoft")["answer"] == "Satya Nadella"
+        assert cache.lookup("Who is the chief executive officer of Microsoft, please?")["answer"] == "Satya Nadella"
+        assert cache.lookup("Who is the current CEO of Apple?") is None
+        assert cache.lookup("who is the chief executive of apple") is None
+    
+    @patch("time.time")
+    def test_ttl_by_tools(self, mock_time):
+        """Test that answers expire after the shortest TTL of the tools used."""
+        mock_time.return_value = 1000.0
+        cache = AnswerCache(default_ttl=3600, tool_ttls={"WeatherTool": 600, "WikipediaTool": 86400})
+        cache.store("What is the weather in Tokyo?", "Sunny", ["WeatherTool", "WikipediaTool"])
+        cache.store("Who founded Microsoft?", "Bill Gates and Paul Allen", ["WikipediaTool"])
+        cache.store("Tell me a joke", "No.", [])
+        
+        mock_time.return_value = 1000.0 + 601
+        assert cache.lookup("What is the weather in Tokyo?") is None
+        assert cache.lookup("Who founded Microsoft?") is not None
+        assert cache.lookup("Tell me a joke") is not None
+        
+        mock_time.return_value = 1000.0 + 3601
+        assert cache.lookup("Tell me a joke") is None
+        assert cache.lookup("Who founded Microsoft?") is not None
+        assert cache.stats()["expirations"] == 2
+        assert len(cache) == 1
+    
+    def test_eviction(self):
+        """Test that the oldest answers are evicted beyond maxsize."""
+        cache = AnswerCache(maxsize=2)
+        cache.store("Who founded Microsoft?", "Bill Gates")
+        cache.store("Who founded Apple?", "Steve Jobs")
+        cache.store("Who founded Amazon?", "Jeff Bezos")
+        
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+        assert cache.lookup("Who founded Microsoft?") is None
+        assert cache.lookup("Who founded Amazon?")["answer"] == "Jeff Bezos"
+    
+    def test_contextual_questions(self):
+        """Test that follow-up questions are only contextual with a history."""
+        assert is_contextual("What is its population?", {"chat_history": ["..."]})
+        assert not is_contextual("What is its population?", {"chat_history": []})
+        assert not is_contextual("What is the population of France?", {"chat_history": ["..."]})
+
+
+class TestAnswerCacheExecutor:
+    """Test suite for the cached agent executors."""
+    
+    def test_second_question_skips_agent(self):
+        """Test that a near-duplicate question is answered without the model."""
+        cache = AnswerCache(threshold=0.8)
+        llm = ScriptedChatModel(responses=[
+            react_step("CalculatorTool", "15^2 + 27"),
+            react_final("252"),
+        ])
+        agent = create_research_agent(llm=llm, metrics=MetricsRegistry(), answer_cache=cache)
+        assert isinstance(agent, FastPathAgentExecutor)
+        
+        assert agent.invoke({"input": "What is 15 squared plus 27?"})["output"] == "252"
+        assert llm.calls == 2
+        assert cache.lookup("what is 15 squared plus 27")["tools"] == ["CalculatorTool"]
+        
+        assert agent.invoke({"input": "what's 15 squared plus 27"})["output"] == "252"
+        assert llm.calls == 2
+        # The cached turn is still recorded in the conversation memory
+        assert len(agent.memory.chat_memory.messages) == 4
+    
+    @pytest.mark.asyncio
+    async def test_async_and_tool_calling(self):
+        """Test that the async path and the tool-calling executor use the cache."""
+        cache = AnswerCache()
+        cache.store("Who is the CEO of Microsoft?", "Satya Nadella", ["WikipediaTool"])
+        llm = ScriptedChatModel(responses=[react_final("unused")])
+        agent = create_research_agent(llm=llm, metrics=MetricsRegistry(), answer_cache=cache)
+        
+        assert (await agent.ainvoke({"input": "Who is the CEO of Microsoft?"}))["output"] == "Satya Nadella"
+        assert llm.calls == 0
+        
+        with patch("agent.agent.create_tool_calling_agent"), patch("agent.agent.FastPathParallelAgentExecutor") as executor:
+            create_research_agent(llm=llm, agent_type="tool_calling", answer_cache=cache)
+        assert executor.call_args[1]["answer_cache"] is cache
+        assert issubclass(FastPathParallelAgentExecutor, ParallelAgentExecutor)
+    
+    def test_disabled_by_default(self):
+        """Test that no cache is used unless enabled."""
+        llm = ScriptedChatModel(responses=[react_final("ok")])
+        with patch.dict(os.environ, {"ANSWER_CACHE": "false"}):
+            agent = create_research_agent(llm=llm, metrics=MetricsRegistry())
+        assert agent.answer_cache is None
@@ -0,0 +1,160 @@
+"""Tests for the batch query mode."""
+
+import pytest
+
+import sys
+import os
+import argparse
+import asyncio
+import io
+import json
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from agent import create_research_agent
+from agent.batch import read_queries, resume_output, run_batch, run_batch_job
+from agent.metrics import MetricsRegistry
+from agent.router import FastPathRouter
+from benchmarks.fake_llm import ScriptedChatModel, react_final
+
+
+class SleepingAgent:
+    """Agent stand-in that answers after a delay and tracks concurrency."""
+    
+    running = 0
+    max_running = 0
+    
+    async def ainvoke(self, inputs, config=None):
+        SleepingAgent.running += 1
+        SleepingAgent.max_running = max(SleepingAgent.max_running, SleepingAgent.running)
+        try:
+            await asyncio.sleep(5 if "slow" in inputs["input"] else 0.01)
+        finally:
+            SleepingAgent.running -= 1
+        return {"output": inputs["input"].upper()}
+
+
+def scripted_agent():
+    llm = ScriptedChatModel(responses=[react_final("Scripted answer.")])
+    return create_research_agent(llm=llm, metrics=MetricsRegistry(), router=FastPathRouter(threshold=0.8))
+
+
+def write_lines(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+class TestReadQueries:
+    """Test suite for parsing batch input."""
+    
+    def test_formats(self):
+        """Test objects with and without ids, plain text lines and blank lines."""
+        lines = [
+            '{"id": "a", "query": "Who is the CEO of Microsoft?"}\n',
+            '{"request_id": "r-2", "input": "What is 2 + 2?"}\n',
+            "\n",
+            "What's the weather in Tokyo?\n",
+        ]
+        assert read_queries(lines) == [
+            {"id": "a", "query": "Who is the CEO of Microsoft?"},
+            {"id": "r-2", "query": "What is 2 + 2?"},
+            {"id": 4, "query": "What's the weather in Tokyo?"},
+        ]
+    
+    def test_query_field(self):
+        """Test reading the query from a custom field, as in requests.jsonl."""
+        lines = ['{"request_id": "user-001", "title": "Math engine", "body": "Please add a math engine."}']
+        assert read_queries(lines, query_field="body") == [{"id": "user-001", "query": "Please add a math engine."}]
+    
+    def test_invalid(self):
+        """Test that missing queries and duplicate ids are rejected."""
+        with pytest.raises(ValueError, match="Line 1: no query"):
+            read_queries(['{"id": 1, "title": "no query"}'])
+        with pytest.raises(ValueError, match="duplicate id"):
+            read_queries(['{"id": 1, "query": "a"}', '{"id": 1, "query": "b"}'])
+
+
+class TestRunBatch:
+    """Test suite for running batches."""
+    
+    def test_records(self, tmp_path):
+        """Test that each query gets a record with its answer, latency and tool usage."""
+        source, output = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+        write_lines(source, ['{"id": 1, "query": "What is 2 + 2?"}\n', '{"id": 2, "query": "Who founded Microsoft?"}\n'])
+        
+        summary = run_batch_job(str(source), str(output), scripted_agent, concurrency=2)
+        
+        assert summary["answered"] == 2 and summary["failed"] == 0 and not summary["cancelled"]
+        records = {record["id"]: record for record in map(json.loads, output.read_text().splitlines())}
+        assert records[1]["answer"] == "2 + 2 = 4"
+        assert records[1]["llm_calls"] == 0
+        assert records[1]["tools"]["CalculatorTool"]["calls"] == 1
+        assert records[2]["answer"] == "Scripted answer."
+        assert records[2]["llm_calls"] == 1
+        assert records[2]["tools"] == {}
+        assert records[2]["latency"] >= 0
+    
+    def test_resume(self, tmp_path):
+        """Test that answered queries are skipped and failed or partial ones rerun."""
+        source, output = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+        write_lines(source, [json.dumps({"id": i, "query": f"Question {i}?"}) + "\n" for i in (1, 2, 3)])
+        write_lines(output, [
+            json.dumps({"id": 1, "answer": "From the earlier run.", "error": None}) + "\n",
+            json.dumps({"id": 2, "answer": None, "error": "RateLimitError: slow down"}) + "\n",
+            '{"id": 3, "answer": "Cut o',
+        ])
+        
+        summary = run_batch_job(str(source), str(output), scripted_agent)
+        
+        assert (summary["skipped"], summary["answered"]) == (1, 2)
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert records[0]["answer"] == "From the earlier run."
+        assert sorted(record["id"] for record in records) == [1, 2, 3]
+        assert all(record["error"] is None for record in records)
+        assert resume_output(str(output)) == {"1", "2", "3"}
+    
+    def test_bounded_concurrency(self):
+        """Test that no more than the concurrency limit run at once."""
+        SleepingAgent.max_running = 0
+        queries = [{"id": i, "query": f"q{i}"} for i in range(6)]
+        output = io.StringIO()
+        
+        counts = asyncio.run(run_batch(queries, output, SleepingAgent, concurrency=2))
+        
+        assert counts["answered"] == 6
+        assert SleepingAgent.max_running == 2
+        assert len(output.getvalue().splitlines()) == 6
+    
+    def test_cancellation(self):
+        """Test that cancelled queries are not written, so a resumed run repeats them."""
+        queries = [{"id": 1, "query": "fast"}, {"id": 2, "query": "slow"}, {"id": 3, "query": "fast too"}]
+        output = io.StringIO()
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(asyncio.wait_for(run_batch(queries, output, SleepingAgent, concurrency=2), timeout=0.5))
+        
+        assert [json.loads(line)["answer"] for line in output.getvalue().splitlines()] == ["FAST", "FAST TOO"]
+        assert SleepingAgent.running == 0
+    
+    def test_stdout_only_has_records(self, tmp_path, capsys):
+        """Test that batch mode without --output keeps the summary and metrics off stdout."""
+        source = tmp_path / "queries.jsonl"
+        write_lines(source, ['{"id": 1, "query": "What is 2 + 2?"}\n', '{"id": 2, "query": "Who founded Microsoft?"}\n'])
+        args = argparse.Namespace(
+            batch=str(source), output=None, model="gpt-4o", verbose=True, agent_type="react",
+            concurrency=2, query_field=None, no_resume=False, metrics="json",
+        )
+        
+        def new_agent(model_name, verbose, agent_type):
+            agent = scripted_agent()
+            agent.verbose = verbose
+            return agent
+        
+        assert main.run_batch(args, new_agent) == 0
+        
+        captured = capsys.readouterr()
+        records = [json.loads(line) for line in captured.out.splitlines()]
+        assert sorted(record["id"] for record in records) == [1, 2]
+        assert "Batch finished: 2 answered" in captured.err
+        assert '"counters"' in captured.err
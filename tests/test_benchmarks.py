@@ -0,0 +1,113 @@
+"""Tests for the offline benchmark suite."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the benchmarks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import ScriptedChatModel, StubServer
+from benchmarks.fake_llm import react_final, react_step
+from benchmarks.run import loop_transcript, offline_environment, run_benchmarks
+from langchain_core.messages import HumanMessage
+from tools import WikipediaTool, WeatherTool
+
+
+class TestScriptedChatModel:
+    """Test suite for the ScriptedChatModel."""
+    
+    def test_replays_in_order(self):
+        """Test that responses are replayed in order and the script repeats."""
+        llm = ScriptedChatModel(responses=["first", "second"])
+        message = [HumanMessage(content="hi")]
+        
+        assert [llm.invoke(message).content for _ in range(3)] == ["first", "second", "first"]
+        assert llm.calls == 3
+    
+    def test_bound_tools_return_tool_calls(self):
+        """Test that with tools bound the script is replayed as tool calls."""
+        script = [
+            react_step("WikipediaTool", "Microsoft") + "\n" + react_step("WeatherTool", "Tokyo"),
+            react_final("Satya Nadella"),
+        ]
+        llm = ScriptedChatModel(responses=script).bind_tools([WikipediaTool(), WeatherTool()])
+        message = [HumanMessage(content="hi")]
+        
+        calls = llm.invoke(message).tool_calls
+        assert [(call["name"], call["args"]) for call in calls] == [
+            ("WikipediaTool", {"query": "Microsoft"}),
+            ("WeatherTool", {"location": "Tokyo"}),
+        ]
+        assert len({call["id"] for call in calls}) == 2
+        answer = llm.invoke(message)
+        assert answer.content == "Satya Nadella"
+        assert answer.tool_calls == []
+    
+    def test_loop_transcript(self):
+        """Test that the loop transcript has one completion per step plus the answer."""
+        transcript = loop_transcript(4)
+        assert len(transcript) == 5
+        assert transcript[0] == react_step("WikipediaTool", "Microsoft")
+        assert transcript[-1] == react_final("Done.")
+
+
+class TestStubServer:
+    """Test suite for the StubServer."""
+    
+    def test_tools_use_stub(self):
+        """Test that the tools work end to end against the stub server."""
+        with StubServer() as server, offline_environment(server):
+            wikipedia = WikipediaTool()._run("Microsoft")
+            weather = WeatherTool()._run("Atlantis12345; Tokyo")
+        
+        assert "Title: Microsoft" in wikipedia
+        assert "Atlantis12345, Stubland" in weather
+        assert "Tokyo, Japan" in weather
+        assert server.requests == {"/w/api.php": 1, "/v1/search": 1, "/v1/forecast": 1}
+    
+    def test_environment_restored(self):
+        """Test that the offline environment is undone on exit."""
+        before = os.environ.get("WIKIPEDIA_API_URL")
+        with StubServer() as server, offline_environment(server):
+            assert os.environ["WIKIPEDIA_API_URL"].startswith(server.url)
+        assert os.environ.get("WIKIPEDIA_API_URL") == before
+
+
+class TestRunBenchmarks:
+    """Test suite for the benchmark runners."""
+    
+    def test_run_benchmarks(self):
+        """Test that the in-process suites produce JSON-ready results."""
+        results = run_benchmarks(suites=["single", "loop", "concurrent"], repeat=2, steps=3, workers=2, queries=4)
+        
+        assert results["results"]["single"]["latency"]["runs"] == 2
+        assert results["results"]["single"]["http_requests_per_run"] == 1.0
+        assert results["results"]["loop"]["steps"] == 3
+        assert results["results"]["concurrent"]["queries"] == 4
+        assert results["results"]["concurrent"]["throughput_qps"] > 0
+        assert "cold_start" not in results["results"]
+        assert "llm_cache" not in results["results"]["single"]
+        # Without a completion cache every step calls its tool
+        assert results["results"]["loop"]["http_requests_per_run"] >= 1
+        assert results["stub_requests"].get("/v1/forecast", 0) >= 2
+    
+    def test_tool_calling_agent(self):
+        """Test that the suites also run the tool-calling agent."""
+        results = run_benchmarks(suites=["single", "loop"], repeat=1, steps=3, agent_type="tool_calling")
+        
+        assert results["parameters"]["agent_type"] == "tool_calling"
+        assert results["results"]["single"]["http_requests_per_run"] == 1.0
+        assert results["results"]["loop"]["http_requests_per_run"] >= 1
+    
+    def test_llm_cache_per_suite(self):
+        """Test that each suite gets its own completion cache."""
+        results = run_benchmarks(suites=["single", "loop"], repeat=2, steps=3, llm_cache=True)
+        
+        # Repeated runs send the same prompts, so later runs hit the cache
+        assert results["results"]["single"]["llm_cache"]["hits"] > 0
+        # The loop suite starts empty instead of replaying the single transcript
+        loop_cache = results["results"]["loop"]["llm_cache"]
+        assert loop_cache["misses"] == 4
+        assert results["results"]["loop"]["http_requests_per_run"] >= 1
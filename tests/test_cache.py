@@ -0,0 +1,115 @@
+"""Tests for the tool caches."""
+
+import pytest
+from unittest.mock import patch
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.cache import LRUCache, SQLiteCache, TieredCache, normalize_key
+
+
+class TestLRUCache:
+    """Test suite for the in-memory LRU cache."""
+    
+    def test_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+    
+    @patch("tools.cache.time.time")
+    def test_ttl(self, mock_time):
+        """Test that entries expire after their time-to-live."""
+        mock_time.return_value = 1000.0
+        cache = LRUCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=100)
+        
+        mock_time.return_value = 1011.0
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["expirations"] == 1
+
+
+class TestSQLiteCache:
+    """Test suite for the persistent SQLite cache."""
+    
+    def test_persistence(self, tmp_path):
+        """Test that values survive reopening the database."""
+        path = str(tmp_path / "cache.sqlite")
+        SQLiteCache(path, table="pages").set("python", {"title": "Python"})
+        
+        cache = SQLiteCache(path, table="pages")
+        assert cache.get("python") == {"title": "Python"}
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_size_cap(self, tmp_path):
+        """Test that the table is capped at max_entries rows."""
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+        for i in range(5):
+            cache.set(str(i), i)
+        
+        assert len(cache) == 3
+        assert cache.get("0") is None
+        assert cache.get("4") == 4
+        assert cache.stats()["evictions"] == 2
+    
+    @patch("tools.cache.time.time")
+    def test_ttl(self, mock_time, tmp_path):
+        """Test that expired rows are not returned."""
+        mock_time.return_value = 1000.0
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=10)
+        cache.set("a", 1)
+        
+        mock_time.return_value = 1011.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestTieredCache:
+    """Test suite for the two-tier cache."""
+    
+    def test_disk_hit_promotes_to_memory(self, tmp_path):
+        """Test that a value found on disk is served from memory next time."""
+        path = str(tmp_path / "cache.sqlite")
+        TieredCache.create("t", path=path).set("k", "v")
+        
+        cache = TieredCache.create("t", path=path)
+        assert cache.get("k") == "v"
+        assert cache.get("k") == "v"
+        assert cache.get("missing") is None
+        
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["memory"]["hits"] == 1
+        assert stats["disk"]["hits"] == 1
+    
+    def test_memory_only(self):
+        """Test that an empty path disables the disk tier."""
+        cache = TieredCache.create("t", path="")
+        cache.set("k", "v")
+        
+        assert cache.disk is None
+        assert cache.get("k") == "v"
+    
+    def test_normalize_key(self):
+        """Test query normalization."""
+        assert normalize_key("  Microsoft\tCorp ") == "microsoft corp"
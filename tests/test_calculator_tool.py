@@ -30,6 +30,40 @@ class TestCalculatorTool:
         assert "mathematical calculations" in tool.description
         assert tool.llm_math_chain is not None
     
+    @patch('langchain.chains.LLMMathChain.invoke')
+    def test_run_local(self, mock_invoke):
+        """Test that plain arithmetic is evaluated without the LLM."""
+        class MockLLM(Runnable):
+            def invoke(self, input, config=None):
+                return {"generations": [{"text": "4"}]}
+        
+        tool = CalculatorTool(llm=MockLLM())
+        
+        assert tool._run("15**2 + 27") == "Answer: 252"
+        assert tool._run("sqrt(144)/3") == "Answer: 4.0"
+        assert "division by zero" in tool._run("1/0")
+        # Over Python's 4300-digit int-to-str limit: scientific notation
+        assert tool._run("2**20000") == "Answer: 3.980276840337967e+6020"
+        assert tool._run("-(3**8000)") == f"Answer: {-(3 ** 8000)}"
+        
+        # The LLM chain should never be consulted for these
+        mock_invoke.assert_not_called()
+    
+    @patch('langchain.chains.LLMMathChain.ainvoke')
+    def test_arun_local(self, mock_ainvoke):
+        """Test that the async path also evaluates arithmetic locally."""
+        import asyncio
+        
+        class MockLLM(Runnable):
+            def invoke(self, input, config=None):
+                return {"generations": [{"text": "4"}]}
+        
+        tool = CalculatorTool(llm=MockLLM())
+        result = asyncio.run(tool._arun("2^10"))
+        
+        assert result == "Answer: 1024"
+        mock_ainvoke.assert_not_called()
+    
     @patch('langchain.chains.LLMMathChain.invoke')
     def test_run_success(self, mock_invoke):
         """Test successful execution of the tool."""
@@ -45,13 +79,13 @@ class TestCalculatorTool:
         
         # Create the tool and run it
         tool = CalculatorTool(llm=mock_llm)
-        result = tool._run("2 + 2")
+        result = tool._run("two plus two")
         
         # Check the result
         assert result == "4"
         
         # Verify the mock was called correctly
-        mock_invoke.assert_called_once_with({"question": "2 + 2"})
+        mock_invoke.assert_called_once_with({"question": "two plus two"})
     
     @patch('langchain.chains.LLMMathChain.invoke')
     def test_run_error(self, mock_invoke):
@@ -0,0 +1,176 @@
+"""Tests for the compaction of tool observations."""
+
+import re
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.agents import AgentAction
+from tools.compaction import (
+    ObservationCompactor,
+    ObservationLookupTool,
+    ObservationStore,
+    extract_relevant,
+    split_sentences,
+)
+
+FILLER = [
+    "The company also sells video game consoles and accessories.",
+    "Its campus hosts several cafeterias and sports fields.",
+    "The firm sponsors many community events every year.",
+    "Several documentaries have been filmed about its history.",
+    "Its logo has been redesigned a number of times.",
+]
+
+SUMMARY = " ".join(
+    ["Microsoft Corporation is an American multinational technology company."]
+    + FILLER
+    + ["Satya Nadella has been the chief executive officer (CEO) since 2014."]
+    + FILLER
+)
+
+PAGE = f"Title: Microsoft\n\nSummary: {SUMMARY}\n\nURL: https://en.wikipedia.org/wiki/Microsoft"
+
+
+def step(observation, tool="WikipediaTool", tool_input="Microsoft", log="Thought: I need the CEO of Microsoft"):
+    return AgentAction(tool=tool, tool_input=tool_input, log=log), observation
+
+
+class TestExtraction:
+    """Test suite for the sentence extraction."""
+    
+    def test_split_sentences(self):
+        """Test that text is split on sentence ends and lines."""
+        assert split_sentences("Title: A\n\nFirst one. Second one! Third?") == ["Title: A", "First one.", "Second one!", "Third?"]
+    
+    def test_keeps_lead_and_relevant_sentence(self):
+        """Test that the lead sentence and the best match are kept in order."""
+        extract = extract_relevant(SUMMARY, "Microsoft CEO", 200)
+        
+        assert len(extract) <= 200
+        assert extract.startswith("Microsoft Corporation is an American")
+        assert "Satya Nadella" in extract
+        assert extract.index("Microsoft Corporation") < extract.index("Satya Nadella")
+    
+    def test_plural_terms_match(self):
+        """Test that plurals in the query match singular words."""
+        extract = extract_relevant(SUMMARY, "console", 140)
+        assert "video game consoles" in extract
+    
+    def test_keeps_title_and_url(self):
+        """Test that the title and URL lines survive whatever the query."""
+        extract = extract_relevant(PAGE, "video game consoles", 300)
+        assert extract.startswith("Title: Microsoft Summary: Microsoft Corporation")
+        assert "video game consoles" in extract
+        assert extract.endswith("URL: https://en.wikipedia.org/wiki/Microsoft")
+    
+    def test_no_query_keeps_start(self):
+        """Test that an empty query falls back to the first sentences."""
+        extract = extract_relevant(SUMMARY, "", 200)
+        assert extract.startswith("Microsoft Corporation")
+        assert FILLER[0] in extract
+
+
+class TestObservationCompactor:
+    """Test suite for the ObservationCompactor."""
+    
+    def test_short_observations_unchanged(self):
+        """Test that observations within the budget are passed through."""
+        compactor = ObservationCompactor(store=ObservationStore())
+        steps = [step("Sunny, 20°C", tool="WeatherTool")]
+        assert compactor(steps) == steps
+    
+    def test_long_observation_compacted(self):
+        """Test that long observations are cut to the tool budget with a lookup id."""
+        store = ObservationStore()
+        compactor = ObservationCompactor(store=store, tool_limits={"WikipediaTool": 400})
+        
+        action, observation = compactor([step(PAGE)])[0]
+        
+        assert len(observation) <= 400
+        assert observation.startswith("Title: Microsoft")
+        assert "Satya Nadella" in observation
+        assert "URL: https://en.wikipedia.org/wiki/Microsoft" in observation
+        assert store.get(ObservationStore.key(PAGE)) == PAGE
+        assert ObservationStore.key(PAGE) in observation
+    
+    def test_default_budget(self):
+        """Test that tools without their own limit use max_chars."""
+        compactor = ObservationCompactor(store=ObservationStore(), max_chars=300, tool_limits={})
+        action, observation = compactor([step(PAGE, tool="OtherTool")])[0]
+        assert len(observation) <= 300
+    
+    def test_non_string_observations_unchanged(self):
+        """Test that structured observations are left alone."""
+        compactor = ObservationCompactor(store=ObservationStore(), max_chars=10)
+        observation = {"rows": list(range(100))}
+        assert compactor([step(observation)])[0][1] is observation
+    
+    def test_compaction_memoized(self):
+        """Test that the same step is only compacted once across iterations."""
+        compactor = ObservationCompactor(store=ObservationStore(), tool_limits={"WikipediaTool": 400})
+        first = compactor([step(PAGE)])[0][1]
+        second = compactor([step(PAGE), step("Sunny")])[0][1]
+        assert first is second
+
+
+class TestObservationLookupTool:
+    """Test suite for the ObservationLookupTool."""
+    
+    def test_returns_full_text(self):
+        """Test that the full observation is returned by id."""
+        store = ObservationStore()
+        key = store.put(PAGE)
+        tool = ObservationLookupTool(store=store)
+        assert tool.run(key) == PAGE
+    
+    def test_keywords_select_passages(self):
+        """Test that keywords after the id return the matching passages."""
+        store = ObservationStore()
+        text = " ".join([SUMMARY] * 20)
+        key = store.put(text)
+        tool = ObservationLookupTool(store=store)
+        
+        result = tool.run(f"{key} chief executive")
+        assert len(result) < len(text)
+        assert "chief executive officer" in result
+    
+    def test_pages_long_text(self):
+        """Test that a long text is read page by page, and pages are not compacted again."""
+        store = ObservationStore()
+        text = " ".join([SUMMARY] * 20)
+        key = store.put(text)
+        tool = ObservationLookupTool(store=store)
+        compactor = ObservationCompactor(store=store)
+        
+        pages = []
+        query = key
+        for _ in range(10):
+            result = tool.run(query)
+            assert compactor.compact(result, query, "ObservationLookup") == result
+            page, note = result.rsplit("\n[", 1)
+            pages.append(page)
+            more = re.search(r"input (obs-\w+ offset \d+)\]$", note)
+            if more is None:
+                break
+            query = more.group(1)
+        
+        assert len(pages) > 1
+        assert all(len(page) <= 4000 for page in pages)
+        assert "".join(pages) == text
+        assert tool.run(f"{key} offset {len(text)}").startswith("Error")
+    
+    @pytest.mark.parametrize("query,message", [
+        ("Microsoft", "must contain an observation id"),
+        ("obs-0123456789", "no longer available"),
+    ])
+    def test_errors(self, query, message):
+        """Test that bad or unknown ids return an error message."""
+        tool = ObservationLookupTool(store=ObservationStore())
+        result = tool.run(query)
+        assert result.startswith("Error")
+        assert message in result
@@ -0,0 +1,82 @@
+"""Tests for the evaluation runner."""
+
+import time
+import pytest
+from unittest.mock import patch
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the evaluation script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from evaluate import run_evaluation
+from agent.agent import get_prompt_template
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.prompts import PromptTemplate
+from langchain.tools import BaseTool
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+class SlowWeatherTool(BaseTool):
+    """Weather tool that takes a fixed time to answer."""
+    
+    name: str = "WeatherTool"
+    description: str = "Mock Weather Tool"
+    
+    def _run(self, location: str) -> str:
+        time.sleep(0.1)
+        return f"Temperature in {location}: 18°C"
+
+
+def fake_research_agent(model_name="gpt-4o", verbose=False, memory=None, agent_type=None):
+    messages = iter([
+        AIMessage(content="Thought: I need the weather\nAction: WeatherTool\nAction Input: Tokyo"),
+        AIMessage(content="Thought: I now know the final answer\nFinal Answer: 18°C"),
+    ])
+    tools = [SlowWeatherTool()]
+    prompt = PromptTemplate.from_template(get_prompt_template()).partial(chat_history="")
+    agent = create_react_agent(llm=GenericFakeChatModel(messages=messages), tools=tools, prompt=prompt)
+    return AgentExecutor(agent=agent, tools=tools)
+
+
+class TestEvaluate:
+    """Test suite for the evaluation runner."""
+    
+    @patch('evaluate.create_research_agent', side_effect=fake_research_agent)
+    def test_run_evaluation_concurrent(self, mock_create_agent):
+        """Test that queries run concurrently on isolated agents and are summarized."""
+        queries = [
+            {"query": f"What's the weather in city {i}?", "expected_tools": ["WeatherTool"]}
+            for i in range(8)
+        ]
+        
+        evaluation = run_evaluation(queries, "gpt-4o", workers=4)
+        results, summary = evaluation["results"], evaluation["summary"]
+        
+        # One agent (and so one memory) per query
+        assert mock_create_agent.call_count == 8
+        assert [r["query"] for r in results] == [q["query"] for q in queries]
+        assert all(r["answer"] == "18°C" and r["error"] is None for r in results)
+        assert summary["exact_tool_matches"] == 8
+        
+        # Eight 100 ms queries on four workers take about two rounds
+        assert summary["wall_time"] < 8 * 0.1
+        assert summary["throughput_qpm"] > 0
+        assert summary["p50_execution_time"] <= summary["p90_execution_time"] <= summary["p99_execution_time"]
+        
+        weather = summary["tool_latency"]["WeatherTool"]
+        assert weather["calls"] == 8
+        assert weather["mean"] >= 0.1
+    
+    @patch('evaluate.create_research_agent')
+    def test_run_evaluation_error(self, mock_create_agent):
+        """Test that a failing query is recorded instead of aborting the run."""
+        mock_create_agent.return_value.invoke.side_effect = RuntimeError("rate limited")
+        
+        evaluation = run_evaluation([{"query": "q", "expected_tools": ["WikipediaTool"]}], "gpt-4o", workers=2)
+        
+        assert evaluation["results"][0]["error"] == "rate limited"
+        assert evaluation["summary"]["errors"] == 1
+        assert evaluation["summary"]["exact_tool_matches"] == 0
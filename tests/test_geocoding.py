@@ -0,0 +1,117 @@
+"""Tests for the geocode cache."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.geocoding import GeocodeCache, normalize_location, split_location
+
+
+class TestGeocodeCache:
+    """Test suite for the geocode cache."""
+    
+    @pytest.mark.parametrize("location, expected", [
+        ("London", "london"),
+        ("  new   YORK ", "new york"),
+        ("NYC", "new york"),
+        ("New York City", "new york"),
+        ("New York, USA", "new york"),
+        ("Paris, France", "paris"),
+        ("Paris, Texas", "paris texas"),
+        ("São Paulo", "sao paulo"),
+        ("Washington, D.C.", "washington"),
+        ("St. Petersburg, Russia", "saint petersburg"),
+        ("Bombay", "mumbai"),
+    ])
+    def test_normalize_location(self, location, expected):
+        """Test that spellings of a place share one key."""
+        assert normalize_location(location) == expected
+    
+    @pytest.mark.parametrize("location, expected", [
+        ("London", ("london", None)),
+        ("London, Canada", ("london", "canada")),
+        ("New York, USA", ("new york", "united states")),
+        ("Leeds, England", ("leeds", "united kingdom")),
+        ("Paris, IN", ("paris in", None)),
+    ])
+    def test_split_location(self, location, expected):
+        """Test that a trailing country is split off and normalized."""
+        assert split_location(location) == expected
+    
+    def test_bundled_table(self):
+        """Test that major cities are preloaded."""
+        cache = GeocodeCache.create(path="")
+        
+        lat, lon, name, country = cache.get("Tokyo, Japan")
+        assert (round(lat), round(lon)) == (36, 140)
+        assert (name, country) == ("Tokyo", "Japan")
+        assert cache.get("nyc")[2] == "New York"
+        assert cache.get("Springfield") is None
+        
+        stats = cache.stats()
+        assert stats["table_size"] > 200
+        assert stats["table_hits"] == 2
+        assert stats["misses"] == 1
+    
+    def test_learned_entries_persist(self, tmp_path):
+        """Test that API results survive a restart."""
+        path = str(tmp_path / "geocode.sqlite")
+        GeocodeCache.create(path=path, cities_file=None).set("Springfield, Illinois", (39.8, -89.64, "Springfield", "United States"))
+        
+        cache = GeocodeCache.create(path=path, cities_file=None)
+        assert cache.get("springfield,  illinois") == (39.8, -89.64, "Springfield", "United States")
+    
+    def test_preload_geonames(self, tmp_path):
+        """Test preloading from a GeoNames cities dump."""
+        dump = tmp_path / "cities15000.txt"
+        dump.write_text(
+            "2643743\tLondon\tLondon\t\t51.50853\t-0.12574\tP\tPPLC\tGB\t\t\t\t\t\t8961989\t\t25\tEurope/London\t2023-01-01\n"
+            "6058560\tLondon\tLondon\t\t42.98339\t-81.23304\tP\tPPL\tCA\t\t\t\t\t\t383822\t\t252\tAmerica/Toronto\t2023-01-01\n"
+        )
+        cache = GeocodeCache.create(path="", cities_file=None)
+        
+        # One London per country; without a country the first (most important) wins
+        assert cache.preload(str(dump)) == 2
+        assert cache.get("London") == (51.50853, -0.12574, "London", "GB")
+        assert cache.get("London, UK") == (51.50853, -0.12574, "London", "GB")
+        assert cache.get("London, Canada") == (42.98339, -81.23304, "London", "CA")
+    
+    @pytest.mark.parametrize("location", [
+        "London, Canada", "Sydney, Canada", "Hyderabad, Pakistan", "Birmingham, USA",
+    ])
+    def test_country_mismatch_misses(self, location):
+        """Test that a city of the same name in another country is not returned."""
+        cache = GeocodeCache.create(path="")
+        
+        assert cache.get(location) is None
+    
+    def test_learned_entries_keyed_on_country(self, tmp_path):
+        """Test that learned entries of the same name in different countries do not collide."""
+        cache = GeocodeCache.create(path=str(tmp_path / "geocode.sqlite"), cities_file=None)
+        cache.set("London, Canada", (42.98, -81.23, "London", "Canada"))
+        cache.set("Springfield", (39.8, -89.64, "Springfield", "United States"))
+        
+        assert cache.get("London, Canada") == (42.98, -81.23, "London", "Canada")
+        assert cache.get("London") is None
+        assert cache.get("London, UK") is None
+        # An entry learned without a country serves queries naming its country only
+        assert cache.get("Springfield, USA") == (39.8, -89.64, "Springfield", "United States")
+        assert cache.get("Springfield, Australia") is None
+        
+        # An API answer from another country is not learned for this one
+        cache.set("Sydney, Canada", (-33.87, 151.21, "Sydney", "Australia"))
+        assert cache.get("Sydney, Canada") is None
+    
+    def test_cities_file_from_env(self, tmp_path, monkeypatch):
+        """Test that GEOCODE_CITIES_FILE replaces the bundled table."""
+        table = tmp_path / "cities.csv"
+        table.write_text("name,country,latitude,longitude\nGotham,Nowhere,1.0,2.0\n")
+        monkeypatch.setenv("GEOCODE_CITIES_FILE", str(table))
+        
+        cache = GeocodeCache.create(path="")
+        assert cache.get("Gotham") == (1.0, 2.0, "Gotham", "Nowhere")
+        assert cache.get("Tokyo") is None
@@ -0,0 +1,87 @@
+"""Tests for the persistent LLM completion cache."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+from agent.llm_cache import SQLiteLLMCache, enable_llm_cache, is_deterministic
+from benchmarks.fake_llm import ScriptedChatModel
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite")
+
+
+class TestSQLiteLLMCache:
+    """Test suite for the SQLiteLLMCache."""
+    
+    def test_repeated_prompt_is_cached(self, cache_path):
+        """Test that a repeated prompt is answered without calling the model."""
+        llm = ScriptedChatModel(responses=["first", "second"], cache=SQLiteLLMCache(cache_path))
+        
+        assert llm.invoke("Who is the CEO of Microsoft?").content == "first"
+        assert llm.invoke("Who is the CEO of Microsoft?").content == "first"
+        assert llm.calls == 1
+        
+        # Different prompts and stop sequences are different keys
+        assert llm.invoke("Who is the CEO of Apple?").content == "second"
+        assert llm.invoke("Who is the CEO of Microsoft?", stop=["\nObservation"]).content == "first"
+        assert llm.calls == 3
+    
+    def test_persistent(self, cache_path):
+        """Test that completions survive a new cache instance on the same file."""
+        llm = ScriptedChatModel(responses=["stored"], cache=SQLiteLLMCache(cache_path))
+        llm.invoke([HumanMessage(content="hello")])
+        
+        cache = SQLiteLLMCache(cache_path)
+        llm = ScriptedChatModel(responses=["not called"], cache=cache)
+        assert llm.invoke([HumanMessage(content="hello")]).content == "stored"
+        assert llm.calls == 0
+        assert cache.stats()["hits"] == 1
+    
+    def test_size_bounded(self, cache_path):
+        """Test that the least recently used completions are evicted."""
+        cache = SQLiteLLMCache(cache_path, max_entries=2)
+        llm = ScriptedChatModel(responses=["a", "b", "c"], cache=cache)
+        for prompt in ["one", "two", "three"]:
+            llm.invoke(prompt)
+        
+        assert cache.stats()["size"] == 2
+        assert cache.stats()["evictions"] == 1
+        assert llm.invoke("three").content == "c"
+        assert llm.calls == 3
+    
+    @pytest.mark.parametrize("temperature,expected", [(0, True), (0.7, False)])
+    def test_only_deterministic_calls(self, temperature, expected):
+        """Test that sampled completions are neither looked up nor stored."""
+        llm = ChatOpenAI(model_name="gpt-4o", temperature=temperature, api_key="sk-dummy-key-for-testing")
+        assert is_deterministic(llm._get_llm_string(stop=["\nObservation"])) is expected
+        assert is_deterministic(ScriptedChatModel(responses=["ok"])._get_llm_string())
+    
+    def test_enable_and_bypass(self, cache_path):
+        """Test that the cache is installed globally and can be bypassed."""
+        previous = get_llm_cache()
+        try:
+            cache = SQLiteLLMCache(cache_path)
+            assert enable_llm_cache(True, cache) is cache
+            assert get_llm_cache() is cache
+            
+            llm = ScriptedChatModel(responses=["a", "b"])
+            llm.invoke("question")
+            llm.invoke("question")
+            assert llm.calls == 1
+            
+            assert enable_llm_cache(False) is None
+            assert get_llm_cache() is None
+            llm.invoke("question")
+            assert llm.calls == 2
+        finally:
+            set_llm_cache(previous)
@@ -0,0 +1,74 @@
+"""Tests for the local math engine."""
+
+import math
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.math_engine import evaluate_expression, parse_expression
+
+
+class TestMathEngine:
+    """Test suite for the safe expression evaluator."""
+    
+    @pytest.mark.parametrize("expression, expected", [
+        ("2 + 2", 4),
+        ("15**2 + 27", 252),
+        ("15^2 + 27", 252),
+        ("sqrt(144)/3", 4.0),
+        ("-(3 - 5) * 4", 8),
+        ("7 // 2 + 7 % 2", 4),
+        ("2 ** 200", 2 ** 200),
+        ("factorial(20)", math.factorial(20)),
+        ("comb(10, 3)", 120),
+        ("perm(5)", 120),
+        ("comb(10**6, 2)", math.comb(10**6, 2)),
+        ("log(100, 10)", 2.0),
+        ("log10(1000)", 3.0),
+        ("max(3, 9, 4)", 9),
+        ("2 * pi", 2 * math.pi),
+        ("e", math.e),
+        ("12 × 3 ÷ 4", 9.0),
+        ("10 - 4 =", 6),
+    ])
+    def test_evaluate(self, expression, expected):
+        """Test evaluation of well-formed expressions."""
+        assert evaluate_expression(expression) == pytest.approx(expected)
+    
+    @pytest.mark.parametrize("expression", [
+        "",
+        "two plus two",
+        "__import__('os').system('ls')",
+        "(1).__class__",
+        "open('file')",
+        "[1, 2, 3]",
+        "'abc' * 3",
+        "x + 1",
+        "lambda: 1",
+        "True + 1",
+        "round(2.5, ndigits=1)",
+        "What is 15 squared plus 27?",
+    ])
+    def test_rejects_non_arithmetic(self, expression):
+        """Test that anything but plain math is rejected at parse time."""
+        with pytest.raises(ValueError):
+            parse_expression(expression)
+    
+    def test_limits(self):
+        """Test that pathological expressions fail quickly instead of hanging."""
+        with pytest.raises(OverflowError):
+            evaluate_expression("9**9**9")
+        with pytest.raises(OverflowError):
+            evaluate_expression("factorial(100000)")
+        with pytest.raises(OverflowError):
+            evaluate_expression("comb(2000000, 1000000)")
+        with pytest.raises(OverflowError):
+            evaluate_expression("perm(300000)")
+        with pytest.raises(OverflowError):
+            evaluate_expression("perm(10**6, 10**5)")
+        with pytest.raises(ZeroDivisionError):
+            evaluate_expression("1 / 0")
@@ -0,0 +1,103 @@
+"""Tests for the token-budgeted conversation memory."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.memory import TokenBudgetMemory
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+
+def count_words(text):
+    """Deterministic token counter for the tests: one token per word."""
+    return len(text.split())
+
+
+def save_turns(memory, turns, words=20):
+    for i in range(turns):
+        memory.save_context(
+            {"input": f"question {i} " + "about something " * (words // 2)},
+            {"output": f"answer {i} " + "with some detail " * (words // 3)},
+        )
+
+
+class TestTokenBudgetMemory:
+    """Test suite for the TokenBudgetMemory."""
+    
+    def test_under_budget_keeps_everything(self):
+        """Test that short conversations are kept verbatim without a summary."""
+        memory = TokenBudgetMemory(max_token_limit=1000, count_tokens=count_words, return_messages=True)
+        save_turns(memory, 3)
+        
+        history = memory.load_memory_variables({})["chat_history"]
+        assert len(history) == 6
+        assert memory.moving_summary_buffer == ""
+    
+    def test_size_stays_flat(self):
+        """Test that the history never exceeds the budget however long the session."""
+        memory = TokenBudgetMemory(max_token_limit=200, count_tokens=count_words, return_messages=True)
+        sizes = []
+        for i in range(100):
+            save_turns(memory, 1)
+            sizes.append(memory.token_count())
+        
+        assert max(sizes) <= 200
+        assert memory.moving_summary_buffer
+        # The latest turn is always kept verbatim
+        history = memory.load_memory_variables({})["chat_history"]
+        assert history[0].type == "system"
+        assert history[-2].content.startswith("question 0")
+        assert history[-1].content.startswith("answer 0")
+    
+    def test_summary_is_incremental(self):
+        """Test that the summary is only updated when turns are pruned, in batches."""
+        calls = []
+        
+        class CountingModel(FakeListChatModel):
+            def invoke(self, input, *args, **kwargs):
+                calls.append(input)
+                return super().invoke(input, *args, **kwargs)
+        
+        llm = CountingModel(responses=["The user asked several questions."] * 100)
+        memory = TokenBudgetMemory(max_token_limit=200, count_tokens=count_words, llm=llm)
+        save_turns(memory, 30)
+        
+        # Pruning down to the low-water mark folds several turns per summary
+        assert 0 < len(calls) < 30
+        # Each update only sends the previous summary and the newly pruned lines
+        assert "The user asked several questions." in calls[-1]
+        assert memory.moving_summary_buffer == "The user asked several questions."
+        assert memory.token_count() <= 200
+    
+    def test_oversized_turn_is_truncated(self):
+        """Test that a single turn larger than the budget is shortened."""
+        memory = TokenBudgetMemory(max_token_limit=100, count_tokens=count_words)
+        memory.save_context({"input": "word " * 500}, {"output": "reply " * 500})
+        
+        assert memory.token_count() <= 100
+        assert memory.chat_memory.messages[0].content.endswith("[...]")
+    
+    def test_string_history_and_clear(self):
+        """Test string output for text prompts and that clear resets the summary."""
+        memory = TokenBudgetMemory(max_token_limit=60, count_tokens=count_words)
+        save_turns(memory, 5)
+        
+        history = memory.load_memory_variables({})["chat_history"]
+        assert isinstance(history, str)
+        assert "Summary of the earlier conversation" in history
+        
+        memory.clear()
+        assert memory.load_memory_variables({})["chat_history"] == ""
+        assert memory.token_count() == 0
+    
+    @pytest.mark.asyncio
+    async def test_asave_context(self):
+        """Test that the async path prunes too."""
+        memory = TokenBudgetMemory(max_token_limit=100, count_tokens=count_words)
+        for i in range(20):
+            await memory.asave_context({"input": f"question {i} " * 10}, {"output": f"answer {i} " * 10})
+        assert memory.token_count() <= 100
@@ -0,0 +1,136 @@
+"""Tests for the agent metrics."""
+
+import json
+import pytest
+from unittest.mock import MagicMock
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import create_research_agent, MetricsCallbackHandler, MetricsRegistry
+from agent.metrics import Histogram, _token_usage, percentile
+from benchmarks.fake_llm import ScriptedChatModel, react_final, react_step
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+
+class TestMetricsRegistry:
+    """Test suite for the MetricsRegistry."""
+    
+    def test_counters_and_histograms(self):
+        """Test that counters add up and histograms summarize observations."""
+        registry = MetricsRegistry()
+        registry.inc("agent_tool_calls_total", labels={"tool": "WeatherTool"})
+        registry.inc("agent_tool_calls_total", labels={"tool": "WeatherTool"})
+        for value in (0.1, 0.2, 0.3, 0.4):
+            registry.observe("agent_tool_latency_seconds", value, {"tool": "WeatherTool"})
+        
+        assert registry.counter("agent_tool_calls_total", {"tool": "WeatherTool"}) == 2
+        assert registry.counter("agent_tool_calls_total", {"tool": "WikipediaTool"}) == 0
+        summary = registry.histogram("agent_tool_latency_seconds", {"tool": "WeatherTool"}).summary()
+        assert summary["count"] == 4
+        assert summary["p50"] == pytest.approx(0.25)
+        assert summary["max"] == 0.4
+    
+    def test_histogram_buckets(self):
+        """Test that bucket counts are cumulative and end with +Inf."""
+        histogram = Histogram(buckets=(1, 5))
+        for value in (0.5, 2, 3, 100):
+            histogram.observe(value)
+        assert histogram.cumulative_counts() == [1, 3, 4]
+    
+    def test_percentile(self):
+        """Test interpolated percentiles, including the median of an even count."""
+        assert percentile([], 50) == 0.0
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+        assert percentile(list(range(1, 101)), 90) == pytest.approx(90.1)
+        assert percentile([5.0, 1.0, 3.0], 100) == 5.0
+    
+    def test_prometheus_export(self):
+        """Test the Prometheus text format, including label escaping."""
+        registry = MetricsRegistry()
+        registry.inc("agent_runs_total")
+        registry.observe("agent_llm_latency_seconds", 0.3, {"model": 'gpt-"4o"'})
+        registry.register_collector("test", lambda: [("agent_cache_hit_ratio", {"cache": "weather"}, 0.5)])
+        
+        text = registry.to_prometheus()
+        assert "# TYPE agent_runs_total counter\nagent_runs_total 1\n" in text
+        assert 'agent_llm_latency_seconds_bucket{model="gpt-\\"4o\\"",le="0.25"} 0' in text
+        assert 'agent_llm_latency_seconds_bucket{model="gpt-\\"4o\\"",le="0.5"} 1' in text
+        assert 'agent_llm_latency_seconds_bucket{model="gpt-\\"4o\\"",le="+Inf"} 1' in text
+        assert 'agent_llm_latency_seconds_count{model="gpt-\\"4o\\""} 1' in text
+        assert 'agent_cache_hit_ratio{cache="weather"} 0.5' in text
+    
+    def test_snapshot_is_json(self):
+        """Test that snapshots serialize to JSON."""
+        registry = MetricsRegistry()
+        registry.observe("agent_iterations", 2, buckets=(1, 2, 3))
+        snapshot = json.loads(json.dumps(registry.snapshot()))
+        assert snapshot["histograms"]["agent_iterations"][0]["value"]["count"] == 1
+
+
+class TestMetricsCallbackHandler:
+    """Test suite for the MetricsCallbackHandler."""
+    
+    def test_token_usage(self):
+        """Test token counts from usage metadata and from llm_output."""
+        message = AIMessage(content="hi", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+        assert _token_usage(LLMResult(generations=[[ChatGeneration(message=message)]])) == (12, 3)
+        
+        response = LLMResult(generations=[[]], llm_output={"token_usage": {"prompt_tokens": 7, "completion_tokens": 2}})
+        assert _token_usage(response) == (7, 2)
+    
+    def test_agent_run(self):
+        """Test that create_research_agent wires LLM, tool, run and cache metrics."""
+        registry = MetricsRegistry()
+        llm = ScriptedChatModel(responses=[
+            react_step("CalculatorTool", "15^2 + 27"),
+            react_step("CalculatorTool", "2 + 2"),
+            react_final("252"),
+        ])
+        agent = create_research_agent(llm=llm, metrics=registry)
+        
+        assert agent.invoke({"input": "What is 15 squared plus 27?"})["output"] == "252"
+        
+        assert registry.counter("agent_runs_total") == 1
+        assert registry.counter("agent_llm_calls_total", {"model": "ScriptedChatModel"}) == 3
+        assert registry.counter("agent_tool_calls_total", {"tool": "CalculatorTool"}) == 2
+        assert registry.counter("agent_tool_errors_total", {"tool": "CalculatorTool"}) == 0
+        assert registry.histogram("agent_iterations").summary()["max"] == 2
+        assert registry.histogram("agent_run_latency_seconds").count == 1
+        
+        gauges = registry.snapshot()["gauges"]
+        caches = {series["labels"]["cache"] for series in gauges["agent_cache_hit_ratio"]}
+        assert caches == {"wikipedia_search", "wikipedia_page", "geocode", "weather"}
+    
+    def test_shared_model_untouched(self):
+        """Test that agents sharing a model record only their own runs."""
+        registry, other = MetricsRegistry(), MetricsRegistry()
+        llm = ScriptedChatModel(responses=[react_final("ok")])
+        create_research_agent(llm=llm, metrics=other)
+        agent = create_research_agent(llm=llm, metrics=registry)
+        assert llm.callbacks is None
+        assert all(tool.callbacks is None for tool in agent.tools)
+        
+        agent.invoke({"input": "hello"})
+        assert registry.counter("agent_llm_calls_total", {"model": "ScriptedChatModel"}) == 1
+        assert other.counter("agent_llm_calls_total", {"model": "ScriptedChatModel"}) == 0
+        
+        # A handler for the same registry in the run config is not doubled
+        agent.invoke({"input": "hello"}, config={"callbacks": [MetricsCallbackHandler(registry)]})
+        assert registry.counter("agent_llm_calls_total", {"model": "ScriptedChatModel"}) == 2
+        assert registry.counter("agent_runs_total") == 2
+    
+    def test_tool_error(self):
+        """Test that tool failures are counted."""
+        registry = MetricsRegistry()
+        handler = MetricsCallbackHandler(registry)
+        run_id = MagicMock()
+        handler.on_tool_start({"name": "WeatherTool"}, "Atlantis", run_id=run_id)
+        handler.on_tool_end("Error retrieving weather information: not found", run_id=run_id)
+        
+        assert registry.counter("agent_tool_errors_total", {"tool": "WeatherTool"}) == 1
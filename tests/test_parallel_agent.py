@@ -0,0 +1,113 @@
+"""Tests for the ParallelAgentExecutor."""
+
+import time
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import ParallelAgentExecutor
+from langchain.agents import create_tool_calling_agent
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.tools import BaseTool
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class ToolCallingFakeModel(BaseChatModel):
+    """Fake chat model that replays scripted messages, including tool calls."""
+    
+    messages: list
+    
+    @property
+    def _llm_type(self) -> str:
+        return "tool-calling-fake"
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.messages.pop(0))])
+    
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class SlowTool(BaseTool):
+    """Tool that sleeps before answering, to expose sequential execution."""
+    
+    name: str = "SlowTool"
+    description: str = "Slow tool"
+    delay: float = 0.2
+    
+    def _run(self, query: str) -> str:
+        time.sleep(self.delay)
+        return f"{self.name}: {query}"
+
+
+def make_executor(messages, tools):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a test agent."),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+    llm = ToolCallingFakeModel(messages=list(messages))
+    agent = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
+    return ParallelAgentExecutor(agent=agent, tools=tools, return_intermediate_steps=True)
+
+
+class TestParallelAgentExecutor:
+    """Test suite for the ParallelAgentExecutor."""
+    
+    def test_tool_calls_run_concurrently(self):
+        """Test that a step takes as long as its slowest tool, not the sum."""
+        tools = [SlowTool(name="WikipediaTool"), SlowTool(name="WeatherTool")]
+        messages = [
+            AIMessage(content="", tool_calls=[
+                {"name": "WikipediaTool", "args": {"query": "capital of France"}, "id": "call_1"},
+                {"name": "WeatherTool", "args": {"query": "Paris"}, "id": "call_2"},
+            ]),
+            AIMessage(content="Paris, 12°C"),
+        ]
+        executor = make_executor(messages, tools)
+        
+        start = time.perf_counter()
+        result = executor.invoke({"input": "What is the capital of France and its weather?"})
+        elapsed = time.perf_counter() - start
+        
+        assert result["output"] == "Paris, 12°C"
+        observations = [observation for _, observation in result["intermediate_steps"]]
+        # Observations keep the order in which the model requested the tools
+        assert observations == ["WikipediaTool: capital of France", "WeatherTool: Paris"]
+        assert elapsed < 2 * 0.2
+    
+    def test_single_tool_call(self):
+        """Test that steps with one tool call behave like AgentExecutor."""
+        tools = [SlowTool(name="WikipediaTool", delay=0)]
+        messages = [
+            AIMessage(content="", tool_calls=[
+                {"name": "WikipediaTool", "args": {"query": "Microsoft"}, "id": "call_1"},
+            ]),
+            AIMessage(content="Satya Nadella"),
+        ]
+        result = make_executor(messages, tools).invoke({"input": "Who is the CEO of Microsoft?"})
+        
+        assert result["output"] == "Satya Nadella"
+        assert len(result["intermediate_steps"]) == 1
+    
+    @pytest.mark.asyncio
+    async def test_ainvoke(self):
+        """Test that the async path also runs the tool calls of a step."""
+        tools = [SlowTool(name="WikipediaTool", delay=0), SlowTool(name="WeatherTool", delay=0)]
+        messages = [
+            AIMessage(content="", tool_calls=[
+                {"name": "WikipediaTool", "args": {"query": "Tokyo"}, "id": "call_1"},
+                {"name": "WeatherTool", "args": {"query": "Tokyo"}, "id": "call_2"},
+            ]),
+            AIMessage(content="done"),
+        ]
+        result = await make_executor(messages, tools).ainvoke({"input": "Tokyo"})
+        
+        assert result["output"] == "done"
+        assert len(result["intermediate_steps"]) == 2
@@ -0,0 +1,211 @@
+"""Tests for the adaptive outbound rate limiters."""
+
+import pytest
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.ratelimit import (
+    AdaptiveRateLimiter,
+    AsyncRateLimitedTransport,
+    LangChainRateLimiter,
+    RateLimitedTransport,
+    get_rate_limiter,
+)
+from tools.transport import PerLoopAsyncTransport
+
+
+class TestAdaptiveRateLimiter:
+    """Test suite for the AdaptiveRateLimiter."""
+    
+    def test_token_bucket_limits_rate(self):
+        """Test that requests beyond the burst wait for tokens."""
+        limiter = AdaptiveRateLimiter("test", rate=20, burst=1, max_concurrency=8)
+        
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire(slot=False)
+        elapsed = time.monotonic() - start
+        
+        # The first is free, the other four wait 1/20 s each
+        assert elapsed >= 0.18
+        stats = limiter.stats()
+        assert stats["acquired"] == 5
+        assert stats["waited"] == 4
+        assert stats["wait_seconds"] > 0.15
+    
+    def test_non_blocking_acquire(self):
+        """Test that a non-blocking acquire fails instead of waiting."""
+        limiter = AdaptiveRateLimiter("test", rate=1, burst=1)
+        
+        assert limiter.acquire(slot=False, blocking=False) == 0.0
+        assert limiter.acquire(slot=False, blocking=False) is None
+    
+    def test_concurrency_limit(self):
+        """Test that no more than the concurrency limit run at once."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+        
+        def request():
+            limiter.acquire()
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            limiter.release(0.05)
+        
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda _: request(), range(6)))
+        
+        assert max(peak) == 2
+        assert limiter.stats()["in_flight"] == 0
+        assert limiter.stats()["waited"] >= 4
+    
+    def test_aimd(self):
+        """Test that throttling halves the limit once and fast successes grow it back."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=8, latency_target=1)
+        
+        limiter.observe(0.1, throttled=True)
+        assert limiter.stats()["concurrency_limit"] == 4
+        
+        # Sent before the decrease, at the old limit: no second halving
+        limiter.observe(10, throttled=True)
+        assert limiter.stats()["concurrency_limit"] == 4
+        assert limiter.stats()["throttled"] == 2
+        assert limiter.stats()["decreases"] == 1
+        
+        # About one more slot per limit's worth of successes
+        for _ in range(5):
+            limiter.observe(0.01)
+        assert limiter.stats()["concurrency_limit"] == 5
+        for _ in range(100):
+            limiter.observe(0.01)
+        assert limiter.stats()["concurrency_limit"] == 8
+    
+    def test_slow_responses_decrease(self):
+        """Test that responses slower than the latency target shrink the limit."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=8, latency_target=0.5)
+        
+        limiter.observe(0.6)
+        assert limiter.stats()["concurrency_limit"] == 4
+        assert limiter.stats()["slow"] == 1
+        
+        # Failures without a response leave the limit alone
+        limiter.observe(0.01, error=True)
+        assert limiter.stats()["concurrency_limit"] == 4
+    
+    def test_retry_after_pauses(self):
+        """Test that a Retry-After holds back the next requests."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=8)
+        limiter.observe(0.01, throttled=True, retry_after=0.2)
+        
+        start = time.monotonic()
+        limiter.acquire()
+        assert time.monotonic() - start >= 0.15
+        limiter.release(0.01)
+    
+    @pytest.mark.asyncio
+    async def test_async_waits_for_thread_release(self):
+        """Test that a coroutine is woken when a thread releases its slot."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=1)
+        limiter.acquire()
+        
+        threading.Timer(0.1, limiter.release, args=(0.1,)).start()
+        start = time.monotonic()
+        wait = await asyncio.wait_for(limiter.aacquire(), 2)
+        
+        assert 0.05 < wait < 1
+        assert time.monotonic() - start < 1
+        limiter.release(0.01)
+        assert limiter.stats()["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter(self):
+        """Test that a cancelled waiter takes no slot."""
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=1)
+        await limiter.aacquire()
+        
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0.05)
+        assert limiter.stats()["waiting"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        
+        stats = limiter.stats()
+        assert stats["waiting"] == 0
+        assert stats["in_flight"] == 1
+        limiter.release(0.01)
+        assert await limiter.aacquire() == 0.0
+    
+    def test_shared_per_upstream(self):
+        """Test that each upstream has one process-wide limiter."""
+        assert get_rate_limiter("test-upstream") is get_rate_limiter("test-upstream")
+        assert get_rate_limiter("test-upstream") is not get_rate_limiter("other-upstream")
+
+
+class TestLangChainIntegration:
+    """Test suite for the chat model adapters."""
+    
+    @pytest.mark.asyncio
+    async def test_langchain_rate_limiter(self):
+        """Test that the adapter takes tokens without holding a slot."""
+        limiter = AdaptiveRateLimiter("test", rate=1, burst=2, max_concurrency=1)
+        adapter = LangChainRateLimiter(limiter)
+        
+        assert adapter.acquire() is True
+        assert await adapter.aacquire() is True
+        assert adapter.acquire(blocking=False) is False
+        assert limiter.stats()["in_flight"] == 0
+    
+    def test_transport_reports_throttling(self):
+        """Test that a 429 from the model API pauses the limiter."""
+        def handler(request):
+            if request.url.path == "/busy":
+                return httpx.Response(429, headers={"Retry-After": "3"})
+            return httpx.Response(200, json={})
+        
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=8)
+        client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter))
+        
+        assert client.get("http://api.test/ok").status_code == 200
+        assert client.get("http://api.test/busy").status_code == 429
+        
+        stats = limiter.stats()
+        assert stats["throttled"] == 1
+        assert stats["concurrency_limit"] == 4
+        assert limiter.acquire(blocking=False) is None
+        client.close()
+    
+    def test_async_transport_across_loops(self):
+        """Test that async model calls on separate loops report throttling and free their pools."""
+        def handler(request):
+            return httpx.Response(429)
+        
+        limiter = AdaptiveRateLimiter("test", rate=0, max_concurrency=8)
+        transport = PerLoopAsyncTransport(lambda: AsyncRateLimitedTransport(httpx.MockTransport(handler), limiter))
+        client = httpx.AsyncClient(transport=transport)
+        
+        async def call():
+            return (await client.get("http://api.test/busy")).status_code
+        
+        assert asyncio.run(call()) == 429
+        assert asyncio.run(call()) == 429
+        
+        assert limiter.stats()["throttled"] == 2
+        assert limiter.stats()["concurrency_limit"] < 8
+        # Each loop's pool was closed when its loop shut down
+        assert len(transport.transports) == 0
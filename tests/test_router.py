@@ -0,0 +1,122 @@
+"""Tests for the fast-path router."""
+
+import pytest
+
+import sys
+import os
+import logging
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import create_research_agent
+from agent.metrics import MetricsRegistry
+from agent.router import FastPathRouter, Route, format_answer
+from agent.streaming import stream_agent
+from benchmarks.fake_llm import ScriptedChatModel, react_final
+
+WEATHER_OBSERVATION = """Current weather for Tokyo, Japan:
+
+Temperature: 18.2°C
+Feels like: 17.5°C
+Humidity: 60%
+Precipitation: 0.0 mm
+Wind: 12.3 km/h
+Wind direction: 180°
+"""
+
+
+class TestFastPathRouter:
+    """Test suite for the FastPathRouter."""
+    
+    @pytest.mark.parametrize("query,tool,tool_input", [
+        ("What is the weather in Tokyo?", "WeatherTool", "Tokyo"),
+        ("what's the weather like in New York right now?", "WeatherTool", "New York"),
+        ("weather in Paris, France", "WeatherTool", "Paris, France"),
+        ("Tokyo weather", "WeatherTool", "Tokyo"),
+        ("What is the weather in New York like?", "WeatherTool", "New York"),
+        ("What's the temperature in Celsius in New York?", "WeatherTool", "New York"),
+        ("current weather in Paris in Celsius", "WeatherTool", "Paris"),
+        ("What is 2 + 2?", "CalculatorTool", "2 + 2"),
+        ("calculate sqrt(144) / 3", "CalculatorTool", "sqrt(144) / 3"),
+    ])
+    def test_routed(self, query, tool, tool_input):
+        """Test that plain weather and arithmetic queries are routed."""
+        route = FastPathRouter(threshold=0.8).route(query)
+        assert (route.tool, route.tool_input) == (tool, tool_input)
+    
+    @pytest.mark.parametrize("query", [
+        "Who is the CEO of Microsoft?",
+        "What is 15 squared plus 27?",
+        "What's the weather in Tokyo tomorrow?",
+        "What is the weather there?",
+        "What is the weather?",
+        "I love rainy weather",
+        "2020",
+        "What's the weather in Paris and how about London?",
+        "weather in Paris & Rome",
+        "current weather",
+        "best weather",
+        "today's weather",
+        "weather today",
+    ])
+    def test_not_routed(self, query):
+        """Test that other queries fall through to the agent."""
+        assert FastPathRouter(threshold=0.8).route(query) is None
+    
+    def test_threshold_and_stats(self, caplog):
+        """Test that the threshold applies and decisions are logged and counted."""
+        router = FastPathRouter(threshold=0.9)
+        
+        with caplog.at_level(logging.INFO, logger="agent.router"):
+            assert router.route("Tokyo weather") is None
+            assert router.route("What is the weather in Tokyo?").confidence == 0.95
+            assert router.route("Who founded Microsoft?") is None
+        
+        assert "fast path: WeatherTool('Tokyo') confidence=0.95" in caplog.text
+        stats = router.stats()
+        assert stats["decisions"] == 3
+        assert stats["routed"] == 1
+        assert stats["outcomes"] == {"below_threshold": 1, "WeatherTool": 1, "agent": 1}
+    
+    def test_format_answer(self):
+        """Test the answer templates and the failure signal."""
+        weather = Route("WeatherTool", "Tokyo", 0.95, "")
+        assert format_answer(weather, WEATHER_OBSERVATION) == (
+            "The current weather in Tokyo, Japan: 18.2°C, feeling like 17.5°C, with 60% humidity, "
+            "0.0 mm of precipitation and wind at 12.3 km/h."
+        )
+        assert format_answer(Route("CalculatorTool", "2 + 2", 0.99, ""), "Answer: 4") == "2 + 2 = 4"
+        assert format_answer(weather, "Error retrieving weather information: timeout") is None
+
+
+class TestFastPathExecutor:
+    """Test suite for routed runs of the agent."""
+    
+    def test_routed_query_skips_model(self):
+        """Test that a routed query is answered by the tool alone."""
+        llm = ScriptedChatModel(responses=[react_final("from the agent")])
+        agent = create_research_agent(llm=llm, metrics=MetricsRegistry(), router=FastPathRouter(threshold=0.8))
+        
+        assert agent.invoke({"input": "What is 2 + 2?"})["output"] == "2 + 2 = 4"
+        assert llm.calls == 0
+        assert len(agent.memory.chat_memory.messages) == 2
+    
+    def test_tool_error_falls_back(self):
+        """Test that the agent takes over when the routed tool fails."""
+        router = FastPathRouter(threshold=0.8)
+        llm = ScriptedChatModel(responses=[react_final("Division by zero is undefined.")])
+        agent = create_research_agent(llm=llm, metrics=MetricsRegistry(), router=router)
+        
+        assert agent.invoke({"input": "What is 1 / 0?"})["output"] == "Division by zero is undefined."
+        assert llm.calls == 1
+        assert router.stats()["outcomes"]["fallback"] == 1
+    
+    def test_streaming_events(self):
+        """Test that routed runs stream tool events and the final answer."""
+        llm = ScriptedChatModel(responses=[react_final("unused")])
+        agent = create_research_agent(llm=llm, metrics=MetricsRegistry(), router=FastPathRouter(threshold=0.8))
+        
+        events = list(stream_agent(agent, {"input": "calculate 3^4"}))
+        assert [event["type"] for event in events] == ["tool_start", "tool_end", "final"]
+        assert events[-1]["output"] == "3^4 = 81"
@@ -0,0 +1,171 @@
+"""Tests for the HTTP service."""
+
+import pytest
+
+import sys
+import os
+import asyncio
+import json
+
+import httpx
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+from agent import create_research_agent
+from agent.metrics import MetricsRegistry
+from agent.router import FastPathRouter
+from agent.server import AgentService, DeadlineExceeded, Rejected, create_app
+from benchmarks.fake_llm import ScriptedChatModel, react_final
+
+
+class SlowAgent:
+    """Agent stand-in that answers after a delay."""
+    
+    created = 0
+    
+    def __init__(self, delay=0.3):
+        SlowAgent.created += 1
+        self.delay = delay
+    
+    async def ainvoke(self, inputs, config=None):
+        await asyncio.sleep(self.delay)
+        return {"output": f"Answer to {inputs['input']}"}
+
+
+def scripted_agent():
+    llm = ScriptedChatModel(responses=[react_final("Scripted answer.")])
+    return create_research_agent(llm=llm, metrics=MetricsRegistry(), router=FastPathRouter(threshold=0.8))
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestHTTP:
+    """Test suite for the HTTP endpoints."""
+    
+    def test_query(self):
+        """Test a JSON query and the metrics it leaves."""
+        registry = MetricsRegistry()
+        app = create_app(AgentService(scripted_agent, registry=registry))
+        
+        with TestClient(app) as client:
+            response = client.post("/query", json={"query": "Who founded Microsoft?"})
+            assert response.status_code == 200
+            assert response.json()["answer"] == "Scripted answer."
+            assert response.json()["run_seconds"] >= 0
+            
+            metrics = client.get("/metrics").text
+            assert 'agent_server_responses_total{status="200"} 1' in metrics
+            assert "agent_server_queue_depth 0" in metrics
+            assert client.get("/health").json()["queue_depth"] == 0
+    
+    def test_stream(self):
+        """Test that streaming queries send agent events, then done."""
+        app = create_app(AgentService(scripted_agent, registry=MetricsRegistry()))
+        
+        with TestClient(app) as client:
+            response = client.post("/query", json={"query": "What is 2 + 2?", "stream": True})
+        
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [name for name, _ in events] == ["tool_start", "tool_end", "final", "done"]
+        assert events[-1][1]["answer"] == "2 + 2 = 4"
+    
+    def test_bad_request(self):
+        """Test that queries without text or with a bad timeout are rejected."""
+        app = create_app(AgentService(scripted_agent, registry=MetricsRegistry()))
+        
+        with TestClient(app) as client:
+            assert client.post("/query", json={"question": "hi"}).status_code == 400
+            assert client.post("/query", json={"query": "hi", "timeout": -1}).status_code == 400
+            assert client.post("/query", content=b"not json").status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_backpressure_and_deadline(self):
+        """Test the 429 with Retry-After when the queue is full, and the 504 at the deadline."""
+        service = AgentService(SlowAgent, workers=1, queue_size=2, client_limit=10, registry=MetricsRegistry())
+        app = create_app(service)
+        await service.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                responses = await asyncio.gather(*(
+                    client.post("/query", json={"query": f"q{i}"}) for i in range(5)
+                ))
+                # Two queued, plus at most one the worker took before the rest arrived
+                statuses = [response.status_code for response in responses]
+                assert set(statuses) == {200, 429}
+                assert statuses.count(429) >= 2
+                rejected = next(response for response in responses if response.status_code == 429)
+                assert rejected.json()["reason"] == "queue_full"
+                assert int(rejected.headers["Retry-After"]) >= 1
+                
+                response = await client.post("/query", json={"query": "slow", "timeout": 0.05})
+                assert response.status_code == 504
+        finally:
+            await service.stop()
+
+
+class TestAgentService:
+    """Test suite for the AgentService queue."""
+    
+    @pytest.mark.asyncio
+    async def test_client_limit(self):
+        """Test that one client cannot take more than its share."""
+        service = AgentService(SlowAgent, workers=1, queue_size=10, client_limit=1, registry=MetricsRegistry())
+        await service.start()
+        try:
+            first = service.submit("q1", "alice")
+            with pytest.raises(Rejected) as excinfo:
+                service.submit("q2", "alice")
+            assert excinfo.value.reason == "client_limit"
+            other = service.submit("q3", "bob")
+            
+            assert (await first.result)["answer"] == "Answer to q1"
+            assert (await other.result)["answer"] == "Answer to q3"
+            # The slot is free again once the query is done
+            assert (await service.submit("q4", "alice").result)["answer"] == "Answer to q4"
+            assert service.registry.counter("agent_server_rejected_total", {"reason": "client_limit"}) == 1
+        finally:
+            await service.stop()
+    
+    @pytest.mark.asyncio
+    async def test_expired_in_queue(self):
+        """Test that a query whose deadline passes in the queue is never run."""
+        service = AgentService(SlowAgent, workers=1, queue_size=10, client_limit=10, registry=MetricsRegistry())
+        await service.start()
+        try:
+            SlowAgent.created = 0
+            first = service.submit("q1", "alice")
+            second = service.submit("q2", "alice", timeout=0.05)
+            
+            with pytest.raises(DeadlineExceeded, match="queued"):
+                await second.result
+            await first.result
+            assert SlowAgent.created == 1
+        finally:
+            await service.stop()
+    
+    @pytest.mark.asyncio
+    async def test_cancel_frees_worker(self):
+        """Test that cancelling a running query lets the worker take the next one."""
+        service = AgentService(lambda: SlowAgent(delay=5), workers=1, queue_size=10, client_limit=10, registry=MetricsRegistry())
+        await service.start()
+        try:
+            job = service.submit("q1", "alice")
+            await asyncio.sleep(0.05)
+            job.cancel()
+            service.agent_factory = SlowAgent
+            
+            result = await asyncio.wait_for(service.submit("q2", "alice").result, timeout=2)
+            assert result["answer"] == "Answer to q2"
+            assert service.stats()["clients"] == 0
+        finally:
+            await service.stop()
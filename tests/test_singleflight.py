@@ -0,0 +1,166 @@
+"""Tests for single-flight request coalescing."""
+
+import pytest
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import WeatherTool
+from tools.singleflight import SingleFlight
+
+
+def weather_response(url):
+    response = MagicMock()
+    response.status_code = 200
+    if "geocoding-api" in url:
+        response.json.return_value = {
+            "results": [{"name": "Tokyo", "country": "Japan", "latitude": 35.69, "longitude": 139.69}]
+        }
+    else:
+        response.json.return_value = {"current": {"temperature_2m": 18.0}}
+    return response
+
+
+class TestSingleFlight:
+    """Test suite for the SingleFlight group."""
+    
+    def test_threads_share_one_call(self):
+        """Test that concurrent identical thread calls run the function once."""
+        group = SingleFlight()
+        calls = []
+        
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"answer": 42}
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: group.do("key", fetch), range(8)))
+        
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert group.stats() == {"leaders": 1, "shared": 7, "in_flight": 0}
+    
+    def test_errors_are_shared(self):
+        """Test that every waiter gets the error of the shared call."""
+        group = SingleFlight()
+        calls = []
+        
+        def fail():
+            calls.append(1)
+            time.sleep(0.1)
+            raise ValueError("upstream down")
+        
+        def call(_):
+            try:
+                group.do("key", fail)
+            except ValueError as e:
+                return str(e)
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert list(executor.map(call, range(4))) == ["upstream down"] * 4
+        assert len(calls) == 1
+        # Nothing stays in flight, so the next call runs again
+        with pytest.raises(ValueError):
+            group.do("key", fail)
+        assert len(calls) == 2
+    
+    def test_async_callers_share_one_call(self):
+        """Test that concurrent identical coroutines run the function once."""
+        group = SingleFlight()
+        calls = []
+        
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+        
+        async def main():
+            return await asyncio.gather(*(group.ado("key", fetch) for _ in range(5)), group.ado("other", fetch))
+        
+        assert asyncio.run(main()) == ["result"] * 6
+        assert len(calls) == 2
+    
+    def test_async_waits_for_thread(self):
+        """Test that a coroutine on another thread's loop waits for a call a thread started."""
+        group = SingleFlight()
+        started = threading.Event()
+        
+        def fetch():
+            started.set()
+            time.sleep(0.2)
+            return "from thread"
+        
+        async def never_called():
+            raise AssertionError("the call in flight should be shared")
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(group.do, "key", fetch)
+            started.wait()
+            assert asyncio.run(group.ado("key", never_called)) == "from thread"
+            assert future.result() == "from thread"
+    
+    def test_cancelled_caller_does_not_cancel_call(self):
+        """Test that the others still get the result if the first caller is cancelled."""
+        group = SingleFlight()
+        calls = []
+        
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "result"
+        
+        async def main():
+            first = asyncio.ensure_future(group.ado("key", fetch))
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(group.ado("key", fetch))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+        
+        assert asyncio.run(main()) == "result"
+        assert len(calls) == 1
+
+
+class TestToolCoalescing:
+    """Test suite for coalesced tool requests."""
+    
+    @pytest.mark.asyncio
+    async def test_weather_async(self):
+        """Test that identical concurrent async weather calls make one request of each kind."""
+        requests_made = []
+        
+        async def fake_get(url, **kwargs):
+            requests_made.append(url)
+            await asyncio.sleep(0.05)
+            return weather_response(url)
+        
+        tool = WeatherTool()
+        with patch('httpx.AsyncClient.get', side_effect=fake_get):
+            results = await asyncio.gather(*(tool._arun("Kyoto Prefecture") for _ in range(10)))
+        
+        assert all("Temperature: 18.0°C" in result for result in results)
+        assert len(requests_made) == 2
+    
+    @patch('requests.Session.get')
+    def test_weather_threads(self, mock_get):
+        """Test that identical concurrent thread calls make one request of each kind."""
+        def fake_get(url, **kwargs):
+            time.sleep(0.05)
+            return weather_response(url)
+        
+        mock_get.side_effect = fake_get
+        tool = WeatherTool()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: tool._run("Kyoto Prefecture"), range(10)))
+        
+        assert all("Temperature: 18.0°C" in result for result in results)
+        assert mock_get.call_count == 2
@@ -0,0 +1,96 @@
+"""Tests for lazy imports and the startup profile."""
+
+import pytest
+
+import sys
+import os
+import subprocess
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import agent
+import tools
+from agent.startup import StartupProfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_python(args, **kwargs):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        **kwargs,
+    )
+
+
+class TestLazyImports:
+    """Test suite for the lazily imported package exports."""
+    
+    def test_packages_import_nothing_heavy(self):
+        """Test that importing the packages does not load LangChain or the HTTP clients."""
+        script = (
+            "import sys, agent, tools, tools.math_engine, agent.startup; "
+            "print(sorted(m for m in ('langchain', 'langchain_core', 'langchain_openai', 'wikipedia', 'requests', 'httpx') "
+            "if m in sys.modules))"
+        )
+        result = run_python(["-c", script])
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+    
+    def test_exports_resolve(self):
+        """Test that the exports resolve on first access and unknown names fail."""
+        from agent.agent import create_research_agent
+        from tools.weather_tool import WeatherTool
+        
+        assert agent.create_research_agent is create_research_agent
+        assert tools.WeatherTool is WeatherTool
+        assert "CalculatorTool" in dir(tools)
+        with pytest.raises(AttributeError):
+            agent.missing_name
+
+
+class TestStartupProfile:
+    """Test suite for the StartupProfile."""
+    
+    def test_phases_and_imports(self, tmp_path, monkeypatch):
+        """Test that phases are timed and imports are charged to their package."""
+        (tmp_path / "startup_probe.py").write_text("import time\ntime.sleep(0.05)\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, "startup_probe", raising=False)
+        profile = StartupProfile()
+        
+        with profile.phase("probe"):
+            import startup_probe  # noqa: F401
+        with profile.phase("work"):
+            sum(range(1000))
+        
+        probe, work = profile.phases
+        assert probe["modules"] >= 1
+        assert probe["import_ms"] >= 45
+        assert profile.import_ms["startup_probe"] >= 45
+        assert work["import_ms"] == 0
+        assert profile.total_import_ms() == pytest.approx(probe["import_ms"] + work["import_ms"])
+        report = profile.report()
+        assert "probe" in report and "startup_probe" in report
+    
+    def test_disabled(self):
+        """Test that a disabled profile records and prints nothing."""
+        profile = StartupProfile(enabled=False)
+        with profile.phase("work"):
+            import json  # noqa: F401
+        assert profile.phases == []
+    
+    def test_main_profile_startup(self):
+        """Test that the CLI prints the breakdown before it starts."""
+        env = {**os.environ, "OPENAI_API_KEY": "sk-dummy-key-for-testing", "LLM_CACHE": "false"}
+        result = run_python(["main.py", "--profile-startup"], input="exit\n", env=env)
+        
+        assert result.returncode == 0, result.stderr
+        assert "Startup profile:" in result.stderr
+        assert "import agent" in result.stderr
+        assert "Import time by package:" in result.stderr
+        assert "Goodbye!" in result.stdout
@@ -0,0 +1,95 @@
+"""Tests for streaming agent execution."""
+
+import pytest
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.agent import get_prompt_template
+from agent.streaming import FinalAnswerFilter, astream_agent, stream_agent
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.prompts import PromptTemplate
+from langchain.tools import BaseTool
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+class FakeWeatherTool(BaseTool):
+    """Weather tool with a canned observation."""
+    
+    name: str = "WeatherTool"
+    description: str = "Mock Weather Tool"
+    
+    def _run(self, location: str) -> str:
+        return f"Temperature in {location}: 18°C"
+
+
+class BrokenWeatherTool(FakeWeatherTool):
+    """Weather tool that fails."""
+    
+    def _run(self, location: str) -> str:
+        raise RuntimeError("weather service down")
+
+
+def make_react_executor(tool_class=FakeWeatherTool):
+    messages = iter([
+        AIMessage(content="Thought: I need the weather\nAction: WeatherTool\nAction Input: Tokyo"),
+        AIMessage(content="Thought: I now know the final answer\nFinal Answer: It is 18°C in Tokyo."),
+    ])
+    llm = GenericFakeChatModel(messages=messages)
+    tools = [tool_class()]
+    prompt = PromptTemplate.from_template(get_prompt_template()).partial(chat_history="")
+    agent = create_react_agent(llm=llm, tools=tools, prompt=prompt)
+    return AgentExecutor(agent=agent, tools=tools)
+
+
+class TestFinalAnswerFilter:
+    """Test suite for the FinalAnswerFilter."""
+    
+    def test_marker_split_across_tokens(self):
+        """Test that the marker is found even when split between tokens."""
+        text_filter = FinalAnswerFilter()
+        tokens = ["Thought: done\nFinal ", "Ans", "wer: ", "Paris", " is the capital."]
+        assert "".join(text_filter.feed(token) for token in tokens) == "Paris is the capital."
+    
+    def test_no_marker(self):
+        """Test that reasoning without a final answer is not streamed."""
+        text_filter = FinalAnswerFilter()
+        assert text_filter.feed("Thought: I need the weather\nAction: WeatherTool") == ""
+
+
+class TestStreaming:
+    """Test suite for streaming agent execution."""
+    
+    @pytest.mark.asyncio
+    async def test_astream_agent(self):
+        """Test that tool calls, observations and answer tokens are streamed in order."""
+        events = [event async for event in astream_agent(make_react_executor(), {"input": "Weather in Tokyo?"})]
+        types = [event["type"] for event in events]
+        
+        assert types[0] == "tool_start"
+        assert events[0]["tool"] == "WeatherTool"
+        assert types[1] == "tool_end"
+        assert events[1]["output"] == "Temperature in Tokyo: 18°C"
+        assert types[-1] == "final"
+        assert events[-1]["output"] == "It is 18°C in Tokyo."
+        
+        tokens = [event["text"] for event in events if event["type"] == "token"]
+        # The answer arrives in several pieces, without the reasoning before it
+        assert len(tokens) > 1
+        assert "".join(tokens).strip() == "It is 18°C in Tokyo."
+    
+    def test_stream_agent(self):
+        """Test that the synchronous wrapper yields the same events."""
+        events = list(stream_agent(make_react_executor(), {"input": "Weather in Tokyo?"}))
+        
+        assert [event["type"] for event in events][:2] == ["tool_start", "tool_end"]
+        assert events[-1] == {"type": "final", "output": "It is 18°C in Tokyo."}
+    
+    def test_stream_agent_error(self):
+        """Test that errors raised by the agent reach the caller."""
+        with pytest.raises(RuntimeError, match="weather service down"):
+            list(stream_agent(make_react_executor(BrokenWeatherTool), {"input": "Weather in Tokyo?"}))
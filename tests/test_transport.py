@@ -0,0 +1,199 @@
+"""Tests for the shared HTTP transport."""
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import requests
+
+from tools.transport import HTTPTransport, get_transport
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves JSON, failing the first request to /flaky with a 503 and /busy with a long 429."""
+    
+    protocol_version = "HTTP/1.1"
+    flaky_calls = 0
+    busy_calls = 0
+    
+    def do_GET(self):
+        if self.path.startswith("/flaky"):
+            Handler.flaky_calls += 1
+            status = 503 if Handler.flaky_calls == 1 else 200
+        elif self.path.startswith("/busy"):
+            Handler.busy_calls += 1
+            status = 429
+        else:
+            status = 200
+        body = json.dumps({"path": self.path, "encoding": self.headers.get("Accept-Encoding")}).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "3600")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Run a local keep-alive HTTP server."""
+    Handler.flaky_calls = 0
+    Handler.busy_calls = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestHTTPTransport:
+    """Test suite for the HTTPTransport."""
+    
+    def test_connection_reuse(self, server):
+        """Test that sequential requests to a host share one connection."""
+        transport = HTTPTransport(retries=0)
+        for i in range(5):
+            data = transport.get_json(f"{server}/item/{i}")
+            assert data["path"] == f"/item/{i}"
+            assert "gzip" in data["encoding"]
+        
+        stats = transport.stats()["127.0.0.1:" + server.rsplit(":", 1)[1]]
+        assert stats["requests"] == 5
+        assert stats["errors"] == 0
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 4
+        transport.close()
+    
+    def test_retries_transient_status(self, server):
+        """Test that a 503 is retried with backoff."""
+        transport = HTTPTransport(retries=2, backoff_factor=0, backoff_jitter=0)
+        data = transport.get_json(f"{server}/flaky")
+        
+        assert data["path"] == "/flaky"
+        assert Handler.flaky_calls == 2
+        transport.close()
+    
+    def test_throttling_reported_to_limiter(self, server):
+        """Test that a retried 503 still counts as throttling for the host's limiter."""
+        transport = HTTPTransport(retries=2, backoff_factor=0, backoff_jitter=0)
+        transport.get_json(f"{server}/flaky")
+        transport.get_json(f"{server}/item/1")
+        
+        stats = transport.limiter(server.split("//", 1)[1]).stats()
+        assert stats["acquired"] == 2
+        assert stats["throttled"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["concurrency_limit"] < transport.limiter(server.split("//", 1)[1]).max_concurrency
+        transport.close()
+    
+    def test_rate_limits_disabled(self, monkeypatch):
+        """Test that RATE_LIMITS=false turns the limiters off."""
+        monkeypatch.setenv("RATE_LIMITS", "false")
+        
+        assert HTTPTransport().limiter("example.org") is None
+    
+    def test_long_retry_after_fails_fast(self, server):
+        """Test that a Retry-After beyond backoff_max fails at once instead of sleeping."""
+        transport = HTTPTransport(retries=2, backoff_max=1)
+        
+        start = time.monotonic()
+        with pytest.raises(requests.HTTPError):
+            transport.get_json(f"{server}/busy")
+        assert time.monotonic() - start < 1
+        assert Handler.busy_calls == 1
+        
+        # The host's other requests are paused for at most backoff_max
+        start = time.monotonic()
+        transport.get_json(f"{server}/item/1")
+        assert time.monotonic() - start < 1.5
+        transport.close()
+    
+    @pytest.mark.asyncio
+    async def test_async_long_retry_after_fails_fast(self, server):
+        """Test that the async client does not sleep for a long Retry-After either."""
+        transport = HTTPTransport(retries=2, backoff_max=1)
+        
+        start = time.monotonic()
+        with pytest.raises(httpx.HTTPStatusError):
+            await transport.aget_json(f"{server}/busy")
+        assert time.monotonic() - start < 1
+        assert Handler.busy_calls == 1
+        await transport.aclose()
+    
+    def test_connection_error_counted(self):
+        """Test that failures raise and are counted per host."""
+        transport = HTTPTransport(connect_timeout=0.5, retries=0)
+        with pytest.raises(requests.ConnectionError):
+            transport.get("http://127.0.0.1:9/unreachable")
+        
+        assert transport.stats()["127.0.0.1:9"]["errors"] == 1
+    
+    def test_timeouts_from_env(self, monkeypatch):
+        """Test that timeouts are configurable through the environment."""
+        monkeypatch.setenv("HTTP_CONNECT_TIMEOUT", "1.5")
+        monkeypatch.setenv("HTTP_READ_TIMEOUT", "4")
+        
+        assert HTTPTransport().timeout == (1.5, 4.0)
+    
+    def test_shared_instance(self):
+        """Test that all tools share one transport."""
+        assert get_transport() is get_transport()
+    
+    @pytest.mark.asyncio
+    async def test_async_get(self, server):
+        """Test the async client, including retries of transient statuses."""
+        transport = HTTPTransport(retries=2, backoff_factor=0, backoff_jitter=0)
+        
+        data = await transport.aget_json(f"{server}/item/1")
+        assert data["path"] == "/item/1"
+        
+        data = await transport.aget_json(f"{server}/flaky")
+        assert data["path"] == "/flaky"
+        assert Handler.flaky_calls == 2
+        
+        host = server.split("//", 1)[1]
+        assert transport.stats()[host]["requests"] == 3
+        assert transport.limiter(host).stats()["throttled"] == 1
+        assert transport.limiter(host).stats()["in_flight"] == 0
+        await transport.aclose()
+    
+    def test_async_client_per_loop(self, server):
+        """Test that separate event loops (e.g. asyncio.run) each get a client."""
+        transport = HTTPTransport(retries=0)
+        
+        async def fetch():
+            return await transport.aget_json(f"{server}/item/1")
+        
+        assert asyncio.run(fetch())["path"] == "/item/1"
+        assert asyncio.run(fetch())["path"] == "/item/1"
+    
+    def test_async_client_closed_with_loop(self, server):
+        """Test that a loop's client is closed when asyncio.run finishes."""
+        transport = HTTPTransport(retries=0)
+        clients = []
+        
+        async def fetch():
+            await transport.aget_json(f"{server}/item/1")
+            clients.append(transport._async_clients.current())
+        
+        for _ in range(5):
+            asyncio.run(fetch())
+        
+        assert len(set(map(id, clients))) == 5
+        assert all(client.is_closed for client in clients)
+        assert len(transport._async_clients) == 0
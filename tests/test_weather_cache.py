@@ -0,0 +1,75 @@
+"""Tests for the weather observation cache."""
+
+import pytest
+from unittest.mock import patch
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.weather_cache import WeatherCache, get_weather_cache
+
+
+def observation(time, interval=900, offset=0):
+    """Build an Open-Meteo style response."""
+    return {
+        "utc_offset_seconds": offset,
+        "current": {"time": time, "interval": interval, "temperature_2m": 20.0},
+    }
+
+
+class TestWeatherCache:
+    """Test suite for the WeatherCache."""
+    
+    def test_grid_cells(self):
+        """Test that nearby coordinates share a cell."""
+        cache = WeatherCache(grid=0.1)
+        cache.set(51.5085, -0.1257, observation("2099-01-01T00:00"))
+        
+        assert cache.get(51.51, -0.13) is not None
+        assert cache.get(51.7, -0.13) is None
+    
+    @patch("time.time")
+    def test_expires_with_upstream_interval(self, mock_time):
+        """Test that an observation expires when its 15-minute interval ends."""
+        # 2024-01-01T12:05 UTC, five minutes into the 12:00 interval
+        now = 1704110700.0
+        mock_time.return_value = now
+        
+        cache = WeatherCache()
+        cache.set(10.0, 10.0, observation("2024-01-01T12:00"))
+        
+        mock_time.return_value = now + 9 * 60
+        assert cache.get(10.0, 10.0) is not None
+        
+        mock_time.return_value = now + 10 * 60 + 1
+        assert cache.get(10.0, 10.0) is None
+        assert cache.stats()["expirations"] == 1
+    
+    @patch("tools.weather_cache.time.time")
+    def test_ttl_for(self, mock_time):
+        """Test expiry for local timestamps, stale data and missing times."""
+        mock_time.return_value = 1704110700.0  # 2024-01-01T12:05 UTC
+        cache = WeatherCache(ttl=900)
+        
+        # Local time 13:00 in UTC+1 is 12:00 UTC
+        assert cache._ttl_for(observation("2024-01-01T13:00", offset=3600)) == pytest.approx(600)
+        assert cache._ttl_for(observation("2024-01-01T11:00")) == 60
+        assert cache._ttl_for({"current": {}}) == 900
+    
+    def test_eviction_and_memory(self):
+        """Test that the cache is bounded and reports its memory use."""
+        cache = WeatherCache(maxsize=2)
+        for lat in (1.0, 2.0, 3.0):
+            cache.set(lat, 0.0, observation("2099-01-01T00:00"))
+        
+        stats = cache.stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        assert stats["memory_bytes"] > 0
+    
+    def test_shared_instance(self):
+        """Test that all tools share one weather cache."""
+        assert get_weather_cache() is get_weather_cache()
@@ -1,7 +1,10 @@
 """Tests for the WeatherTool."""
 
+import asyncio
+import time
 import pytest
 from unittest.mock import patch, MagicMock
+from urllib.parse import parse_qs, urlsplit
 
 import sys
 import os
@@ -10,6 +13,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from tools import WeatherTool
+from tools.geocoding import GeocodeCache
+from tools.weather_cache import WeatherCache
 
 
 class TestWeatherTool:
@@ -21,7 +26,7 @@ class TestWeatherTool:
         assert tool.name == "WeatherTool"
         assert "weather" in tool.description
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_coordinates(self, mock_get):
         """Test the _get_coordinates method."""
         # Mock the response for geocoding API
@@ -51,9 +56,22 @@ class TestWeatherTool:
         # Verify the mock was called correctly
         mock_get.assert_called_once()
         assert "geocoding-api.open-meteo.com" in mock_get.call_args[0][0]
-        assert "New York" in mock_get.call_args[0][0]
+        assert "name=New+York&" in mock_get.call_args[0][0]
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
+    def test_coordinates_url_encoded(self, mock_get):
+        """Test that reserved characters in a location stay in the name parameter."""
+        mock_get.return_value.json.return_value = {"results": [
+            {"name": "Port of Spain", "country": "Trinidad and Tobago", "latitude": 10.66, "longitude": -61.52},
+        ]}
+        
+        WeatherTool()._get_coordinates("Port of Spain, Trinidad & Tobago #1+?")
+        
+        query = parse_qs(urlsplit(mock_get.call_args[0][0]).query)
+        assert query["name"] == ["Port of Spain, Trinidad & Tobago #1+?"]
+        assert query["count"] == ["1"]
+    
+    @patch('requests.Session.get')
     def test_get_coordinates_no_results(self, mock_get):
         """Test the _get_coordinates method with no results."""
         # Mock the response for geocoding API with no results
@@ -73,7 +91,7 @@ class TestWeatherTool:
         # Verify the mock was called correctly
         mock_get.assert_called_once()
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_weather(self, mock_get):
         """Test the _get_weather method."""
         # Mock the response for weather API
@@ -123,8 +141,8 @@ class TestWeatherTool:
             }
         }
         
-        # Create the tool and run it
-        tool = WeatherTool()
+        # Create the tool with an empty geocode cache and run it
+        tool = WeatherTool(geocode_cache=GeocodeCache.create(path="", cities_file=None))
         result = tool._run("New York")
         
         # Check the result
@@ -135,4 +153,157 @@ class TestWeatherTool:
         
         # Verify the mocks were called correctly
         mock_get_coordinates.assert_called_once_with("New York")
-        mock_get_weather.assert_called_once_with(40.7128, -74.0060) 
\ No newline at end of file
+        mock_get_weather.assert_called_once_with(40.7128, -74.0060)
+    
+    @patch.object(WeatherTool, '_get_coordinates')
+    @patch.object(WeatherTool, '_get_weather')
+    def test_run_geocode_cache(self, mock_get_weather, mock_get_coordinates):
+        """Test that geocoding results are reused across spellings of a location."""
+        mock_get_coordinates.return_value = (47.3769, 8.5417, "Zürich", "Switzerland")
+        mock_get_weather.return_value = {"current": {"temperature_2m": 12.0}}
+        
+        tool = WeatherTool(geocode_cache=GeocodeCache.create(cities_file=None))
+        tool._run("Zürich, Switzerland")
+        tool._run("zurich,  SWITZERLAND")
+        
+        mock_get_coordinates.assert_called_once_with("Zürich, Switzerland")
+        # The second observation comes from the weather cache
+        mock_get_weather.assert_called_once_with(47.3769, 8.5417)
+        
+        # Bundled cities never reach the geocoding API
+        result = WeatherTool()._run("NYC")
+        assert "Current weather for New York, United States" in result
+        mock_get_coordinates.assert_called_once()
+    
+    @patch.object(WeatherTool, '_get_weather')
+    def test_run_weather_cache(self, mock_get_weather):
+        """Test that nearby lookups within the upstream interval share an observation."""
+        mock_get_weather.return_value = {
+            "utc_offset_seconds": 0,
+            "current": {"time": "2099-01-01T00:00", "interval": 900, "temperature_2m": 9.5},
+        }
+        
+        weather_cache = WeatherCache()
+        first = WeatherTool(weather_cache=weather_cache)._run("London")
+        second = WeatherTool(weather_cache=weather_cache)._run("London, UK")
+        
+        assert first == second
+        assert "Temperature: 9.5°C" in first
+        mock_get_weather.assert_called_once()
+        
+        stats = weather_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["memory_bytes"] > 0
+    
+    def test_split_locations(self):
+        """Test that multi-location inputs are split but "City, Country" is not."""
+        assert WeatherTool._split_locations("Paris, France") == ["Paris, France"]
+        assert WeatherTool._split_locations("New York; Tokyo | Paris, France") == [
+            "New York", "Tokyo", "Paris, France"
+        ]
+        assert WeatherTool._split_locations("Sarajevo, Bosnia and Herzegovina") == ["Sarajevo, Bosnia and Herzegovina"]
+        assert WeatherTool._split_locations("Port of Spain, Trinidad & Tobago; Tokyo") == [
+            "Port of Spain, Trinidad & Tobago", "Tokyo"
+        ]
+        assert WeatherTool._split_locations('["Tokyo", "Paris, France"]') == ["Tokyo", "Paris, France"]
+    
+    @patch('requests.Session.get')
+    def test_run_batch(self, mock_get):
+        """Test that several locations are fetched with one weather request."""
+        def fake_get(url, **kwargs):
+            response = MagicMock()
+            if "geocoding-api" in url:
+                response.json.return_value = {"results": []}
+            else:
+                response.json.return_value = [
+                    {"current": {"temperature_2m": 3.0}},
+                    {"current": {"temperature_2m": 18.0}},
+                ]
+            return response
+        mock_get.side_effect = fake_get
+        
+        result = WeatherTool()._run("New York; Tokyo; Atlantis12345")
+        
+        weather_calls = [c for c in mock_get.call_args_list if "api.open-meteo.com/v1/forecast" in c[0][0]]
+        assert len(weather_calls) == 1
+        assert "latitude=40.7143,35.6895" in weather_calls[0][0][0]
+        
+        lines = result.splitlines()
+        assert lines[0] == "Current weather:"
+        assert lines[4].startswith("New York, United States | 3.0")
+        assert lines[5].startswith("Tokyo, Japan | 18.0")
+        assert "Atlantis12345 | error: Could not find location" in lines[6]
+    
+    @pytest.mark.asyncio
+    async def test_arun_batch(self):
+        """Test that async batches geocode concurrently and reuse cached cells."""
+        def fake_get(url, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            if "geocoding-api" in url:
+                response.json.return_value = {
+                    "results": [{"name": "Smallville", "country": "", "latitude": 10.0, "longitude": 20.0}]
+                }
+            else:
+                response.json.return_value = {"current": {"temperature_2m": 25.0}}
+            return response
+        
+        tool = WeatherTool(weather_cache=WeatherCache())
+        tool.weather_cache.set(48.8534, 2.3488, {"current": {"temperature_2m": 12.0}})
+        with patch('httpx.AsyncClient.get', side_effect=fake_get) as mock_get:
+            result = await tool._arun('["Paris", "Smallville"]')
+        
+        # Paris comes from the caches, Smallville needs one geocode and one forecast
+        assert mock_get.call_count == 2
+        assert "Paris, France | 12.0" in result
+        assert "Smallville | 25.0" in result
+    
+    @pytest.mark.asyncio
+    async def test_arun_concurrent(self):
+        """Test that async runs for different locations overlap, up to the concurrency limit."""
+        in_flight = 0
+        max_in_flight = 0
+        
+        async def fake_get(url, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            
+            response = MagicMock()
+            response.status_code = 200
+            if "geocoding-api" in url:
+                response.json.return_value = {
+                    "results": [{"name": "Tokyo", "country": "Japan", "latitude": 35.69, "longitude": 139.69}]
+                }
+            else:
+                response.json.return_value = {"current": {"temperature_2m": 18.0}}
+            return response
+        
+        tool = WeatherTool(max_concurrency=3)
+        with patch('httpx.AsyncClient.get', side_effect=fake_get):
+            start = time.perf_counter()
+            # Distinct names, since identical concurrent lookups are coalesced
+            results = await asyncio.gather(*(tool._arun(f"Tokyo District {i}") for i in range(6)))
+            elapsed = time.perf_counter() - start
+        
+        assert all("Current weather for Tokyo, Japan" in r for r in results)
+        assert all("Temperature: 18.0°C" in r for r in results)
+        assert max_in_flight == 3
+        # Six runs of two sequential 50 ms requests, three at a time
+        assert elapsed < 6 * 2 * 0.05
+    
+    @pytest.mark.asyncio
+    async def test_arun_error(self):
+        """Test that async failures are reported like sync ones."""
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"results": []}
+        
+        with patch('httpx.AsyncClient.get', return_value=response):
+            result = await WeatherTool()._arun("NonexistentLocation12345")
+        
+        assert "Error retrieving weather information" in result
+        assert "Could not find location" in result
@@ -0,0 +1,106 @@
+"""Tests for the offline Wikipedia index."""
+
+import json
+import pytest
+from unittest.mock import patch
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import the tools
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import WikipediaTool
+from tools.embeddings import HashingEmbedder
+from tools.wikipedia_index import WikipediaIndex, build_index
+
+
+ARTICLES = [
+    {"title": "Microsoft", "abstract": "Microsoft Corporation is an American multinational technology company headquartered in Redmond, Washington. Satya Nadella is its CEO."},
+    {"title": "Japan", "abstract": "Japan is an island country in East Asia. Its capital and largest city is Tokyo."},
+    {"title": "India", "abstract": "India is a country in South Asia. It is the most populous country in the world."},
+    {"title": "Python (programming language)", "abstract": "Python is a high-level, general-purpose programming language."},
+    {"title": "Empty", "abstract": ""},
+]
+
+ABSTRACT_XML = """<feed>
+<doc>
+<title>Wikipedia: Paris</title>
+<url>https://en.wikipedia.org/wiki/Paris</url>
+<abstract>Paris is the capital and most populous city of France.</abstract>
+</doc>
+<doc>
+<title>Wikipedia: Seattle</title>
+<url>https://en.wikipedia.org/wiki/Seattle</url>
+<abstract>Seattle is a seaport city on the West Coast of the United States.</abstract>
+</doc>
+</feed>
+"""
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    """Build a small index from a JSONL dump."""
+    dump = tmp_path / "abstracts.jsonl"
+    dump.write_text("\n".join(json.dumps(article) for article in ARTICLES))
+    output_dir = tmp_path / "index"
+    build_index(str(dump), str(output_dir), dim=128)
+    return str(output_dir)
+
+
+class TestWikipediaIndex:
+    """Test suite for the offline index builder and loader."""
+    
+    def test_embedder_is_normalized_and_stable(self):
+        """Test that embeddings are unit length and deterministic."""
+        embedder = HashingEmbedder(dim=64)
+        a = embedder.embed("Capital of France")
+        b = embedder.embed("capital of   france")
+        
+        assert a.shape == (64,)
+        assert abs(float((a * a).sum()) - 1.0) < 1e-5
+        assert (a == b).all()
+    
+    def test_build_and_search(self, index_dir):
+        """Test that the nearest neighbour is the matching article."""
+        index = WikipediaIndex(index_dir)
+        
+        # The article without an abstract is skipped
+        assert len(index) == 4
+        
+        score, record = index.search("Who is the CEO of Microsoft?")[0]
+        assert record["title"] == "Microsoft"
+        assert "Satya Nadella" in record["summary"]
+        assert record["url"] == "https://en.wikipedia.org/wiki/Microsoft"
+        
+        assert index.search("capital of Japan")[0][1]["title"] == "Japan"
+        
+        stats = index.stats()
+        assert stats["articles"] == 4
+        assert stats["load_ms"] >= 0
+        assert stats["rss_mb"] > 0
+        index.close()
+    
+    def test_build_from_abstract_xml(self, tmp_path):
+        """Test ingestion of the Wikimedia abstract XML format."""
+        dump = tmp_path / "enwiki-abstract.xml"
+        dump.write_text(ABSTRACT_XML)
+        meta = build_index(str(dump), str(tmp_path / "index"), dim=64)
+        
+        assert meta["articles"] == 2
+        assert meta["index_type"] == "flat"
+        index = WikipediaIndex(str(tmp_path / "index"))
+        assert index.search("Paris France")[0][1]["title"] == "Paris"
+    
+    @patch('wikipedia.search')
+    def test_tool_offline(self, mock_search, index_dir):
+        """Test that the tool answers from the index without HTTP."""
+        tool = WikipediaTool(index_dir=index_dir)
+        result = tool._run("Python programming language")
+        
+        assert "Title: Python (programming language)" in result
+        assert "high-level" in result
+        mock_search.assert_not_called()
+        
+        # Queries that match nothing are reported as such
+        assert "No Wikipedia results found" in tool._run("zzzz qqqq")
@@ -9,9 +9,34 @@ import os
 # Add the parent directory to the path so we can import the tools
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import requests
+
 from tools import WikipediaTool
 
 
+def api_response(pages):
+    """Build a mock MediaWiki API response."""
+    response = MagicMock()
+    response.json.return_value = {"query": {"pages": pages}} if pages else {"batchcomplete": True}
+    return response
+
+
+def links_response(titles):
+    """Build a mock action=parse response listing a page's links in order."""
+    response = MagicMock()
+    links = [{"ns": 4 if ":" in title else 0, "title": title, "exists": True} for title in titles]
+    response.json.return_value = {"parse": {"title": "Disambiguation", "links": links}}
+    return response
+
+
+def _api_lookup_offline(self, query):
+    raise requests.ConnectionError("offline")
+
+
+# Makes the single-request API path fail so the wikipedia package is used
+api_unavailable = patch.object(WikipediaTool, '_api_lookup', _api_lookup_offline)
+
+
 class TestWikipediaTool:
     """Test suite for the WikipediaTool."""
     
@@ -21,6 +46,7 @@ class TestWikipediaTool:
         assert tool.name == "WikipediaTool"
         assert "Wikipedia" in tool.description
     
+    @api_unavailable
     @patch('wikipedia.search')
     @patch('wikipedia.page')
     def test_run_success(self, mock_page, mock_search):
@@ -48,6 +74,7 @@ class TestWikipediaTool:
         mock_search.assert_called_once_with("Python programming")
         mock_page.assert_called_once_with("Python (programming language)", auto_suggest=False)
     
+    @api_unavailable
     @patch('wikipedia.search')
     def test_run_no_results(self, mock_search):
         """Test execution when no search results are found."""
@@ -64,6 +91,7 @@ class TestWikipediaTool:
         # Verify the mock was called correctly
         mock_search.assert_called_once_with("NonexistentTopic12345")
     
+    @api_unavailable
     @patch('wikipedia.search')
     @patch('wikipedia.page')
     def test_run_disambiguation(self, mock_page, mock_search):
@@ -93,4 +121,238 @@ class TestWikipediaTool:
         
         # Check the result
         assert "Python (programming language)" in result
-        assert "high-level programming language" in result 
\ No newline at end of file
+        assert "high-level programming language" in result
+    
+    @api_unavailable
+    @patch('wikipedia.search')
+    @patch('wikipedia.page')
+    def test_run_cached(self, mock_page, mock_search):
+        """Test that repeat lookups are served from the cache."""
+        mock_search.return_value = ["Microsoft"]
+        
+        mock_page_obj = MagicMock()
+        mock_page_obj.title = "Microsoft"
+        mock_page_obj.summary = "Microsoft Corporation is a technology company."
+        mock_page_obj.url = "https://en.wikipedia.org/wiki/Microsoft"
+        mock_page.return_value = mock_page_obj
+        
+        tool = WikipediaTool()
+        first = tool._run("Microsoft")
+        second = tool._run("  microsoft ")
+        
+        assert first == second
+        mock_search.assert_called_once_with("Microsoft")
+        mock_page.assert_called_once()
+        
+        # A fresh instance (e.g. after a restart) is served from disk
+        third = WikipediaTool()._run("MICROSOFT")
+        assert third == first
+        mock_search.assert_called_once()
+        
+        stats = tool.cache_stats()
+        assert stats["search"]["hits"] == 1
+        assert stats["page"]["hits"] == 1
+    
+    @patch('requests.Session.get')
+    def test_api_lookup(self, mock_get):
+        """Test that a lookup takes a single API request."""
+        mock_get.return_value = api_response([
+            {
+                "index": 2,
+                "title": "Microsoft Windows",
+                "extract": "Windows is an operating system.",
+                "fullurl": "https://en.wikipedia.org/wiki/Microsoft_Windows",
+            },
+            {
+                "index": 1,
+                "title": "Microsoft",
+                "extract": "Microsoft Corporation is a technology company.",
+                "fullurl": "https://en.wikipedia.org/wiki/Microsoft",
+            },
+        ])
+        
+        tool = WikipediaTool()
+        result = tool._run("Microsoft")
+        
+        assert "Title: Microsoft\n" in result
+        assert "technology company" in result
+        assert "URL: https://en.wikipedia.org/wiki/Microsoft" in result
+        mock_get.assert_called_once()
+        params = mock_get.call_args.kwargs["params"]
+        assert params["generator"] == "search"
+        assert params["gsrsearch"] == "Microsoft"
+    
+    @patch('requests.Session.get')
+    def test_api_lookup_skips_disambiguation(self, mock_get):
+        """Test that a disambiguation hit is skipped without another request."""
+        mock_get.return_value = api_response([
+            {
+                "index": 1,
+                "title": "Mercury",
+                "extract": "Mercury may refer to:",
+                "fullurl": "https://en.wikipedia.org/wiki/Mercury",
+                "pageprops": {"disambiguation": ""},
+            },
+            {
+                "index": 2,
+                "title": "Mercury (planet)",
+                "extract": "Mercury is the first planet from the Sun.",
+                "fullurl": "https://en.wikipedia.org/wiki/Mercury_(planet)",
+            },
+        ])
+        
+        result = WikipediaTool()._run("Mercury")
+        
+        assert "Title: Mercury (planet)" in result
+        mock_get.assert_called_once()
+    
+    @patch('requests.Session.get')
+    def test_api_lookup_follows_disambiguation_links(self, mock_get):
+        """Test that an all-disambiguation result fetches the linked articles."""
+        mock_get.side_effect = [
+            api_response([
+                {
+                    "index": 1,
+                    "title": "Python",
+                    "extract": "Python may refer to:",
+                    "fullurl": "https://en.wikipedia.org/wiki/Python",
+                    "pageprops": {"disambiguation": ""},
+                },
+            ]),
+            links_response(["Python (programming language)"]),
+            api_response([
+                {
+                    "title": "Python (programming language)",
+                    "extract": "Python is a high-level programming language.",
+                    "fullurl": "https://en.wikipedia.org/wiki/Python_(programming_language)",
+                },
+            ]),
+        ]
+        
+        result = WikipediaTool()._run("Python")
+        
+        assert "Title: Python (programming language)" in result
+        assert mock_get.call_count == 3
+        assert mock_get.call_args_list[1].kwargs["params"]["page"] == "Python"
+        assert mock_get.call_args.kwargs["params"]["titles"] == "Python (programming language)"
+    
+    @patch('requests.Session.get')
+    def test_disambiguation_intro_options(self, mock_get):
+        """Test that options listed in the intro cost one more request, in page order."""
+        mock_get.side_effect = [
+            api_response([
+                {
+                    "index": 1,
+                    "title": "Mercury",
+                    "extract": (
+                        "Mercury most commonly refers to:\n\n"
+                        "Mercury (planet), the closest planet to the Sun\n"
+                        "Mercury (element), a chemical element\n"
+                        "Mercury may also refer to:"
+                    ),
+                    "fullurl": "https://en.wikipedia.org/wiki/Mercury",
+                    "pageprops": {"disambiguation": ""},
+                },
+            ]),
+            # Sorted by title, as the API returns them
+            api_response([
+                {"title": "Mercury (element)", "extract": "Mercury is a chemical element.", "fullurl": "https://en.wikipedia.org/wiki/Mercury_(element)"},
+                {"title": "Mercury (planet)", "extract": "Mercury is the first planet from the Sun.", "fullurl": "https://en.wikipedia.org/wiki/Mercury_(planet)"},
+            ]),
+        ]
+        
+        result = WikipediaTool()._run("Mercury")
+        
+        assert "Title: Mercury (planet)" in result
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs["params"]["titles"] == "Mercury (planet)|Mercury (element)"
+    
+    @patch('requests.Session.get')
+    def test_disambiguation_keeps_page_order(self, mock_get):
+        """Test that the first option on the page wins, not the first alphabetically."""
+        disambiguation = api_response([
+            {
+                "index": 1,
+                "title": "Mercury",
+                "extract": "Mercury may refer to:",
+                "fullurl": "https://en.wikipedia.org/wiki/Mercury",
+                "pageprops": {"disambiguation": ""},
+            },
+        ])
+        # The API returns the linked pages sorted by title, with the redirect resolved
+        linked = api_response([
+            {"title": "Freddie Mercury", "extract": "Freddie Mercury was a singer.", "fullurl": "https://en.wikipedia.org/wiki/Freddie_Mercury"},
+            {"title": "Mercury (element)", "extract": "Mercury is a chemical element.", "fullurl": "https://en.wikipedia.org/wiki/Mercury_(element)"},
+            {"title": "Mercury (planet)", "extract": "Mercury is the first planet from the Sun.", "fullurl": "https://en.wikipedia.org/wiki/Mercury_(planet)"},
+        ])
+        linked.json.return_value["query"]["redirects"] = [{"from": "Planet Mercury", "to": "Mercury (planet)"}]
+        mock_get.side_effect = [
+            disambiguation,
+            links_response(["Planet Mercury", "Mercury (element)", "Freddie Mercury", "Wikipedia:Disambiguation"]),
+            linked,
+        ]
+        
+        result = WikipediaTool()._run("Mercury")
+        
+        assert "Title: Mercury (planet)" in result
+        assert mock_get.call_args.kwargs["params"]["titles"] == "Planet Mercury|Mercury (element)|Freddie Mercury"
+    
+    @patch('requests.Session.get')
+    @patch('wikipedia.search')
+    def test_api_no_results(self, mock_search, mock_get):
+        """Test that an empty API result is final and skips the fallback."""
+        mock_get.return_value = api_response([])
+        
+        result = WikipediaTool()._run("NonexistentTopic12345")
+        
+        assert "No Wikipedia results found for: NonexistentTopic12345" in result
+        mock_search.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_arun_api(self):
+        """Test that the async path uses the async client, not a thread."""
+        with patch('httpx.AsyncClient.get') as mock_get, patch('requests.Session.get') as mock_sync_get:
+            response = api_response([
+                {
+                    "index": 1,
+                    "title": "Japan",
+                    "extract": "Japan is an island country in East Asia.",
+                    "fullurl": "https://en.wikipedia.org/wiki/Japan",
+                },
+            ])
+            response.status_code = 200
+            mock_get.return_value = response
+            
+            tool = WikipediaTool()
+            result = await tool._arun("Japan")
+            
+            assert "Title: Japan" in result
+            mock_get.assert_called_once()
+            mock_sync_get.assert_not_called()
+            
+            # Served from the cache the second time
+            await tool._arun("japan")
+            mock_get.assert_called_once()
+    
+    @pytest.mark.asyncio
+    @patch('wikipedia.search')
+    @patch('wikipedia.page')
+    async def test_arun_fallback(self, mock_page, mock_search):
+        """Test that the async path falls back to the wikipedia package."""
+        import httpx
+        
+        mock_search.return_value = ["Japan"]
+        mock_page_obj = MagicMock()
+        mock_page_obj.title = "Japan"
+        mock_page_obj.summary = "Japan is an island country in East Asia."
+        mock_page_obj.url = "https://en.wikipedia.org/wiki/Japan"
+        mock_page.return_value = mock_page_obj
+        
+        from tools.transport import get_transport
+        
+        with patch('httpx.AsyncClient.get', side_effect=httpx.ConnectError("offline")), \
+                patch.object(get_transport(), 'retries', 0):
+            result = await WikipediaTool()._arun("Japan")
+        
+        assert "Title: Japan" in result
+        mock_search.assert_called_once_with("Japan")
@@ -1,7 +1,35 @@
-"""Tools for the Research Assistant Agent."""
+"""Tools for the Research Assistant Agent.
 
-from .wikipedia_tool import WikipediaTool
-from .calculator_tool import CalculatorTool
-from .weather_tool import WeatherTool
+The tools are imported on first access (PEP 562), so that importing a
+helper module such as ``tools.math_engine`` does not load LangChain or the
+HTTP clients.
+"""
 
-__all__ = ["WikipediaTool", "CalculatorTool", "WeatherTool"] 
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "WikipediaTool": ".wikipedia_tool",
+    "CalculatorTool": ".calculator_tool",
+    "WeatherTool": ".weather_tool",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .wikipedia_tool import WikipediaTool
+    from .calculator_tool import CalculatorTool
+    from .weather_tool import WeatherTool
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
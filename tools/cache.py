@@ -0,0 +1,310 @@
+"""Caching helpers shared by the Research Assistant tools.
+
+Two tiers are provided: an in-process LRU with per-entry expiry, and an
+on-disk SQLite store that survives restarts and can be shared between
+processes (e.g. several Streamlit workers). ``TieredCache`` puts the
+former in front of the latter.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+_MISSING = object()
+
+
+def default_cache_dir() -> str:
+    """Directory for on-disk caches (``CACHE_DIR`` env var, or ~/.cache)."""
+    return os.getenv(
+        "CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "research-assistant"),
+    )
+
+
+def normalize_key(text: str) -> str:
+    """Normalize free text for use as a cache key (case and whitespace)."""
+    return " ".join(text.lower().split())
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate the memory footprint of a value and its contents in bytes."""
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with optional time-to-live."""
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries to keep
+            ttl: Default lifetime of an entry in seconds (None for no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the cached value for key, or default if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the cached keys and values."""
+        with self._lock:
+            return deep_sizeof(self._data)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """Persistent key/value cache stored in a SQLite table.
+    
+    Values are stored as JSON. Entries expire after ``ttl`` seconds and the
+    table is capped at ``max_entries`` rows, evicting the least recently
+    used rows first. WAL mode lets several processes share the same file.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+    ):
+        """Initialize the cache, creating the database file if needed."""
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for key, or default if absent or expired."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+    
+    def get_entry(self, key: str) -> Optional[tuple]:
+        """Return ``(value, expires_at)`` for key, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(value), expires_at
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, evicting old rows if over capacity."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters."""
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of an optional persistent SQLite store."""
+    
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        """Initialize the cache with a memory tier and an optional disk tier."""
+        self.memory = memory
+        self.disk = disk
+    
+    @classmethod
+    def create(
+        cls,
+        table: str,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        maxsize: int = 1024,
+        max_entries: int = 10000,
+    ) -> "TieredCache":
+        """Build a two-tier cache.
+        
+        Args:
+            table: Name of the SQLite table backing this cache
+            path: SQLite file path; defaults to ``cache.sqlite`` in
+                ``default_cache_dir()``. An empty string disables the disk tier.
+            ttl: Entry lifetime in seconds (None for no expiry)
+            maxsize: Maximum number of entries held in memory
+            max_entries: Maximum number of rows kept on disk
+        """
+        if path is None:
+            path = os.path.join(default_cache_dir(), "cache.sqlite")
+        disk = SQLiteCache(path, table=table, ttl=ttl, max_entries=max_entries) if path else None
+        return cls(LRUCache(maxsize=maxsize, ttl=ttl), disk)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look the key up in memory first, then on disk."""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        if self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                ttl = expires_at - time.time() if expires_at is not None else None
+                self.memory.set(key, value, ttl=ttl)
+                return value
+        return default
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store the value in both tiers."""
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=ttl)
+    
+    def clear(self) -> None:
+        """Remove all entries from both tiers."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return combined hit/miss counters for both tiers."""
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        hits = memory["hits"] + (disk["hits"] if disk else 0)
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory": memory,
+            "disk": disk,
+        }
@@ -3,9 +3,10 @@
 from typing import Dict, Any, Optional
 from langchain.tools import BaseTool
 from langchain.chains import LLMMathChain
-from langchain_openai import ChatOpenAI
 from pydantic import Field
 
+from .math_engine import evaluate_expression, format_number, parse_expression
+
 
 class CalculatorTool(BaseTool):
     """Tool for performing mathematical calculations."""
@@ -20,30 +21,62 @@ class CalculatorTool(BaseTool):
     llm_math_chain: Any = Field(default=None, exclude=True)
     
     def __init__(self, llm=None):
-        """Initialize the calculator tool with an LLM."""
+        """Initialize the calculator tool with an LLM.
+        
+        Without an LLM, a default model is only created the first time an
+        expression needs the LLMMathChain fallback.
+        """
         super().__init__()
-        # Use the provided LLM or create a default one
-        if llm is None:
+        if llm is not None:
+            self.llm_math_chain = LLMMathChain.from_llm(llm=llm)
+    
+    def _math_chain(self) -> LLMMathChain:
+        """Return the LLMMathChain, creating it with the default model if needed."""
+        if self.llm_math_chain is None:
             from os import getenv
             from dotenv import load_dotenv
+            from langchain_openai import ChatOpenAI
             load_dotenv()
             model_name = getenv("MODEL_NAME", "gpt-3.5-turbo")
-            llm = ChatOpenAI(model_name=model_name, temperature=0)
+            self.llm_math_chain = LLMMathChain.from_llm(llm=ChatOpenAI(model_name=model_name, temperature=0))
+        return self.llm_math_chain
+    
+    def _evaluate_locally(self, query: str) -> Optional[str]:
+        """Evaluate plain arithmetic without the LLM.
+        
+        Returns None when the local parser rejects the input, in which case
+        the caller should fall back to the LLMMathChain.
+        """
+        try:
+            parse_expression(query)
+        except ValueError:
+            return None
         
-        self.llm_math_chain = LLMMathChain.from_llm(llm=llm)
+        try:
+            return f"Answer: {format_number(evaluate_expression(query))}"
+        except Exception as e:
+            return f"Error performing calculation: {str(e)}"
     
     def _run(self, query: str) -> str:
         """Run the calculator with the provided expression."""
+        answer = self._evaluate_locally(query)
+        if answer is not None:
+            return answer
+        
         try:
-            result = self.llm_math_chain.invoke({"question": query})
+            result = self._math_chain().invoke({"question": query})
             return result["answer"]
         except Exception as e:
             return f"Error performing calculation: {str(e)}"
     
     async def _arun(self, query: str) -> str:
         """Run the calculator asynchronously."""
+        answer = self._evaluate_locally(query)
+        if answer is not None:
+            return answer
+        
         try:
-            result = await self.llm_math_chain.ainvoke({"question": query})
+            result = await self._math_chain().ainvoke({"question": query})
             return result["answer"]
         except Exception as e:
-            return f"Error performing calculation: {str(e)}" 
\ No newline at end of file
+            return f"Error performing calculation: {str(e)}"
\ No newline at end of file
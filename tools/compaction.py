@@ -0,0 +1,286 @@
+"""Compaction of tool observations before they reach the agent's prompt.
+
+Every observation is pasted into the agent scratchpad and re-sent on each
+later iteration, so a long Wikipedia summary is paid for many times over.
+``ObservationCompactor`` shortens long observations to a per-tool character
+budget by keeping the sentences that best match what the agent was looking
+for (scored with BM25 against the action input and the agent's reasoning),
+in their original order and always including the lead sentence.
+
+The full text is kept in an ``ObservationStore`` under a short id that is
+mentioned in the compacted observation, and ``ObservationLookupTool`` lets
+the agent fetch it (page by page, or the passages about some keywords) when
+the extract is not enough. Lookup results are never compacted again, so
+every part of the text can be read.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from os import getenv
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.tools import BaseTool
+from pydantic import Field
+
+from .cache import LRUCache
+from .embeddings import tokenize
+
+# Character budgets per tool (about four characters per token); other
+# tools use OBSERVATION_MAX_CHARS. ObservationLookup pages its own output
+# to this size.
+TOOL_LIMITS: Dict[str, int] = {
+    "WikipediaTool": 1200,
+    "ObservationLookup": 4000,
+}
+
+# Tools whose output is already bounded and is passed on unchanged
+UNCOMPACTED_TOOLS = frozenset(["ObservationLookup"])
+
+# Words of the ReAct format that say nothing about the information needed
+FORMAT_WORDS = frozenset(["thought", "action", "input", "observation", "need", "should", "use", "find", "tool"])
+
+# Lines of the tools' output formats that are always kept (e.g. the source URL)
+KEEP_PREFIXES = ("Title:", "URL:")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+_ID_RE = re.compile(r"\bobs-[0-9a-f]{10}\b")
+_OFFSET_RE = re.compile(r"\boffset\s*[:=]?\s*(\d+)", re.IGNORECASE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences (and lines)."""
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+def _terms(text: str) -> List[str]:
+    """Tokenize for scoring, folding simple plurals."""
+    return [token[:-1] if len(token) > 3 and token.endswith("s") else token for token in tokenize(text)]
+
+
+def score_sentences(sentences: Sequence[str], query: str) -> List[float]:
+    """Score sentences against a query with BM25, treating each as a document."""
+    query_terms = set(_terms(query)) - FORMAT_WORDS
+    if not query_terms or not sentences:
+        return [0.0] * len(sentences)
+    
+    documents = [Counter(_terms(sentence)) for sentence in sentences]
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    document_frequency = Counter(term for document in documents for term in query_terms if term in document)
+    
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def extract_relevant(text: str, query: str, max_chars: int) -> str:
+    """Return the sentences of text most relevant to query, within max_chars.
+    
+    The lead sentence is always kept since it usually defines the subject,
+    as are lines starting with ``KEEP_PREFIXES``; the rest are chosen by
+    score and returned in their original order, with "..." marking gaps.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return text[:max_chars]
+    
+    scores = score_sentences(sentences, query)
+    chosen = [0] + [i for i in range(1, len(sentences)) if sentences[i].startswith(KEEP_PREFIXES)]
+    if sentences[0].startswith(KEEP_PREFIXES) and len(sentences) > 1 and 1 not in chosen:
+        # A title line is not much of a lead; keep the first sentence after it
+        chosen.append(1)
+    used = sum(len(sentences[i]) + 4 for i in chosen)
+    
+    # Highest score first; ties go to the earlier sentence
+    ranked = sorted((i for i in range(len(sentences)) if i not in chosen), key=lambda i: (-scores[i], i))
+    for i in ranked:
+        if used + len(sentences[i]) + 4 > max_chars:
+            continue
+        chosen.append(i)
+        used += len(sentences[i]) + 4
+    
+    parts = []
+    previous = -1
+    for i in sorted(chosen):
+        if parts and i != previous + 1:
+            parts.append("...")
+        parts.append(sentences[i])
+        previous = i
+    if previous != len(sentences) - 1:
+        parts.append("...")
+    result = " ".join(parts)
+    return result if len(result) <= max_chars else result[:max_chars - 3].rsplit(" ", 1)[0] + "..."
+
+
+class ObservationStore:
+    """In-memory store of full observations keyed by a content hash."""
+    
+    def __init__(self, maxsize: Optional[int] = None):
+        """Initialize the store (default size from OBSERVATION_STORE_SIZE, or 256)."""
+        maxsize = maxsize if maxsize is not None else int(getenv("OBSERVATION_STORE_SIZE", 256))
+        self.cache = LRUCache(maxsize=maxsize)
+    
+    @staticmethod
+    def key(text: str) -> str:
+        """Return the id under which a text is stored."""
+        return "obs-" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+    
+    def put(self, text: str) -> str:
+        """Store a text and return its id."""
+        key = self.key(text)
+        self.cache.set(key, text)
+        return key
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a stored text, or None if unknown or evicted."""
+        return self.cache.get(key)
+
+
+class ObservationCompactor:
+    """Shorten long tool observations in the agent's intermediate steps.
+    
+    Instances are passed to ``AgentExecutor(trim_intermediate_steps=...)``,
+    which calls them with the (action, observation) pairs before every
+    planning step. The executor's own record of the steps (and so
+    ``return_intermediate_steps``) keeps the full observations.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[ObservationStore] = None,
+        max_chars: Optional[int] = None,
+        tool_limits: Optional[Dict[str, int]] = None,
+    ):
+        """Initialize the compactor.
+        
+        Args:
+            store: Side store for full observations (default: the shared one)
+            max_chars: Budget for tools without their own limit (default from
+                OBSERVATION_MAX_CHARS, or 2000)
+            tool_limits: Per-tool budgets (default: ``TOOL_LIMITS``)
+        """
+        self.store = store if store is not None else get_observation_store()
+        self.max_chars = max_chars if max_chars is not None else int(getenv("OBSERVATION_MAX_CHARS", 2000))
+        self.tool_limits = dict(TOOL_LIMITS if tool_limits is None else tool_limits)
+        # The same steps are compacted again before every iteration
+        self._memo = LRUCache(maxsize=512)
+    
+    def limit(self, tool: str) -> int:
+        """Character budget for the observations of a tool."""
+        return self.tool_limits.get(tool, self.max_chars)
+    
+    def compact(self, observation: Any, query: str, tool: str = "") -> Any:
+        """Return the observation, compacted if it exceeds the tool's budget."""
+        if not isinstance(observation, str) or tool in UNCOMPACTED_TOOLS:
+            return observation
+        limit = self.limit(tool)
+        if len(observation) <= limit:
+            return observation
+        
+        memo_key = (ObservationStore.key(observation), query, limit)
+        compacted = self._memo.get(memo_key)
+        if compacted is not None:
+            return compacted
+        
+        key = self.store.put(observation)
+        note = f"\n[Compacted from {len(observation)} characters. Full text: ObservationLookup with input {key}]"
+        compacted = extract_relevant(observation, query, max(limit - len(note), 0)) + note
+        self._memo.set(memo_key, compacted)
+        return compacted
+    
+    def __call__(self, intermediate_steps: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+        """Compact the observations of intermediate steps."""
+        steps = []
+        for action, observation in intermediate_steps:
+            query = f"{getattr(action, 'tool_input', '')} {getattr(action, 'log', '')}"
+            steps.append((action, self.compact(observation, query, getattr(action, "tool", ""))))
+        return steps
+
+
+class ObservationLookupTool(BaseTool):
+    """Tool returning the full text of a compacted observation."""
+    
+    name: str = "ObservationLookup"
+    description: str = """
+    Useful for reading the full text of an observation that was compacted.
+    Input should be the observation id (e.g., "obs-1a2b3c4d5e"), optionally
+    followed by keywords to get the passages about them (e.g., "obs-1a2b3c4d5e founding date").
+    Long texts are returned in pages; ask for the next one with the offset it gives
+    (e.g., "obs-1a2b3c4d5e offset 4000").
+    Use this only when the compacted observation does not contain what you need.
+    """
+    
+    store: Any = Field(default=None, exclude=True)
+    
+    def __init__(self, **kwargs):
+        """Initialize the lookup tool."""
+        super().__init__(**kwargs)
+        if self.store is None:
+            self.store = get_observation_store()
+    
+    def _run(self, query: str) -> str:
+        """Run the tool with the provided observation id."""
+        match = _ID_RE.search(query)
+        if match is None:
+            return "Error: input must contain an observation id such as obs-1a2b3c4d5e"
+        
+        text = self.store.get(match.group(0))
+        if text is None:
+            return f"Error: observation {match.group(0)} is no longer available"
+        
+        rest = query[:match.start()] + query[match.end():]
+        offset = _OFFSET_RE.search(rest)
+        keywords = _OFFSET_RE.sub(" ", rest).strip(" :,")
+        limit = TOOL_LIMITS.get(self.name, len(text))
+        if len(text) <= limit:
+            return text
+        if keywords and offset is None:
+            return extract_relevant(text, keywords, limit)
+        return self._page(text, match.group(0), int(offset.group(1)) if offset else 0, limit)
+    
+    @staticmethod
+    def _page(text: str, key: str, offset: int, limit: int) -> str:
+        """Return up to limit characters of text from offset, ending at a word break."""
+        if offset >= len(text):
+            return f"Error: offset {offset} is past the end of {key} ({len(text)} characters)"
+        end = min(offset + limit, len(text))
+        if end < len(text):
+            space = text.rfind(" ", offset + 1, end)
+            end = space if space > offset else end
+        page = text[offset:end]
+        if end < len(text):
+            return f"{page}\n[Characters {offset}-{end} of {len(text)}. More: ObservationLookup with input {key} offset {end}]"
+        return f"{page}\n[Characters {offset}-{end} of {len(text)}, end of text]"
+    
+    async def _arun(self, query: str) -> str:
+        """Run the tool asynchronously."""
+        return self._run(query)
+
+
+_observation_store: Optional[ObservationStore] = None
+_observation_store_lock = threading.Lock()
+
+
+def get_observation_store() -> ObservationStore:
+    """Return the process-wide store of full observations."""
+    global _observation_store
+    if _observation_store is None:
+        with _observation_store_lock:
+            if _observation_store is None:
+                _observation_store = ObservationStore()
+    return _observation_store
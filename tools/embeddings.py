@@ -0,0 +1,77 @@
+"""Local text embeddings that need no model download or network access."""
+
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have he her
+his how i in is it its me my of on or our she so than that the their them then
+there these they this to was we were what when where which who whom why will
+with would you your s
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens, dropping common stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class HashingEmbedder:
+    """Embed text with the hashing trick over word unigrams and bigrams.
+    
+    Each feature is hashed (CRC32, so vectors are stable across processes and
+    Python versions) into one of ``dim`` signed buckets, term frequencies are
+    damped with log1p and the result is L2-normalized, so inner product equals
+    cosine similarity.
+    """
+    
+    def __init__(self, dim: int = 256, bigram_weight: float = 0.5):
+        """Initialize the embedder.
+        
+        Args:
+            dim: Dimensionality of the output vectors
+            bigram_weight: Weight of word bigrams relative to single words
+        """
+        self.dim = dim
+        self.bigram_weight = bigram_weight
+    
+    def _accumulate(self, vector: np.ndarray, text: str, weight: float) -> None:
+        tokens = tokenize(text)
+        features = [(token, weight) for token in tokens]
+        features += [
+            (f"{a} {b}", weight * self.bigram_weight)
+            for a, b in zip(tokens, tokens[1:])
+        ]
+        for feature, w in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * w
+    
+    def embed(self, text: str, title: str = "", title_weight: float = 2.0) -> np.ndarray:
+        """Embed a single text (optionally boosting a title) as a float32 vector."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if title:
+            self._accumulate(vector, title, title_weight)
+        self._accumulate(vector, text, 1.0)
+        
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.astype(np.float32)
+    
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed several texts into a (n, dim) float32 matrix."""
+        vectors = [self.embed(text) for text in texts]
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(vectors)
+    
+    def config(self) -> dict:
+        """Return the parameters needed to recreate this embedder."""
+        return {"type": "hashing", "dim": self.dim, "bigram_weight": self.bigram_weight}
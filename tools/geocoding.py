@@ -0,0 +1,275 @@
+"""Geocode cache for the WeatherTool.
+
+Coordinates of a place never change, so once a location string has been
+geocoded the answer is kept for good. Keys are normalized so that
+"NYC", "new york city" and "New York, USA" share an entry, and the cache
+can be preloaded from a table of world cities so that most lookups never
+reach the geocoding API at all.
+
+Entries are keyed on place name and country: a trailing country narrows
+the lookup to rows in that country ("London, Canada" is not London, UK),
+and a place asked for without one resolves to its most important entry.
+"""
+
+import csv
+import os
+import re
+import unicodedata
+from os import getenv
+from typing import Dict, List, Optional, Tuple
+
+from .cache import TieredCache
+
+Coordinates = Tuple[float, float, str, str]
+
+# Bundled table of major world cities (name, country, latitude, longitude)
+DEFAULT_CITIES_FILE = os.path.join(os.path.dirname(__file__), "data", "cities.csv")
+
+# Common nicknames and former names, applied after normalization
+ALIASES: Dict[str, str] = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny city": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "san fran": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "washington d c": "washington",
+    "philly": "philadelphia",
+    "vegas": "las vegas",
+    "nola": "new orleans",
+    "bombay": "mumbai",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "bengaluru": "bangalore",
+    "peking": "beijing",
+    "canton": "guangzhou",
+    "saigon": "ho chi minh city",
+    "hcmc": "ho chi minh city",
+    "st petersburg": "saint petersburg",
+    "kiev": "kyiv",
+    "rio": "rio de janeiro",
+    "cdmx": "mexico city",
+    "ciudad de mexico": "mexico city",
+    "hk": "hong kong",
+    "rangoon": "yangon",
+    "constantinople": "istanbul",
+    "munchen": "munich",
+    "koln": "cologne",
+    "roma": "rome",
+    "milano": "milan",
+    "napoli": "naples",
+    "firenze": "florence",
+    "wien": "vienna",
+    "praha": "prague",
+    "lisboa": "lisbon",
+    "moskva": "moscow",
+}
+
+# Trailing ", <country>" suffixes recognized as the country of a place
+COUNTRY_SUFFIXES = frozenset([
+    "usa", "us", "u s", "u s a", "united states", "united states of america", "america",
+    "uk", "u k", "united kingdom", "great britain", "britain", "england", "scotland",
+    "france", "germany", "italy", "spain", "portugal", "japan", "china", "india",
+    "canada", "mexico", "brazil", "argentina", "australia", "new zealand", "russia",
+    "south korea", "korea", "netherlands", "belgium", "switzerland", "austria",
+    "sweden", "norway", "denmark", "finland", "ireland", "poland", "greece",
+    "turkey", "egypt", "israel", "uae", "united arab emirates", "singapore",
+    "thailand", "vietnam", "indonesia", "philippines", "malaysia", "pakistan",
+    "bangladesh", "nigeria", "kenya", "south africa", "chile", "peru", "colombia",
+])
+
+# Other spellings of a country -> the name the cities table and the
+# geocoding API use
+COUNTRY_ALIASES: Dict[str, str] = {
+    "usa": "united states",
+    "us": "united states",
+    "u s": "united states",
+    "u s a": "united states",
+    "united states of america": "united states",
+    "america": "united states",
+    "uk": "united kingdom",
+    "u k": "united kingdom",
+    "great britain": "united kingdom",
+    "britain": "united kingdom",
+    "england": "united kingdom",
+    "scotland": "united kingdom",
+    "korea": "south korea",
+    "uae": "united arab emirates",
+}
+
+# ISO 3166 codes used by GeoNames dumps. Only stored rows are matched on
+# these: as a suffix in a query, "Paris, IN" or "Springfield, IL" is a US state.
+COUNTRY_CODES: Dict[str, str] = {
+    "us": "united states", "gb": "united kingdom", "fr": "france", "de": "germany",
+    "it": "italy", "es": "spain", "pt": "portugal", "jp": "japan", "cn": "china",
+    "in": "india", "ca": "canada", "mx": "mexico", "br": "brazil", "ar": "argentina",
+    "au": "australia", "nz": "new zealand", "ru": "russia", "kr": "south korea",
+    "nl": "netherlands", "be": "belgium", "ch": "switzerland", "at": "austria",
+    "se": "sweden", "no": "norway", "dk": "denmark", "fi": "finland", "ie": "ireland",
+    "pl": "poland", "gr": "greece", "tr": "turkey", "eg": "egypt", "il": "israel",
+    "ae": "united arab emirates", "sg": "singapore", "th": "thailand", "vn": "vietnam",
+    "id": "indonesia", "ph": "philippines", "my": "malaysia", "pk": "pakistan",
+    "bd": "bangladesh", "ng": "nigeria", "ke": "kenya", "za": "south africa",
+    "cl": "chile", "pe": "peru", "co": "colombia",
+}
+
+
+def _fold_parts(text: str) -> List[str]:
+    """Split text on commas and fold case, accents, punctuation and whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    
+    parts = [part.strip() for part in text.split(",") if part.strip()]
+    return [" ".join(re.sub(r"[^\w\s'-]", " ", part).split()) for part in parts]
+
+
+def country_key(country: str) -> str:
+    """Normalize a country name or ISO code so that spellings compare equal."""
+    key = " ".join(_fold_parts(country))
+    return COUNTRY_ALIASES.get(key) or COUNTRY_CODES.get(key) or key
+
+
+def split_location(location: str) -> Tuple[str, Optional[str]]:
+    """Normalize a location string into a place key and a country key.
+    
+    Folds case, accents, punctuation and whitespace, splits off a trailing
+    country suffix ("Paris, France" -> ("paris", "france")) and resolves
+    common aliases ("NYC" -> "new york"). The country is None if the
+    location names none.
+    """
+    parts = _fold_parts(location)
+    country = None
+    if len(parts) > 1 and parts[-1] in COUNTRY_SUFFIXES:
+        country = country_key(parts.pop())
+    
+    key = " ".join(parts)
+    return ALIASES.get(key, key), country
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location string into the key of its place name."""
+    return split_location(location)[0]
+
+
+class GeocodeCache:
+    """Persistent cache of geocoding results keyed on place name and country."""
+    
+    def __init__(self, cache: TieredCache, table: Optional[Dict[str, List[Coordinates]]] = None):
+        """Initialize the cache.
+        
+        Args:
+            cache: Store for results returned by the geocoding API
+            table: Preloaded coordinates keyed on normalized city name, one
+                entry per country, most important first
+        """
+        self.cache = cache
+        self.table: Dict[str, List[Coordinates]] = table if table is not None else {}
+        self.hits = 0
+        self.misses = 0
+        self.table_hits = 0
+    
+    @classmethod
+    def create(cls, path: Optional[str] = None, cities_file: Optional[str] = DEFAULT_CITIES_FILE) -> "GeocodeCache":
+        """Build the default geocode cache.
+        
+        Args:
+            path: SQLite file for learned entries (see ``TieredCache.create``);
+                defaults to GEOCODE_CACHE_PATH or the shared cache file
+            cities_file: Table of cities to preload; GEOCODE_CITIES_FILE
+                overrides the bundled table. None skips preloading.
+        """
+        if path is None:
+            path = getenv("GEOCODE_CACHE_PATH")
+        if cities_file == DEFAULT_CITIES_FILE:
+            cities_file = getenv("GEOCODE_CITIES_FILE", DEFAULT_CITIES_FILE) or None
+        
+        geocode_cache = cls(TieredCache.create("geocode", path=path, maxsize=4096, max_entries=100000))
+        if cities_file:
+            geocode_cache.preload(cities_file)
+        return geocode_cache
+    
+    def preload(self, path: str) -> int:
+        """Load a table of cities and return the number of entries added.
+        
+        Accepts either a CSV with ``name,country,latitude,longitude`` columns
+        or a GeoNames ``citiesNNNN.txt`` dump (tab-separated, no header).
+        Cities of the same name are kept once per country; a name looked up
+        without a country resolves to its earliest row, so tables should be
+        sorted by importance.
+        """
+        added = 0
+        with open(path, encoding="utf-8", newline="") as f:
+            if path.endswith(".csv"):
+                rows = (
+                    (row["name"], row.get("country", ""), row["latitude"], row["longitude"])
+                    for row in csv.DictReader(f)
+                )
+            else:
+                # GeoNames: name at 1, lat/lon at 4/5, country code at 8
+                rows = (
+                    (fields[1], fields[8], fields[4], fields[5])
+                    for fields in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+                    if len(fields) > 8
+                )
+            
+            for name, country, lat, lon in rows:
+                key = normalize_location(name)
+                if not key:
+                    continue
+                entries = self.table.setdefault(key, [])
+                if all(country_key(entry[3]) != country_key(country) for entry in entries):
+                    entries.append((float(lat), float(lon), name, country))
+                    added += 1
+        return added
+    
+    @staticmethod
+    def _key(name: str, country: Optional[str]) -> str:
+        """Key of a learned entry."""
+        return f"{name}|{country}" if country else name
+    
+    def get(self, location: str) -> Optional[Coordinates]:
+        """Return cached coordinates for a location, or None."""
+        name, country = split_location(location)
+        for entry in self.table.get(name, ()):
+            if country is None or country_key(entry[3]) == country:
+                self.hits += 1
+                self.table_hits += 1
+                return entry
+        
+        cached = self.cache.get(self._key(name, country))
+        if cached is None and country is not None:
+            # Learned without a country: only usable if it is in this one
+            cached = self.cache.get(name)
+            if cached is not None and country_key(cached[3]) != country:
+                cached = None
+        if cached is not None:
+            self.hits += 1
+            return tuple(cached)
+        
+        self.misses += 1
+        return None
+    
+    def set(self, location: str, coordinates: Coordinates) -> None:
+        """Remember the coordinates the API returned for a location.
+        
+        A result outside the country the location names is not kept, so
+        that it is never served for that country.
+        """
+        name, country = split_location(location)
+        if country is not None and country_key(coordinates[3]) != country:
+            return
+        self.cache.set(self._key(name, country), list(coordinates))
+    
+    def stats(self) -> Dict[str, object]:
+        """Return hit/miss counters, including hits on the preloaded table."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "table_size": sum(len(entries) for entries in self.table.values()),
+            "table_hits": self.table_hits,
+            "cache": self.cache.stats(),
+        }
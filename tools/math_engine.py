@@ -0,0 +1,199 @@
+"""Safe local evaluator for plain mathematical expressions."""
+
+import ast
+import math
+import operator
+import sys
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Union
+
+Number = Union[int, float, complex]
+
+# Largest integer result (in bits) we are willing to compute locally.
+MAX_RESULT_BITS = 100_000
+MAX_FACTORIAL = 5_000
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+CONSTANTS: Dict[str, Number] = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "inf": math.inf,
+    "phi": (1 + math.sqrt(5)) / 2,
+}
+
+
+def _factorial(n: Number) -> int:
+    if n > MAX_FACTORIAL:
+        raise OverflowError(f"factorial argument too large: {n}")
+    return math.factorial(n)
+
+
+def _check_product(n: Number, k: Number) -> None:
+    """Refuse a product of k factors up to n that would be unreasonably large."""
+    if isinstance(n, int) and isinstance(k, int) and k > 0:
+        if k > MAX_FACTORIAL or k * n.bit_length() > MAX_RESULT_BITS:
+            raise OverflowError(f"result too large to compute: {k} factors up to {n}")
+
+
+def _comb(n: Number, k: Number) -> int:
+    if isinstance(n, int) and isinstance(k, int):
+        _check_product(n, min(k, n - k))
+    return math.comb(n, k)
+
+
+def _perm(n: Number, k: Optional[Number] = None) -> int:
+    _check_product(n, n if k is None else k)
+    return math.perm(n, k)
+
+
+def _log(x: Number, base: Number = math.e) -> float:
+    return math.log(x, base)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    name: getattr(math, name)
+    for name in (
+        "sqrt", "exp", "log10", "log2", "log1p",
+        "sin", "cos", "tan", "asin", "acos", "atan", "atan2",
+        "sinh", "cosh", "tanh", "asinh", "acosh", "atanh",
+        "ceil", "floor", "trunc", "gcd", "lcm",
+        "hypot", "degrees", "radians", "isqrt", "fabs",
+    )
+}
+FUNCTIONS.update({
+    "log": _log,
+    "ln": math.log,
+    "factorial": _factorial,
+    "comb": _comb,
+    "perm": _perm,
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "pow": pow,
+})
+
+# Symbols people commonly type that Python spells differently.
+_REPLACEMENTS = {
+    "^": "**",
+    "×": "*",
+    "÷": "/",
+    "−": "-",
+}
+
+
+def _check_power(base: Any, exponent: Any) -> None:
+    """Refuse integer powers whose result would be unreasonably large."""
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if abs(base) > 1 and abs(base).bit_length() * exponent > MAX_RESULT_BITS:
+            raise OverflowError("result too large to compute")
+
+
+def _validate(node: ast.AST) -> None:
+    """Raise ValueError if the tree contains anything but plain arithmetic."""
+    if isinstance(node, ast.Expression):
+        _validate(node.body)
+    elif isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float, complex)):
+            raise ValueError(f"Unsupported literal: {node.value!r}")
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINARY_OPERATORS:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        _validate(node.left)
+        _validate(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _UNARY_OPERATORS:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        _validate(node.operand)
+    elif isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise ValueError(f"Unknown name: {node.id}")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError("Unsupported function call")
+        if node.keywords:
+            raise ValueError("Keyword arguments are not supported")
+        for arg in node.args:
+            _validate(arg)
+    else:
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """Parse an expression, raising ValueError if it is not plain math."""
+    text = expression.strip().rstrip("=?").strip()
+    for symbol, replacement in _REPLACEMENTS.items():
+        text = text.replace(symbol, replacement)
+    if not text:
+        raise ValueError("Empty expression")
+    
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {expression}") from e
+    
+    _validate(tree)
+    return tree
+
+
+def _evaluate(node: ast.AST) -> Any:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp):
+        left = _evaluate(node.left)
+        right = _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        return _BINARY_OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.Call):
+        func = FUNCTIONS[node.func.id]
+        args = [_evaluate(arg) for arg in node.args]
+        if func is pow and len(args) == 2:
+            _check_power(*args)
+        return func(*args)
+    raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def evaluate_expression(expression: str) -> Number:
+    """Evaluate a mathematical expression without calling out to an LLM.
+    
+    Raises:
+        ValueError: If the expression is not plain arithmetic (or is
+            mathematically invalid, e.g. a math domain error).
+        ArithmeticError: If the evaluation itself fails, e.g. on division by zero.
+    """
+    return _evaluate(parse_expression(expression))
+
+
+def format_number(value: Number) -> str:
+    """Format a result, in scientific notation if it has too many digits.
+    
+    Python refuses to convert ints longer than ``sys.get_int_max_str_digits()``
+    to text; those are shown with 16 significant digits instead.
+    """
+    limit = sys.get_int_max_str_digits()
+    # bit_length * log10(2) is a lower bound on the number of digits, minus one
+    if isinstance(value, int) and limit and abs(value).bit_length() * 0.30103 >= limit - 1:
+        return f"{Decimal(value):.15e}"
+    return str(value)
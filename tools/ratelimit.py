@@ -0,0 +1,390 @@
+"""Per-upstream rate limits for outbound API calls.
+
+Bursts of agent sessions used to call Wikipedia, Open-Meteo and OpenAI as
+fast as they arrived, and the 429s that came back became tool errors the
+agent retried with more LLM iterations. An ``AdaptiveRateLimiter`` throttles
+us before the upstream does:
+
+- a token bucket caps the request rate (``rate`` per second, in bursts of
+  up to ``burst`` requests);
+- a concurrency limit caps the requests in flight and adapts AIMD-style:
+  it grows by one after a limit's worth of fast successful responses, and
+  halves when the upstream answers 429/503 or a response takes longer than
+  ``latency_target``;
+- a Retry-After from the upstream pauses all callers until then.
+
+One limiter per upstream is shared process-wide (``get_rate_limiter``) by
+threads and coroutines on any event loop. The time callers wait for a permit
+is recorded, so queueing shows up in the metrics rather than as unexplained
+tool latency.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from os import getenv
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Responses telling us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# Recent waits kept for the wait percentiles in ``stats``
+WAIT_RESERVOIR = 1024
+
+
+def retry_after(headers: Any) -> Optional[float]:
+    """Return the seconds of a Retry-After header, if it gives any."""
+    value = headers.get("Retry-After") if headers is not None else None
+    if value and value.strip().isdigit():
+        return float(value)
+    return None
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket with an AIMD concurrency limit for one upstream."""
+    
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        min_concurrency: int = 1,
+        latency_target: Optional[float] = None,
+    ):
+        """Initialize the limiter.
+        
+        Args:
+            name: Upstream the limiter is for, e.g. a host name
+            rate: Requests per second; 0 for no rate limit (default from
+                RATE_LIMIT_RPS, or 10)
+            burst: Requests that may be sent at once after an idle period
+                (default from RATE_LIMIT_BURST, or twice the rate)
+            max_concurrency: Upper bound of the adaptive concurrency limit,
+                which starts there (default from RATE_LIMIT_CONCURRENCY, or 8)
+            min_concurrency: Lower bound of the concurrency limit
+            latency_target: Responses slower than this many seconds shrink
+                the concurrency limit; 0 to ignore latency (default from
+                RATE_LIMIT_LATENCY_TARGET, or 5)
+        """
+        self.name = name
+        self.rate = rate if rate is not None else float(getenv("RATE_LIMIT_RPS", 10))
+        self.burst = max(1.0, burst if burst is not None else float(getenv("RATE_LIMIT_BURST", 2 * self.rate)))
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(getenv("RATE_LIMIT_CONCURRENCY", 8))
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.latency_target = latency_target if latency_target is not None else float(getenv("RATE_LIMIT_LATENCY_TARGET", 5))
+        
+        self.limit = float(self.max_concurrency)
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.waiting = 0
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = -math.inf
+        
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        self.slow = 0
+        self.decreases = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_RESERVOIR)
+        
+        self._condition = threading.Condition()
+        # Futures of waiting coroutines, with their loops
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    def _try_acquire(self, now: float, slot: bool) -> Optional[float]:
+        """Take a token (and a concurrency slot) if available.
+        
+        Returns:
+            None if acquired, otherwise the seconds to wait before trying
+            again (infinite when waiting for a request to finish)
+        """
+        if now < self._paused_until:
+            return self._paused_until - now
+        if slot and self.in_flight >= max(self.min_concurrency, int(self.limit)):
+            return math.inf
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        if slot:
+            self.in_flight += 1
+        return None
+    
+    def _acquired(self, start: float, waited: bool) -> float:
+        wait = time.monotonic() - start if waited else 0.0
+        self.acquired += 1
+        self._waits.append(wait)
+        if waited:
+            self.waited += 1
+            self.wait_seconds += wait
+        return wait
+    
+    def _notify(self) -> None:
+        """Wake every waiter to try again (called with the lock held)."""
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed
+                pass
+    
+    def acquire(self, slot: bool = True, blocking: bool = True) -> Optional[float]:
+        """Wait for a permit to send a request.
+        
+        Args:
+            slot: Also take a concurrency slot, which must be given back
+                with ``release``; without one only the rate is limited
+            blocking: Wait if no permit is available
+        
+        Returns:
+            The seconds waited, or None if not blocking and no permit was
+            available
+        """
+        start = time.monotonic()
+        with self._condition:
+            delay = self._try_acquire(start, slot)
+            if delay is None:
+                return self._acquired(start, waited=False)
+            if not blocking:
+                return None
+            
+            self.waiting += 1
+            try:
+                while delay is not None:
+                    self._condition.wait(None if delay == math.inf else delay)
+                    delay = self._try_acquire(time.monotonic(), slot)
+            finally:
+                self.waiting -= 1
+            return self._acquired(start, waited=True)
+    
+    async def aacquire(self, slot: bool = True, blocking: bool = True) -> Optional[float]:
+        """Async version of ``acquire``; waits without blocking the event loop."""
+        start = time.monotonic()
+        with self._condition:
+            delay = self._try_acquire(start, slot)
+            if delay is None:
+                return self._acquired(start, waited=False)
+            if not blocking:
+                return None
+            self.waiting += 1
+        
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                future = loop.create_future()
+                with self._condition:
+                    delay = self._try_acquire(time.monotonic(), slot)
+                    if delay is None:
+                        return self._acquired(start, waited=True)
+                    self._async_waiters.append((loop, future))
+                try:
+                    await asyncio.wait_for(future, None if delay == math.inf else delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._condition:
+                        if (loop, future) in self._async_waiters:
+                            self._async_waiters.remove((loop, future))
+        finally:
+            with self._condition:
+                self.waiting -= 1
+    
+    def _decrease(self, now: float, latency: float) -> None:
+        # Requests sent before the last decrease went out at the old limit;
+        # their responses must not halve it again
+        if now - latency < self._last_decrease:
+            return
+        self.limit = max(float(self.min_concurrency), self.limit / 2)
+        self._last_decrease = now
+        self.decreases += 1
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back every request for a while, e.g. for a Retry-After."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def observe(self, latency: float, throttled: bool = False, retry_after: Optional[float] = None, error: bool = False) -> None:
+        """Adapt the concurrency limit to the outcome of a request.
+        
+        Args:
+            latency: Seconds the request took
+            throttled: Whether the upstream answered 429/503 (also if a
+                retry then succeeded)
+            retry_after: Seconds the upstream asked us to wait
+            error: The request failed without a response; this tells
+                nothing about the upstream's load and leaves the limit as is
+        """
+        with self._condition:
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if throttled:
+                self.throttled += 1
+                self._decrease(now, latency)
+            elif error:
+                pass
+            elif self.latency_target and latency > self.latency_target:
+                self.slow += 1
+                self._decrease(now, latency)
+            elif self.limit < self.max_concurrency:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self._notify()
+    
+    def release(self, latency: float, throttled: bool = False, retry_after: Optional[float] = None, error: bool = False) -> None:
+        """Give back the concurrency slot of a finished request; see ``observe``."""
+        self.observe(latency, throttled, retry_after, error)
+        with self._condition:
+            self.in_flight -= 1
+            self._notify()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limit, queue and wait statistics."""
+        with self._condition:
+            waits = sorted(self._waits)
+            return {
+                "rate": self.rate,
+                "concurrency_limit": max(self.min_concurrency, int(self.limit)),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_seconds": self.wait_seconds,
+                "wait_p99": waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+                "throttled": self.throttled,
+                "slow": self.slow,
+                "decreases": self.decreases,
+            }
+
+
+class LangChainRateLimiter(BaseRateLimiter):
+    """Lets a LangChain chat model take its requests from an ``AdaptiveRateLimiter``.
+    
+    Chat models only ask for permission before a call and do not report when
+    it ends, so this limits the rate only; throttling seen by the model's
+    HTTP clients (``RateLimitedTransport`` and ``AsyncRateLimitedTransport``)
+    still pauses it.
+    """
+    
+    def __init__(self, limiter: AdaptiveRateLimiter):
+        """Initialize with the limiter requests are taken from."""
+        self.limiter = limiter
+    
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Take a token, waiting for one if ``blocking``."""
+        return self.limiter.acquire(slot=False, blocking=blocking) is not None
+    
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Async version of ``acquire``."""
+        return await self.limiter.aacquire(slot=False, blocking=blocking) is not None
+
+
+def _observe_response(limiter: AdaptiveRateLimiter, latency: float, response: httpx.Response) -> None:
+    throttled = response.status_code in THROTTLE_STATUSES
+    limiter.observe(latency, throttled=throttled, retry_after=retry_after(response.headers) if throttled else None)
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport reporting throttled responses to a limiter.
+    
+    Every request the wrapped transport sends, including the client
+    library's own retries, feeds the limiter's adaptation, and a 429's
+    Retry-After pauses the other callers of the same upstream.
+    """
+    
+    def __init__(self, transport: httpx.BaseTransport, limiter: AdaptiveRateLimiter):
+        """Initialize the transport.
+        
+        Args:
+            transport: Transport that sends the requests
+            limiter: Limiter of the upstream the requests go to
+        """
+        self.transport = transport
+        self.limiter = limiter
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and report its outcome to the limiter."""
+        start = time.monotonic()
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError:
+            self.limiter.observe(time.monotonic() - start, error=True)
+            raise
+        _observe_response(self.limiter, time.monotonic() - start, response)
+        return response
+    
+    def close(self) -> None:
+        """Close the wrapped transport."""
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async version of ``RateLimitedTransport``."""
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AdaptiveRateLimiter):
+        """Initialize the transport.
+        
+        Args:
+            transport: Transport that sends the requests
+            limiter: Limiter of the upstream the requests go to
+        """
+        self.transport = transport
+        self.limiter = limiter
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request and report its outcome to the limiter."""
+        start = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            self.limiter.observe(time.monotonic() - start, error=True)
+            raise
+        _observe_response(self.limiter, time.monotonic() - start, response)
+        return response
+    
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, **kwargs: Any) -> AdaptiveRateLimiter:
+    """Return the process-wide limiter of an upstream, creating it on first use.
+    
+    Args:
+        name: Upstream, e.g. a host name
+        **kwargs: Settings passed to ``AdaptiveRateLimiter`` when the limiter
+            is created
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = AdaptiveRateLimiter(name, **kwargs)
+    return limiter
+
+
+def rate_limiters() -> Dict[str, AdaptiveRateLimiter]:
+    """Return the limiters created so far, by upstream."""
+    with _limiters_lock:
+        return dict(_limiters)
@@ -0,0 +1,166 @@
+"""Coalescing of identical in-flight upstream requests.
+
+When many sessions ask for the weather in Tokyo at the same moment, every
+tool call misses the cache (nothing is cached until the first answer
+arrives) and goes upstream. ``SingleFlight`` lets the first caller for a key
+run the request while later callers with the same key wait for its result,
+so a burst of identical calls costs one upstream request.
+
+Thread-based callers use ``do`` and asyncio callers ``ado``, and both share
+the same in-flight calls: a coroutine can wait for a request a thread
+started and the other way round, on any event loop. An async request runs
+in its own task, so if the caller that started it is cancelled the others
+still get the result. Errors are shared like results. If the request itself
+is cancelled, for example because its event loop shuts down, the waiters
+retry it themselves.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Cancelled(Exception):
+    """The shared request was cancelled; waiters should run it themselves."""
+
+
+class _Call:
+    """One in-flight request and the callers waiting for it."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Futures of async waiters, with their loops
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    def outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Shares the result of a running request with identical concurrent ones."""
+    
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+    
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """Return the call in flight for a key, starting one if there is none."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+    
+    def _finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result, call.error = result, error
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed
+                pass
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call with the same key is in flight, and return its result.
+        
+        Args:
+            key: Identity of the request, e.g. ("weather", latitude, longitude)
+            fn: Makes the request
+        
+        Returns:
+            The result of ``fn``, from this call or the one in flight
+        """
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, call, error=e)
+                    raise
+                self._finish(key, call, result)
+                return result
+            
+            call.done.wait()
+            try:
+                return call.outcome()
+            except _Cancelled:
+                continue
+    
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of ``do``; ``fn`` returns the coroutine making the request."""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                task = asyncio.ensure_future(fn())
+                
+                def finished(task: asyncio.Future, call: _Call = call) -> None:
+                    if task.cancelled():
+                        self._finish(key, call, error=_Cancelled())
+                    elif task.exception() is not None:
+                        self._finish(key, call, error=task.exception())
+                    else:
+                        self._finish(key, call, task.result())
+                
+                task.add_done_callback(finished)
+                # Shielded, so that cancelling this caller does not cancel the
+                # request the other callers are waiting for
+                return await asyncio.shield(task)
+            
+            if not call.done.is_set():
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                with self._lock:
+                    registered = not call.done.is_set()
+                    if registered:
+                        call.waiters.append((loop, future))
+                if registered:
+                    await future
+            try:
+                return call.outcome()
+            except _Cancelled:
+                continue
+    
+    def in_flight(self) -> int:
+        """Number of requests currently running."""
+        with self._lock:
+            return len(self._calls)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return the number of requests run and of calls that shared one."""
+        with self._lock:
+            return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group shared by all tools."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
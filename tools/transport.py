@@ -0,0 +1,435 @@
+"""Shared HTTP transport for the Research Assistant tools.
+
+All outbound HTTP from the tools goes through one process-wide
+``HTTPTransport``, which keeps a pooled keep-alive ``requests.Session`` per
+host, applies connect/read timeouts, retries idempotent requests with
+jittered exponential backoff and asks for gzip-compressed responses.
+Requests to each host wait for a permit from the host's adaptive rate
+limiter (see ``tools.ratelimit``), which backs off when the host answers 429.
+
+The ``aget``/``aget_json`` methods provide the same behaviour for asyncio
+callers on top of an ``httpx.AsyncClient`` (one per event loop, since
+async clients cannot be shared between loops; see ``LoopResources``).
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from os import getenv
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from .ratelimit import THROTTLE_STATUSES, AdaptiveRateLimiter, get_rate_limiter, retry_after
+
+USER_AGENT = "research-assistant/1.0 (https://github.com/mishrapiyush30/research-assistant)"
+
+# Transient statuses worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _Retry(Retry):
+    """Retry that gives up at once when Retry-After asks for a longer wait than ``retry_after_max``."""
+    
+    # Set by __init__ on urllib3 >= 2
+    retry_after_max: float = 10.0
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        wait = retry_after(response.headers) if response is not None and self.respect_retry_after_header else None
+        if wait is not None and wait > self.retry_after_max:
+            raise MaxRetryError(_pool, url, ResponseError(f"Retry-After of {wait:g}s exceeds {self.retry_after_max:g}s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _make_retry(retries: int, backoff_factor: float, backoff_jitter: float, backoff_max: float) -> Retry:
+    kwargs = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return _Retry(backoff_jitter=backoff_jitter, backoff_max=backoff_max, retry_after_max=backoff_max, **kwargs)
+    except TypeError:
+        # urllib3 < 2 has no jitter support or maximum waits
+        retry = _Retry(**kwargs)
+        retry.retry_after_max = backoff_max
+        return retry
+
+
+class HTTPTransport:
+    """Connection-pooled HTTP client with timeouts, retries and statistics."""
+    
+    def __init__(
+        self,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        backoff_factor: float = 0.3,
+        backoff_jitter: float = 0.2,
+        backoff_max: Optional[float] = None,
+        rate_limits: Optional[bool] = None,
+    ):
+        """Initialize the transport.
+        
+        Args:
+            connect_timeout: Seconds to wait for a connection (default from
+                HTTP_CONNECT_TIMEOUT, or 3.05)
+            read_timeout: Seconds to wait for response data (default from
+                HTTP_READ_TIMEOUT, or 10)
+            retries: Retries for connection errors and transient statuses
+                (default from HTTP_RETRIES, or 2)
+            pool_size: Keep-alive connections kept per host (default from
+                HTTP_POOL_SIZE, or 10)
+            backoff_factor: Base of the exponential backoff between retries
+            backoff_jitter: Maximum random seconds added to each backoff
+            backoff_max: Longest wait between retries in seconds; a
+                Retry-After asking for more fails the request at once
+                (default from HTTP_BACKOFF_MAX, or 10)
+            rate_limits: Throttle requests per host with the shared rate
+                limiters (default from RATE_LIMITS, or true)
+        """
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+        self.read_timeout = read_timeout if read_timeout is not None else float(getenv("HTTP_READ_TIMEOUT", 10))
+        self.retries = retries if retries is not None else int(getenv("HTTP_RETRIES", 2))
+        self.pool_size = pool_size if pool_size is not None else int(getenv("HTTP_POOL_SIZE", 10))
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.backoff_max = backoff_max if backoff_max is not None else float(getenv("HTTP_BACKOFF_MAX", 10))
+        self.rate_limits = rate_limits if rate_limits is not None else getenv("RATE_LIMITS", "true").lower() != "false"
+        
+        self._sessions: Dict[str, requests.Session] = {}
+        self._async_clients = LoopResources(self._new_async_client)
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def timeout(self) -> tuple:
+        """The (connect, read) timeout applied to every request."""
+        return (self.connect_timeout, self.read_timeout)
+    
+    def _session(self, host: str) -> requests.Session:
+        """Return the pooled session for a host, creating it on first use."""
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    max_retries=_make_retry(self.retries, self.backoff_factor, self.backoff_jitter, self.backoff_max),
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "User-Agent": USER_AGENT,
+                    "Accept-Encoding": "gzip, deflate",
+                })
+                self._sessions[host] = session
+            return session
+    
+    def _record(self, host: str, seconds: float, error: bool = False) -> None:
+        """Update the request counters for a host."""
+        with self._lock:
+            stats = self._stats.setdefault(host, {"requests": 0, "errors": 0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+            if error:
+                stats["errors"] += 1
+    
+    def limiter(self, host: str) -> Optional[AdaptiveRateLimiter]:
+        """Return the rate limiter of a host, or None if rate limits are off."""
+        return get_rate_limiter(host) if self.rate_limits else None
+    
+    @staticmethod
+    def _throttled(response: requests.Response) -> bool:
+        """Whether the host answered 429/503, also to a request retried since."""
+        if response.status_code in THROTTLE_STATUSES:
+            return True
+        retries = getattr(response.raw, "retries", None)
+        return any(entry.status in THROTTLE_STATUSES for entry in getattr(retries, "history", ()) or ())
+    
+    def _release(self, limiter: Optional[AdaptiveRateLimiter], seconds: float, throttled: Optional[bool] = None, headers: Any = None) -> None:
+        """Give back a request's rate-limit permit; ``throttled`` is None if it failed.
+        
+        A Retry-After pauses the host's other requests for at most ``backoff_max``.
+        """
+        if limiter is not None:
+            wait = retry_after(headers) if throttled else None
+            limiter.release(
+                seconds,
+                throttled=bool(throttled),
+                retry_after=min(wait, self.backoff_max) if wait is not None else None,
+                error=throttled is None,
+            )
+    
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request over the pooled session for the URL's host."""
+        host = urlsplit(url).netloc
+        session = self._session(host)
+        kwargs.setdefault("timeout", self.timeout)
+        limiter = self.limiter(host)
+        
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+        except requests.RequestException:
+            self._release(limiter, time.perf_counter() - start)
+            self._record(host, time.perf_counter() - start, error=True)
+            raise
+        except BaseException:
+            self._release(limiter, time.perf_counter() - start)
+            raise
+        self._release(limiter, time.perf_counter() - start, self._throttled(response), response.headers)
+        self._record(host, time.perf_counter() - start)
+        return response
+    
+    def get_json(self, url: str, **kwargs: Any) -> Any:
+        """Send a GET request and decode the JSON body, raising on HTTP errors."""
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    
+    def _new_async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=self.pool_size),
+            headers={"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"},
+        )
+    
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Seconds to wait before retry number ``attempt`` (starting at 1).
+        
+        Returns None if the response's Retry-After asks for longer than
+        ``backoff_max``: the request fails rather than waiting that long.
+        """
+        wait = retry_after(response.headers) if response is not None else None
+        if wait is not None:
+            return wait if wait <= self.backoff_max else None
+        return min(self.backoff_max, self.backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, self.backoff_jitter))
+    
+    async def aget(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a GET request from a coroutine, retrying transient failures."""
+        host = urlsplit(url).netloc
+        client = await self._async_clients.get()
+        limiter = self.limiter(host)
+        
+        for attempt in range(self.retries + 1):
+            if limiter is not None:
+                await limiter.aacquire()
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, **kwargs)
+            except httpx.TransportError:
+                self._release(limiter, time.perf_counter() - start)
+                self._record(host, time.perf_counter() - start, error=True)
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt + 1))
+                continue
+            except BaseException:
+                # Cancelled: give the permit back
+                self._release(limiter, time.perf_counter() - start)
+                raise
+            
+            self._release(limiter, time.perf_counter() - start, response.status_code in THROTTLE_STATUSES, response.headers)
+            self._record(host, time.perf_counter() - start)
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                delay = self._backoff(attempt + 1, response)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+            return response
+    
+    async def aget_json(self, url: str, **kwargs: Any) -> Any:
+        """Send a GET request from a coroutine and decode the JSON body."""
+        response = await self.aget(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return request counts, latency and connection-pool usage per host."""
+        with self._lock:
+            result = {}
+            for host, session in self._sessions.items():
+                stats = dict(self._stats.get(host, {"requests": 0, "errors": 0, "seconds": 0.0}))
+                stats["mean_ms"] = (
+                    stats["seconds"] / stats["requests"] * 1000 if stats["requests"] else 0.0
+                )
+                connections = 0
+                pooled_requests = 0
+                idle = 0
+                for adapter in set(session.adapters.values()):
+                    for key in adapter.poolmanager.pools.keys():
+                        pool = adapter.poolmanager.pools.get(key)
+                        if pool is None:
+                            continue
+                        connections += pool.num_connections
+                        pooled_requests += pool.num_requests
+                        idle += pool.pool.qsize() if pool.pool is not None else 0
+                stats["connections_opened"] = connections
+                stats["connections_reused"] = max(pooled_requests - connections, 0)
+                stats["idle_connections"] = idle
+                result[host] = stats
+            
+            # Hosts only reached through the async client
+            for host, counters in self._stats.items():
+                if host not in result:
+                    stats = dict(counters)
+                    stats["mean_ms"] = stats["seconds"] / stats["requests"] * 1000 if stats["requests"] else 0.0
+                    result[host] = stats
+            return result
+    
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+    
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop."""
+        await self._async_clients.aclose()
+
+
+class LoopResources:
+    """One async resource (client, transport) per event loop, closed with the loop.
+    
+    httpx async clients and transports hold connections bound to the loop
+    that opened them, so each loop needs its own. They also reference that
+    loop, so keying them weakly on the loop would never free them. Instead
+    each resource comes with an async generator started on its loop:
+    ``asyncio.run`` (like pytest-asyncio) finalizes a loop's async generators
+    when it shuts down, which closes the resource and forgets it. A loop per
+    request therefore does not leak connections.
+    """
+    
+    def __init__(self, factory: Callable[[], Any]):
+        """Initialize with the function creating a resource with an ``aclose`` method."""
+        self.factory = factory
+        self._resources: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lifetimes: Dict[int, AsyncIterator[None]] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        """Number of loops with an open resource."""
+        return len(self._resources)
+    
+    def current(self) -> Optional[Any]:
+        """Return the running loop's resource, if it has one."""
+        return self._resources.get(asyncio.get_running_loop())
+    
+    async def _lifetime(self, loop: asyncio.AbstractEventLoop, resource: Any) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._lifetimes.pop(id(resource), None)
+                if self._resources.get(loop) is resource:
+                    del self._resources[loop]
+            await resource.aclose()
+    
+    async def get(self) -> Any:
+        """Return the running loop's resource, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        resource = self._resources.get(loop)
+        if resource is None or getattr(resource, "is_closed", False):
+            resource = self.factory()
+            lifetime = self._lifetime(loop, resource)
+            # Started on this loop, so the loop's shutdown_asyncgens() finalizes it
+            await lifetime.__anext__()
+            with self._lock:
+                self._resources[loop] = resource
+                self._lifetimes[id(resource)] = lifetime
+        return resource
+    
+    async def aclose(self) -> None:
+        """Close the running loop's resource now."""
+        with self._lock:
+            resource = self._resources.get(asyncio.get_running_loop())
+            lifetime = self._lifetimes.pop(id(resource), None) if resource is not None else None
+        if lifetime is not None:
+            # Its cleanup closes the resource and forgets it
+            await lifetime.aclose()
+
+
+class PerLoopAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx async transport keeping one connection pool per event loop.
+    
+    Lets a single ``httpx.AsyncClient`` be shared by code running on
+    different loops (e.g. ``asyncio.run`` per request), reusing connections
+    within each loop.
+    """
+    
+    def __init__(self, factory: Callable[[], httpx.AsyncBaseTransport]):
+        """Initialize with the function creating a loop's transport."""
+        self.transports = LoopResources(factory)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request over the running loop's transport."""
+        transport = await self.transports.get()
+        return await transport.handle_async_request(request)
+    
+    async def aclose(self) -> None:
+        """Close the running loop's transport."""
+        await self.transports.aclose()
+
+
+class LoopBoundSemaphore:
+    """Async concurrency limit that works across event loops.
+    
+    ``asyncio.Semaphore`` binds to the loop it is first used on, so a tool
+    shared between loops (e.g. ``asyncio.run`` per request) keeps one
+    semaphore per loop, each allowing ``limit`` concurrent holders.
+    """
+    
+    def __init__(self, limit: int):
+        """Initialize the limit."""
+        self.limit = limit
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return semaphore
+    
+    async def __aenter__(self) -> None:
+        await self._semaphore().acquire()
+    
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._semaphore().release()
+
+
+_transport: Optional[HTTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Return the process-wide HTTP transport shared by all tools."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HTTPTransport()
+    return _transport
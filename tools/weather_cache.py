@@ -0,0 +1,100 @@
+"""Short-lived cache of current weather observations.
+
+Open-Meteo's "current" values are only recomputed every 15 minutes, so
+observations are cached per grid cell (latitude/longitude rounded to a
+configurable resolution) until the upstream interval they belong to
+ends. One process-wide instance is shared by all WeatherTool instances.
+"""
+
+import calendar
+import threading
+import time
+from datetime import datetime
+from os import getenv
+from typing import Any, Dict, Optional, Tuple
+
+from .cache import LRUCache
+
+# Open-Meteo refreshes "current" conditions every 15 minutes
+UPSTREAM_INTERVAL = 15 * 60
+
+# Lifetime of observations whose upstream interval has already ended
+STALE_TTL = 60
+
+
+class WeatherCache:
+    """In-memory cache of weather responses keyed by coordinate grid cell."""
+    
+    def __init__(
+        self,
+        grid: Optional[float] = None,
+        ttl: Optional[float] = None,
+        maxsize: Optional[int] = None,
+    ):
+        """Initialize the cache.
+        
+        Args:
+            grid: Cell size in degrees (default from WEATHER_CACHE_GRID, or
+                0.1, roughly 11 km)
+            ttl: Lifetime of an entry when the response carries no
+                observation time (default from WEATHER_CACHE_TTL, or 900)
+            maxsize: Maximum number of cells kept (default from
+                WEATHER_CACHE_SIZE, or 4096)
+        """
+        self.grid = grid if grid is not None else float(getenv("WEATHER_CACHE_GRID", 0.1))
+        self.ttl = ttl if ttl is not None else float(getenv("WEATHER_CACHE_TTL", UPSTREAM_INTERVAL))
+        maxsize = maxsize if maxsize is not None else int(getenv("WEATHER_CACHE_SIZE", 4096))
+        self.cache = LRUCache(maxsize=maxsize, ttl=self.ttl)
+    
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Return the grid cell containing a coordinate."""
+        return round(lat / self.grid), round(lon / self.grid)
+    
+    def _ttl_for(self, weather_data: Dict[str, Any]) -> float:
+        """Keep an observation until its upstream interval ends."""
+        current = weather_data.get("current") or {}
+        try:
+            observed = datetime.strptime(current["time"], "%Y-%m-%dT%H:%M")
+        except (KeyError, TypeError, ValueError):
+            return self.ttl
+        
+        offset = weather_data.get("utc_offset_seconds", 0) or 0
+        interval = current.get("interval") or UPSTREAM_INTERVAL
+        expires_at = calendar.timegm(observed.timetuple()) - offset + interval
+        remaining = expires_at - time.time()
+        return min(remaining, self.ttl) if remaining > 0 else min(STALE_TTL, self.ttl)
+    
+    def get(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Return the cached response for the cell containing a coordinate."""
+        return self.cache.get(self.cell(lat, lon))
+    
+    def set(self, lat: float, lon: float, weather_data: Dict[str, Any]) -> None:
+        """Cache a response for the cell containing a coordinate."""
+        self.cache.set(self.cell(lat, lon), weather_data, ttl=self._ttl_for(weather_data))
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and approximate memory use."""
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_bytes"] = self.cache.memory_bytes()
+        stats["grid"] = self.grid
+        return stats
+
+
+_weather_cache: Optional[WeatherCache] = None
+_weather_cache_lock = threading.Lock()
+
+
+def get_weather_cache() -> WeatherCache:
+    """Return the process-wide weather cache shared by all WeatherTools."""
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                _weather_cache = WeatherCache()
+    return _weather_cache
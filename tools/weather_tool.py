@@ -1,8 +1,30 @@
 """Weather Tool for the Research Assistant Agent."""
 
-from typing import Dict, Any, Optional
-import requests
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlencode
 from langchain.tools import BaseTool
+from pydantic import Field
+
+from .cache import normalize_key
+from .geocoding import GeocodeCache
+from .singleflight import get_single_flight
+from .transport import LoopBoundSemaphore, get_transport
+from .weather_cache import get_weather_cache
+
+DEFAULT_GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+DEFAULT_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,wind_speed_10m,wind_direction_10m"
+
+# Separators between locations in a multi-location input. Commas are left
+# alone because they separate a city from its country ("Paris, France"), and
+# "and"/"&" because they occur in names ("Bosnia and Herzegovina").
+LOCATION_SEPARATORS = re.compile(r"\s*(?:;|\||\n)\s*")
 
 
 class WeatherTool(BaseTool):
@@ -12,61 +34,369 @@ class WeatherTool(BaseTool):
     description: str = """
     Useful for getting current weather conditions for a specific location.
     Input should be a city name or location (e.g., "New York", "Paris, France").
+    To compare several places at once, separate them with semicolons
+    (e.g., "New York; Tokyo; Paris, France") and get one table back.
     Use this when you need real-time weather information.
     """
     
-    def _get_coordinates(self, location: str) -> tuple:
-        """Get latitude and longitude for a location using Open-Meteo Geocoding API."""
-        url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
-        response = requests.get(url)
-        data = response.json()
+    # Open-Meteo endpoints (defaults from OPEN_METEO_GEOCODING_URL and
+    # OPEN_METEO_FORECAST_URL)
+    geocoding_url: Optional[str] = None
+    forecast_url: Optional[str] = None
+    # Maximum concurrent async lookups per event loop
+    max_concurrency: int = Field(default_factory=lambda: int(getenv("WEATHER_MAX_CONCURRENCY", 8)))
+    semaphore: Any = Field(default=None, exclude=True)
+    # Normalized location -> coordinates, preloaded with major cities
+    geocode_cache: Any = Field(default=None, exclude=True)
+    # Grid cell -> current observation, shared process-wide by default
+    weather_cache: Any = Field(default=None, exclude=True)
+    # Coalesces identical concurrent API requests, shared process-wide by default
+    single_flight: Any = Field(default=None, exclude=True)
+    
+    def __init__(self, **kwargs):
+        """Initialize the weather tool."""
+        super().__init__(**kwargs)
+        if self.geocoding_url is None:
+            self.geocoding_url = getenv("OPEN_METEO_GEOCODING_URL", DEFAULT_GEOCODING_URL)
+        if self.forecast_url is None:
+            self.forecast_url = getenv("OPEN_METEO_FORECAST_URL", DEFAULT_FORECAST_URL)
+        if self.semaphore is None:
+            self.semaphore = LoopBoundSemaphore(self.max_concurrency)
+        if self.geocode_cache is None:
+            self.geocode_cache = GeocodeCache.create()
+        if self.weather_cache is None:
+            self.weather_cache = get_weather_cache()
+        if self.single_flight is None:
+            self.single_flight = get_single_flight()
+    
+    def _coordinates_url(self, location: str) -> str:
+        # Encoded: names may contain "&", "#", "+" or "?" ("Trinidad & Tobago")
+        return f"{self.geocoding_url}?{urlencode({'name': location, 'count': 1, 'language': 'en', 'format': 'json'})}"
+    
+    def _weather_url(self, lat: Any, lon: Any) -> str:
+        return (
+            f"{self.forecast_url}"
+            f"?latitude={lat}&longitude={lon}"
+            f"&current={CURRENT_FIELDS}"
+            f"&temperature_unit=celsius"
+            f"&wind_speed_unit=kmh"
+            f"&precipitation_unit=mm"
+        )
+    
+    def _batch_weather_url(self, coordinates: List[Tuple[float, float]]) -> str:
+        """URL fetching current weather for several coordinates in one request."""
+        return self._weather_url(
+            ",".join(str(lat) for lat, _ in coordinates),
+            ",".join(str(lon) for _, lon in coordinates),
+        )
+    
+    @staticmethod
+    def _split_locations(text: str) -> List[str]:
+        """Split an action input into one or more locations.
+        
+        Accepts a JSON list (``["Tokyo", "Paris, France"]``) or locations
+        separated by semicolons, pipes or newlines.
+        """
+        text = text.strip()
+        if text.startswith("["):
+            try:
+                items = json.loads(text)
+            except ValueError:
+                items = None
+            if isinstance(items, list):
+                return [str(item).strip() for item in items if str(item).strip()]
         
+        locations = [part.strip(" \t\"'") for part in LOCATION_SEPARATORS.split(text)]
+        return [location for location in locations if location]
+    
+    @staticmethod
+    def _parse_coordinates(data: Dict[str, Any], location: str) -> tuple:
         if "results" not in data or not data["results"]:
             raise ValueError(f"Could not find location: {location}")
         
         result = data["results"][0]
         return result["latitude"], result["longitude"], result["name"], result.get("country", "")
     
+    @staticmethod
+    def _format_weather(name: str, country: str, weather_data: Dict[str, Any]) -> str:
+        current = weather_data.get("current", {})
+        location_str = f"{name}, {country}" if country else name
+        
+        result = f"Current weather for {location_str}:\n\n"
+        result += f"Temperature: {current.get('temperature_2m', 'N/A')}°C\n"
+        result += f"Feels like: {current.get('apparent_temperature', 'N/A')}°C\n"
+        result += f"Humidity: {current.get('relative_humidity_2m', 'N/A')}%\n"
+        result += f"Precipitation: {current.get('precipitation', 'N/A')} mm\n"
+        result += f"Wind: {current.get('wind_speed_10m', 'N/A')} km/h\n"
+        result += f"Wind direction: {current.get('wind_direction_10m', 'N/A')}°\n"
+        
+        return result
+    
+    @staticmethod
+    def _format_table(rows: List[Tuple[str, Any]]) -> str:
+        """Format (location, weather data or error) pairs as one compact table."""
+        lines = [
+            "Current weather:",
+            "",
+            "Location | Temp °C | Feels °C | Humidity % | Precip mm | Wind km/h | Wind dir °",
+            "--- | --- | --- | --- | --- | --- | ---",
+        ]
+        for location_str, weather_data in rows:
+            if isinstance(weather_data, Exception):
+                lines.append(f"{location_str} | error: {weather_data}")
+                continue
+            current = weather_data.get("current", {})
+            values = [
+                current.get(field, "N/A")
+                for field in (
+                    "temperature_2m",
+                    "apparent_temperature",
+                    "relative_humidity_2m",
+                    "precipitation",
+                    "wind_speed_10m",
+                    "wind_direction_10m",
+                )
+            ]
+            lines.append(" | ".join([location_str] + [str(value) for value in values]))
+        return "\n".join(lines) + "\n"
+    
+    def _get_coordinates(self, location: str) -> tuple:
+        """Get latitude and longitude for a location using Open-Meteo Geocoding API."""
+        response = get_transport().get(self._coordinates_url(location))
+        return self._parse_coordinates(response.json(), location)
+    
     def _get_weather(self, lat: float, lon: float) -> Dict[str, Any]:
         """Get current weather for given coordinates using Open-Meteo API."""
-        url = (
-            f"https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            f"&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,wind_speed_10m,wind_direction_10m"
-            f"&temperature_unit=celsius"
-            f"&wind_speed_unit=kmh"
-            f"&precipitation_unit=mm"
-        )
-        response = requests.get(url)
+        response = get_transport().get(self._weather_url(lat, lon))
         return response.json()
     
+    def _get_weather_batch(self, coordinates: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """Get current weather for several coordinates with one API request."""
+        if len(coordinates) == 1:
+            return [self._get_weather(*coordinates[0])]
+        response = get_transport().get(self._batch_weather_url(coordinates))
+        return self._parse_batch(response.json(), len(coordinates))
+    
+    @staticmethod
+    def _parse_batch(data: Any, count: int) -> List[Dict[str, Any]]:
+        """Open-Meteo answers a multi-coordinate request with a list of results."""
+        if isinstance(data, dict):
+            if data.get("error"):
+                raise ValueError(data.get("reason", "Weather API error"))
+            data = [data]
+        if len(data) != count:
+            raise ValueError(f"Expected {count} weather results, got {len(data)}")
+        return data
+    
+    async def _aget_coordinates(self, location: str) -> tuple:
+        """Get latitude and longitude for a location without blocking the event loop."""
+        response = await get_transport().aget(self._coordinates_url(location))
+        return self._parse_coordinates(response.json(), location)
+    
+    async def _aget_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Get current weather for given coordinates without blocking the event loop."""
+        response = await get_transport().aget(self._weather_url(lat, lon))
+        return response.json()
+    
+    async def _aget_weather_batch(self, coordinates: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """Async version of ``_get_weather_batch``."""
+        if len(coordinates) == 1:
+            return [await self._aget_weather(*coordinates[0])]
+        response = await get_transport().aget(self._batch_weather_url(coordinates))
+        return self._parse_batch(response.json(), len(coordinates))
+    
+    def _geocode_key(self, location: str) -> tuple:
+        return ("geocode", self.geocoding_url, normalize_key(location))
+    
+    def _weather_key(self, lat: float, lon: float) -> tuple:
+        # Coordinates in the same grid cell share one cached observation, and so one request
+        return ("weather", self.forecast_url, self.weather_cache.cell(lat, lon))
+    
+    def _fetch_coordinates(self, location: str) -> tuple:
+        coordinates = self._get_coordinates(location)
+        self.geocode_cache.set(location, coordinates)
+        return coordinates
+    
+    async def _afetch_coordinates(self, location: str) -> tuple:
+        coordinates = await self._aget_coordinates(location)
+        self.geocode_cache.set(location, coordinates)
+        return coordinates
+    
+    def _fetch_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        weather_data = self._get_weather(lat, lon)
+        if "current" in weather_data:
+            self.weather_cache.set(lat, lon, weather_data)
+        return weather_data
+    
+    async def _afetch_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        weather_data = await self._aget_weather(lat, lon)
+        if "current" in weather_data:
+            self.weather_cache.set(lat, lon, weather_data)
+        return weather_data
+    
+    def _resolve_location(self, location: str) -> tuple:
+        """Get coordinates from the geocode cache, falling back to the API.
+        
+        Concurrent misses for the same location share one request.
+        """
+        coordinates = self.geocode_cache.get(location)
+        if coordinates is None:
+            coordinates = self.single_flight.do(self._geocode_key(location), lambda: self._fetch_coordinates(location))
+        return coordinates
+    
+    async def _aresolve_location(self, location: str) -> tuple:
+        """Async version of ``_resolve_location``."""
+        coordinates = self.geocode_cache.get(location)
+        if coordinates is None:
+            coordinates = await self.single_flight.ado(
+                self._geocode_key(location), lambda: self._afetch_coordinates(location)
+            )
+        return coordinates
+    
+    def _current_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Get current weather from the observation cache, falling back to the API.
+        
+        Concurrent misses for the same grid cell share one request.
+        """
+        weather_data = self.weather_cache.get(lat, lon)
+        if weather_data is None:
+            weather_data = self.single_flight.do(self._weather_key(lat, lon), lambda: self._fetch_weather(lat, lon))
+        return weather_data
+    
+    async def _acurrent_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Async version of ``_current_weather``."""
+        weather_data = self.weather_cache.get(lat, lon)
+        if weather_data is None:
+            weather_data = await self.single_flight.ado(
+                self._weather_key(lat, lon), lambda: self._afetch_weather(lat, lon)
+            )
+        return weather_data
+    
+    def _cached_observations(self, resolved: List[Any]) -> Tuple[Dict[tuple, Any], List[Tuple[float, float]]]:
+        """Split resolved coordinates into cached observations and ones to fetch."""
+        observations: Dict[tuple, Any] = {}
+        missing: List[Tuple[float, float]] = []
+        for coordinates in resolved:
+            if isinstance(coordinates, Exception):
+                continue
+            key = self.weather_cache.cell(coordinates[0], coordinates[1])
+            if key in observations:
+                continue
+            cached = self.weather_cache.get(coordinates[0], coordinates[1])
+            if cached is not None:
+                observations[key] = cached
+            else:
+                observations[key] = None
+                missing.append((coordinates[0], coordinates[1]))
+        return observations, missing
+    
+    def _store_observations(
+        self,
+        observations: Dict[tuple, Any],
+        missing: List[Tuple[float, float]],
+        fetched: Any,
+    ) -> None:
+        """Record fetched observations (or the batch error) for each missing cell."""
+        for i, (lat, lon) in enumerate(missing):
+            weather_data = fetched if isinstance(fetched, Exception) else fetched[i]
+            if not isinstance(weather_data, Exception) and "current" in weather_data:
+                self.weather_cache.set(lat, lon, weather_data)
+            observations[self.weather_cache.cell(lat, lon)] = weather_data
+    
+    def _batch_table(self, locations: List[str], resolved: List[Any], observations: Dict[tuple, Any]) -> str:
+        """Build the table rows in input order, reporting failures per location."""
+        rows = []
+        for location, coordinates in zip(locations, resolved):
+            if isinstance(coordinates, Exception):
+                rows.append((location, coordinates))
+                continue
+            lat, lon, name, country = coordinates
+            location_str = f"{name}, {country}" if country else name
+            rows.append((location_str, observations[self.weather_cache.cell(lat, lon)]))
+        return self._format_table(rows)
+    
+    def _resolve_or_error(self, location: str) -> Any:
+        try:
+            return self._resolve_location(location)
+        except Exception as e:
+            return e
+    
+    async def _aresolve_or_error(self, location: str) -> Any:
+        try:
+            async with self.semaphore:
+                return await self._aresolve_location(location)
+        except Exception as e:
+            return e
+    
+    def _run_batch(self, locations: List[str]) -> str:
+        """Geocode several locations concurrently and fetch their weather in one request."""
+        with ThreadPoolExecutor(max_workers=min(len(locations), self.max_concurrency)) as executor:
+            resolved = list(executor.map(self._resolve_or_error, locations))
+        
+        observations, missing = self._cached_observations(resolved)
+        if missing:
+            try:
+                fetched = self._get_weather_batch(missing)
+            except Exception as e:
+                fetched = e
+            self._store_observations(observations, missing, fetched)
+        
+        return self._batch_table(locations, resolved, observations)
+    
+    async def _arun_batch(self, locations: List[str]) -> str:
+        """Async version of ``_run_batch``."""
+        resolved = await asyncio.gather(*(self._aresolve_or_error(location) for location in locations))
+        
+        observations, missing = self._cached_observations(resolved)
+        if missing:
+            try:
+                async with self.semaphore:
+                    fetched = await self._aget_weather_batch(missing)
+            except Exception as e:
+                fetched = e
+            self._store_observations(observations, missing, fetched)
+        
+        return self._batch_table(locations, resolved, observations)
+    
     def _run(self, location: str) -> str:
         """Run the tool with the provided location."""
+        locations = self._split_locations(location)
+        if len(locations) > 1:
+            try:
+                return self._run_batch(locations)
+            except Exception as e:
+                return f"Error retrieving weather information: {str(e)}"
+        location = locations[0] if locations else location
+        
         try:
             # Get coordinates for the location
-            lat, lon, name, country = self._get_coordinates(location)
+            lat, lon, name, country = self._resolve_location(location)
             
             # Get current weather
-            weather_data = self._get_weather(lat, lon)
-            current = weather_data.get("current", {})
+            weather_data = self._current_weather(lat, lon)
             
             # Format the response
-            location_str = f"{name}, {country}" if country else name
-            
-            result = f"Current weather for {location_str}:\n\n"
-            result += f"Temperature: {current.get('temperature_2m', 'N/A')}°C\n"
-            result += f"Feels like: {current.get('apparent_temperature', 'N/A')}°C\n"
-            result += f"Humidity: {current.get('relative_humidity_2m', 'N/A')}%\n"
-            result += f"Precipitation: {current.get('precipitation', 'N/A')} mm\n"
-            result += f"Wind: {current.get('wind_speed_10m', 'N/A')} km/h\n"
-            result += f"Wind direction: {current.get('wind_direction_10m', 'N/A')}°\n"
-            
-            return result
+            return self._format_weather(name, country, weather_data)
             
         except Exception as e:
             return f"Error retrieving weather information: {str(e)}"
     
     async def _arun(self, location: str) -> str:
         """Run the tool asynchronously."""
-        # For simplicity, we'll just call the synchronous version
-        return self._run(location) 
\ No newline at end of file
+        locations = self._split_locations(location)
+        if len(locations) > 1:
+            try:
+                return await self._arun_batch(locations)
+            except Exception as e:
+                return f"Error retrieving weather information: {str(e)}"
+        location = locations[0] if locations else location
+        
+        try:
+            async with self.semaphore:
+                lat, lon, name, country = await self._aresolve_location(location)
+                weather_data = await self._acurrent_weather(lat, lon)
+            
+            return self._format_weather(name, country, weather_data)
+            
+        except Exception as e:
+            return f"Error retrieving weather information: {str(e)}"
@@ -0,0 +1,299 @@
+"""Offline Wikipedia retrieval index built on FAISS.
+
+The builder ingests a local dump of article abstracts and writes an index
+directory containing:
+
+- ``index.faiss``: the FAISS index over local hashing embeddings
+- ``texts.bin``: the concatenated UTF-8 records (title, URL, abstract)
+- ``offsets.npy``: start offsets of each record in ``texts.bin``
+- ``meta.json``: embedder configuration and index parameters
+
+At query time the index, offsets and texts are all memory-mapped, so
+loading is fast, pages are shared between processes and lookups need no
+network access.
+
+Usage:
+    python -m tools.wikipedia_index build enwiki-latest-abstract.xml.gz wiki-index/
+    python -m tools.wikipedia_index query wiki-index/ "Microsoft"
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import mmap
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from .embeddings import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+
+# Separates the fields of a record in texts.bin
+FIELD_SEPARATOR = "\x1f"
+
+# Below this many articles an exact (flat) index is fast enough
+IVF_THRESHOLD = 20000
+
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in megabytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _open(path: str):
+    """Open a possibly gzip-compressed file for binary reading."""
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _article_url(title: str) -> str:
+    return f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, str]]:
+    with _open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            title = record.get("title", "")
+            abstract = record.get("abstract") or record.get("summary") or record.get("text") or ""
+            yield {"title": title, "summary": abstract, "url": record.get("url") or _article_url(title)}
+
+
+def _read_abstract_xml(path: str) -> Iterator[Dict[str, str]]:
+    """Read the ``enwiki-*-abstract.xml`` dump format."""
+    with _open(path) as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag != "doc":
+                continue
+            title = element.findtext("title", "")
+            if title.startswith("Wikipedia: "):
+                title = title[len("Wikipedia: "):]
+            yield {
+                "title": title,
+                "summary": element.findtext("abstract", "") or "",
+                "url": element.findtext("url", "") or _article_url(title),
+            }
+            element.clear()
+
+
+def read_dump(path: str) -> Iterator[Dict[str, str]]:
+    """Iterate over the articles of a dump, skipping those without an abstract.
+    
+    Supports JSON Lines (``title`` plus ``abstract``/``summary``/``text`` and
+    an optional ``url``) and the Wikimedia abstract XML format, optionally
+    gzip-compressed.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    reader = _read_abstract_xml if name.endswith(".xml") else _read_jsonl
+    for record in reader(path):
+        if record["title"] and record["summary"].strip():
+            yield record
+
+
+def build_index(
+    dump_path: str,
+    output_dir: str,
+    dim: int = 256,
+    batch_size: int = 10000,
+    nprobe: int = 16,
+) -> Dict[str, object]:
+    """Build an offline index from a dump of article abstracts.
+    
+    Args:
+        dump_path: Path to the dump (see ``read_dump`` for supported formats)
+        output_dir: Directory to write the index files to
+        dim: Embedding dimensionality
+        batch_size: Number of articles embedded per batch
+        nprobe: Number of IVF lists searched per query (large indexes only)
+    
+    Returns:
+        The metadata written to ``meta.json``
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    embedder = HashingEmbedder(dim=dim)
+    start = time.time()
+    
+    offsets = [0]
+    count = 0
+    with open(os.path.join(output_dir, TEXTS_FILE), "wb") as texts, \
+            tempfile.TemporaryFile(dir=output_dir) as vectors:
+        batch: List[np.ndarray] = []
+        for record in read_dump(dump_path):
+            data = FIELD_SEPARATOR.join(
+                (record["title"], record["url"], record["summary"].strip())
+            ).encode("utf-8")
+            texts.write(data)
+            offsets.append(offsets[-1] + len(data))
+            batch.append(embedder.embed(record["summary"], title=record["title"]))
+            count += 1
+            
+            if len(batch) >= batch_size:
+                vectors.write(np.vstack(batch).tobytes())
+                batch = []
+                logger.info("Embedded %d articles", count)
+        if batch:
+            vectors.write(np.vstack(batch).tobytes())
+        
+        if count == 0:
+            raise ValueError(f"No articles with abstracts found in {dump_path}")
+        
+        vectors.flush()
+        matrix = np.memmap(vectors, dtype=np.float32, mode="r", shape=(count, dim))
+        
+        if count < IVF_THRESHOLD:
+            index = faiss.IndexFlatIP(dim)
+            index_type = "flat"
+        else:
+            nlist = int(4 * np.sqrt(count))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            sample = np.random.default_rng(0).choice(count, size=min(count, nlist * 50), replace=False)
+            index.train(np.ascontiguousarray(matrix[np.sort(sample)]))
+            index_type = f"ivf{nlist}"
+        
+        for i in range(0, count, batch_size):
+            index.add(np.ascontiguousarray(matrix[i:i + batch_size]))
+        del matrix
+    
+    faiss.write_index(index, os.path.join(output_dir, INDEX_FILE))
+    np.save(os.path.join(output_dir, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    
+    meta = {
+        "articles": count,
+        "index_type": index_type,
+        "nprobe": nprobe,
+        "embedder": embedder.config(),
+        "build_seconds": round(time.time() - start, 2),
+    }
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class WikipediaIndex:
+    """Memory-mapped offline index of Wikipedia abstracts."""
+    
+    def __init__(self, directory: str):
+        """Load an index directory written by ``build_index``."""
+        start = time.perf_counter()
+        self.directory = directory
+        
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        embedder_config = self.meta["embedder"]
+        self.embedder = HashingEmbedder(
+            dim=embedder_config["dim"],
+            bigram_weight=embedder_config["bigram_weight"],
+        )
+        
+        self.index = faiss.read_index(
+            os.path.join(directory, INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+        if hasattr(self.index, "nprobe"):
+            self.index.nprobe = self.meta.get("nprobe", 16)
+        
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        self._texts_file = open(os.path.join(directory, TEXTS_FILE), "rb")
+        self._texts = mmap.mmap(self._texts_file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        self.load_seconds = time.perf_counter() - start
+        logger.info(
+            "Loaded offline Wikipedia index (%d articles) in %.1f ms, RSS %.1f MB",
+            len(self), self.load_seconds * 1000, current_rss_mb(),
+        )
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def get(self, i: int) -> Dict[str, str]:
+        """Return the record at position i."""
+        data = self._texts[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+        title, url, summary = data.split(FIELD_SEPARATOR, 2)
+        return {"title": title, "summary": summary, "url": url}
+    
+    def search(self, query: str, k: int = 1) -> List[Tuple[float, Dict[str, str]]]:
+        """Return the k nearest articles to the query as (score, record) pairs."""
+        vector = self.embedder.embed(query).reshape(1, -1)
+        scores, ids = self.index.search(vector, k)
+        return [
+            (float(score), self.get(i))
+            for score, i in zip(scores[0], ids[0])
+            if i >= 0
+        ]
+    
+    def stats(self) -> Dict[str, object]:
+        """Return index size, load time and current process RSS."""
+        return {
+            "articles": len(self),
+            "index_type": self.meta.get("index_type"),
+            "load_ms": round(self.load_seconds * 1000, 2),
+            "rss_mb": round(current_rss_mb(), 1),
+        }
+    
+    def close(self) -> None:
+        """Release the memory-mapped text store."""
+        self._texts.close()
+        self._texts_file.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Build or query an offline index from the command line."""
+    parser = argparse.ArgumentParser(description="Offline Wikipedia index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    build = subparsers.add_parser("build", help="Build an index from a dump of abstracts")
+    build.add_argument("dump", help="JSONL or abstract XML dump (optionally .gz)")
+    build.add_argument("output_dir", help="Directory to write the index to")
+    build.add_argument("--dim", type=int, default=256, help="Embedding dimensionality")
+    
+    query = subparsers.add_parser("query", help="Query an existing index")
+    query.add_argument("index_dir", help="Directory containing the index")
+    query.add_argument("query", help="Search query")
+    query.add_argument("-k", type=int, default=3, help="Number of results")
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    if args.command == "build":
+        meta = build_index(args.dump, args.output_dir, dim=args.dim)
+        print(json.dumps(meta, indent=2))
+        return 0
+    
+    index = WikipediaIndex(args.index_dir)
+    start = time.perf_counter()
+    results = index.search(args.query, k=args.k)
+    elapsed = (time.perf_counter() - start) * 1000
+    for score, record in results:
+        print(f"{score:.3f}  {record['title']}  {record['url']}")
+    print(f"Search took {elapsed:.2f} ms; {json.dumps(index.stats())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
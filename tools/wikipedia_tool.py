@@ -1,8 +1,32 @@
 """Wikipedia Tool for the Research Assistant Agent."""
 
-from typing import Dict, Any, Optional
-import wikipedia
+import asyncio
+import re
+from os import getenv
+from typing import Dict, Any, List, Optional
+import httpx
+import requests
 from langchain.tools import BaseTool
+from pydantic import Field
+
+from .cache import TieredCache, normalize_key
+from .singleflight import get_single_flight
+from .transport import LoopBoundSemaphore, get_transport
+
+DEFAULT_API_URL = "https://en.wikipedia.org/w/api.php"
+
+# Search hits fetched per request; lets us skip disambiguation pages
+# without another round trip.
+SEARCH_LIMIT = 5
+
+# Links of a disambiguation page whose articles are fetched, in page order
+LINK_LIMIT = 20
+
+# Where the title ends in an option line of a disambiguation intro
+_OPTION_END_RE = re.compile(r",|\s[-–—]\s")
+
+# Failures of the API path that make us fall back to the wikipedia package
+API_ERRORS = (requests.RequestException, httpx.HTTPError, ValueError, KeyError)
 
 
 class WikipediaTool(BaseTool):
@@ -15,32 +39,381 @@ class WikipediaTool(BaseTool):
     Use this when you need factual information or background knowledge.
     """
     
+    # Normalized query -> resolved title
+    search_cache: Any = Field(default=None, exclude=True)
+    # Resolved title -> {"title", "summary", "url"}
+    page_cache: Any = Field(default=None, exclude=True)
+    # Offline FAISS index; when set, lookups never touch the network
+    index: Any = Field(default=None, exclude=True)
+    # Minimum cosine similarity for an offline hit to count as a match
+    min_score: float = 0.2
+    # MediaWiki action API endpoint (default from WIKIPEDIA_API_URL)
+    api_url: Optional[str] = None
+    # Set to False to always use the wikipedia package (several requests)
+    use_api: bool = True
+    # Maximum concurrent async lookups per event loop
+    max_concurrency: int = Field(default_factory=lambda: int(getenv("WIKIPEDIA_MAX_CONCURRENCY", 8)))
+    semaphore: Any = Field(default=None, exclude=True)
+    # Coalesces identical concurrent lookups, shared process-wide by default
+    single_flight: Any = Field(default=None, exclude=True)
+    
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        index_dir: Optional[str] = None,
+        **kwargs
+    ):
+        """Initialize the Wikipedia tool and its lookup caches.
+        
+        Args:
+            cache_path: SQLite file for the persistent cache (default from
+                WIKIPEDIA_CACHE_PATH, or the shared cache directory). Pass an
+                empty string to keep the cache in memory only.
+            cache_ttl: Lifetime of cached entries in seconds (default from
+                WIKIPEDIA_CACHE_TTL, or one day)
+            index_dir: Directory of an offline index built with
+                ``python -m tools.wikipedia_index build`` (default from
+                WIKIPEDIA_INDEX_DIR). When given, the tool works offline.
+        """
+        super().__init__(**kwargs)
+        if self.api_url is None:
+            self.api_url = getenv("WIKIPEDIA_API_URL", DEFAULT_API_URL)
+        if self.semaphore is None:
+            self.semaphore = LoopBoundSemaphore(self.max_concurrency)
+        if self.single_flight is None:
+            self.single_flight = get_single_flight()
+        if index_dir is None:
+            index_dir = getenv("WIKIPEDIA_INDEX_DIR")
+        if index_dir and self.index is None:
+            from .wikipedia_index import WikipediaIndex
+            self.index = WikipediaIndex(index_dir)
+        
+        if cache_path is None:
+            cache_path = getenv("WIKIPEDIA_CACHE_PATH")
+        if cache_ttl is None:
+            cache_ttl = float(getenv("WIKIPEDIA_CACHE_TTL", 24 * 60 * 60))
+        maxsize = int(getenv("WIKIPEDIA_CACHE_SIZE", 1024))
+        max_entries = int(getenv("WIKIPEDIA_CACHE_MAX_ENTRIES", 50000))
+        
+        if self.search_cache is None:
+            self.search_cache = TieredCache.create(
+                "wikipedia_search", path=cache_path, ttl=cache_ttl,
+                maxsize=maxsize, max_entries=max_entries,
+            )
+        if self.page_cache is None:
+            self.page_cache = TieredCache.create(
+                "wikipedia_page", path=cache_path, ttl=cache_ttl,
+                maxsize=maxsize, max_entries=max_entries,
+            )
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the search and page caches."""
+        return {
+            "search": self.search_cache.stats(),
+            "page": self.page_cache.stats(),
+        }
+    
+    def _lookup_offline(self, query: str) -> Optional[Dict[str, str]]:
+        """Resolve a query by nearest-neighbour search in the offline index."""
+        results = self.index.search(query, k=1)
+        if not results or results[0][0] < self.min_score:
+            return None
+        return results[0][1]
+    
+    @staticmethod
+    def _api_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the properties every lookup request asks for."""
+        return {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "prop": "extracts|info|pageprops",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+            "inprop": "url",
+            "ppprop": "disambiguation",
+            "redirects": 1,
+            **params,
+        }
+    
+    @staticmethod
+    def _search_params(query: str) -> Dict[str, Any]:
+        return {
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": SEARCH_LIMIT,
+            "gsrnamespace": 0,
+        }
+    
+    @staticmethod
+    def _links_params(title: str) -> Dict[str, Any]:
+        # action=parse lists links in page order; generator=links sorts them
+        return {
+            "action": "parse",
+            "format": "json",
+            "formatversion": 2,
+            "page": title,
+            "prop": "links",
+            "redirects": 1,
+        }
+    
+    @staticmethod
+    def _link_titles(data: Dict[str, Any]) -> List[str]:
+        """Return the existing articles a parsed page links to, in page order."""
+        if "error" in data:
+            raise ValueError(data["error"].get("info", "Wikipedia API error"))
+        
+        links = data.get("parse", {}).get("links", [])
+        titles = [link["title"] for link in links if link.get("ns") == 0 and link.get("exists", True)]
+        return list(dict.fromkeys(titles))[:LINK_LIMIT]
+    
+    @classmethod
+    def _pages_in_order(cls, data: Dict[str, Any], titles: List[str]) -> List[Dict[str, Any]]:
+        """Return the pages of a ``titles`` query in the order the titles were given."""
+        pages = {page["title"]: page for page in cls._pages(data)}
+        query = data.get("query", {})
+        renamed = {item["from"]: item["to"] for key in ("normalized", "redirects") for item in query.get(key, [])}
+        
+        ordered = []
+        for title in titles:
+            seen = set()
+            while title in renamed and title not in seen:
+                seen.add(title)
+                title = renamed[title]
+            if title in pages:
+                ordered.append(pages.pop(title))
+        return ordered
+    
+    @staticmethod
+    def _pages(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return the pages of a MediaWiki response in search order."""
+        if "error" in data:
+            raise ValueError(data["error"].get("info", "Wikipedia API error"))
+        
+        pages = data.get("query", {}).get("pages", [])
+        return sorted(pages, key=lambda page: page.get("index", 0))
+    
+    def _query_api(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run a MediaWiki query and return its pages in search order."""
+        return self._pages(get_transport().get_json(self.api_url, params=self._api_params(params)))
+    
+    async def _aquery_api(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run a MediaWiki query without blocking the event loop."""
+        return self._pages(await get_transport().aget_json(self.api_url, params=self._api_params(params)))
+    
+    @staticmethod
+    def _first_article(pages: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """Return the first page that is a real article with an intro."""
+        for page in pages:
+            if page.get("missing") or "disambiguation" in page.get("pageprops", {}):
+                continue
+            if page.get("extract"):
+                return {"title": page["title"], "summary": page["extract"], "url": page["fullurl"]}
+        return None
+    
+    @staticmethod
+    def _listed_options(intro: str) -> List[str]:
+        """Return the titles a disambiguation intro lists, in page order.
+        
+        Intros like "Mercury most commonly refers to:" are followed by one
+        option per line, starting with its title ("Mercury (planet), the
+        closest planet to the Sun").
+        """
+        titles = []
+        for line in intro.splitlines()[1:]:
+            line = line.strip()
+            if not line or line.endswith(":"):
+                continue
+            title = _OPTION_END_RE.split(line, 1)[0].strip()
+            if title and len(title) <= 100 and not set(title) & set("|[]{}#<>"):
+                titles.append(title)
+        return list(dict.fromkeys(titles))[:LINK_LIMIT]
+    
+    def _titles_pages(self, titles: List[str]) -> List[Dict[str, Any]]:
+        data = get_transport().get_json(self.api_url, params=self._api_params({"titles": "|".join(titles)}))
+        return self._pages_in_order(data, titles)
+    
+    async def _atitles_pages(self, titles: List[str]) -> List[Dict[str, Any]]:
+        data = await get_transport().aget_json(self.api_url, params=self._api_params({"titles": "|".join(titles)}))
+        return self._pages_in_order(data, titles)
+    
+    def _disambiguation_article(self, page: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Resolve a disambiguation page to its first article, in page order.
+        
+        The options its intro lists (already fetched by the search) cost one
+        ``titles`` query. When the intro lists none ("Python may refer to:"),
+        the links come from ``action=parse`` first, so this takes two
+        requests: one over the single extra request the lookup aims for, since
+        no MediaWiki query returns links in page order together with
+        extracts (``generator=links`` and ``prop=links`` sort by title).
+        """
+        options = self._listed_options(page.get("extract", ""))
+        if options:
+            article = self._first_article(self._titles_pages(options))
+            if article is not None:
+                return article
+        
+        titles = self._link_titles(get_transport().get_json(self.api_url, params=self._links_params(page["title"])))
+        return self._first_article(self._titles_pages(titles)) if titles else None
+    
+    async def _adisambiguation_article(self, page: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Async version of ``_disambiguation_article``."""
+        options = self._listed_options(page.get("extract", ""))
+        if options:
+            article = self._first_article(await self._atitles_pages(options))
+            if article is not None:
+                return article
+        
+        data = await get_transport().aget_json(self.api_url, params=self._links_params(page["title"]))
+        titles = self._link_titles(data)
+        return self._first_article(await self._atitles_pages(titles)) if titles else None
+    
+    def _api_lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """Resolve a query with the MediaWiki API in one request.
+        
+        A single ``generator=search`` query returns the top hits together
+        with their intro extracts, URLs and disambiguation flags. If every hit
+        is a disambiguation page, the first article the top hit lists is
+        taken, in the page's own order of options (see
+        ``_disambiguation_article``).
+        """
+        pages = self._query_api(self._search_params(query))
+        if not pages:
+            return None
+        
+        article = self._first_article(pages)
+        if article is not None:
+            return article
+        
+        # Every hit was a disambiguation page: take the first listed article
+        return self._disambiguation_article(pages[0])
+    
+    async def _aapi_lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """Async version of ``_api_lookup``."""
+        pages = await self._aquery_api(self._search_params(query))
+        if not pages:
+            return None
+        
+        article = self._first_article(pages)
+        if article is not None:
+            return article
+        
+        return await self._adisambiguation_article(pages[0])
+    
+    def _legacy_lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """Resolve a query with the wikipedia package (search, page, summary)."""
+        # Imported here: the package (and BeautifulSoup) is only needed for
+        # this fallback
+        import wikipedia
+        
+        # First try to find the exact page
+        page_results = wikipedia.search(query)
+        if not page_results:
+            return None
+        
+        # Try to get the most relevant page
+        try:
+            page = wikipedia.page(page_results[0], auto_suggest=False)
+        except wikipedia.DisambiguationError as e:
+            # If disambiguation page, take the first option
+            page = wikipedia.page(e.options[0], auto_suggest=False)
+        
+        return {"title": page.title, "summary": page.summary, "url": page.url}
+    
+    def _cached(self, query: str) -> Optional[Dict[str, str]]:
+        """Return the cached page for a query, if any."""
+        title = self.search_cache.get(normalize_key(query))
+        if title is None:
+            return None
+        return self.page_cache.get(title)
+    
+    def _remember(self, query: str, page: Dict[str, str]) -> None:
+        """Cache the page a query resolved to."""
+        self.search_cache.set(normalize_key(query), page["title"])
+        self.page_cache.set(page["title"], page)
+    
+    def _flight_key(self, query: str) -> tuple:
+        """Key under which concurrent lookups of the same query are coalesced."""
+        return ("wikipedia", self.api_url, self.use_api, normalize_key(query))
+    
+    def _fetch(self, query: str) -> Optional[Dict[str, str]]:
+        """Look a query up on Wikipedia and cache the page it resolves to."""
+        if self.use_api:
+            try:
+                result = self._api_lookup(query)
+            except API_ERRORS:
+                # Fall back to the wikipedia package
+                result = self._legacy_lookup(query)
+        else:
+            result = self._legacy_lookup(query)
+        if result is not None:
+            self._remember(query, result)
+        return result
+    
+    async def _afetch(self, query: str) -> Optional[Dict[str, str]]:
+        """Async version of ``_fetch``; only the legacy fallback uses a thread."""
+        if self.use_api:
+            try:
+                result = await self._aapi_lookup(query)
+            except API_ERRORS:
+                result = await asyncio.to_thread(self._legacy_lookup, query)
+        else:
+            result = await asyncio.to_thread(self._legacy_lookup, query)
+        if result is not None:
+            self._remember(query, result)
+        return result
+    
+    def _lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """Resolve a query to a page, going to Wikipedia only on cache misses.
+        
+        Concurrent misses for the same query share one lookup.
+        """
+        if self.index is not None:
+            return self._lookup_offline(query)
+        
+        result = self._cached(query)
+        if result is not None:
+            return result
+        return self.single_flight.do(self._flight_key(query), lambda: self._fetch(query))
+    
+    async def _alookup(self, query: str) -> Optional[Dict[str, str]]:
+        """Async version of ``_lookup``."""
+        if self.index is not None:
+            return self._lookup_offline(query)
+        
+        result = self._cached(query)
+        if result is not None:
+            return result
+        return await self.single_flight.ado(self._flight_key(query), lambda: self._afetch(query))
+    
+    @staticmethod
+    def _format_page(page: Dict[str, str]) -> str:
+        return f"Title: {page['title']}\n\nSummary: {page['summary']}\n\nURL: {page['url']}"
+    
     def _run(self, query: str) -> str:
         """Run the tool with the provided query."""
         try:
-            # First try to find the exact page
-            page_results = wikipedia.search(query)
-            if not page_results:
+            page = self._lookup(query)
+            if page is None:
                 return f"No Wikipedia results found for: {query}"
             
-            # Try to get the most relevant page
-            try:
-                page = wikipedia.page(page_results[0], auto_suggest=False)
-            except wikipedia.DisambiguationError as e:
-                # If disambiguation page, take the first option
-                page = wikipedia.page(e.options[0], auto_suggest=False)
-            
-            # Get summary and basic info
-            summary = page.summary
-            
             # Return formatted result
-            result = f"Title: {page.title}\n\nSummary: {summary}\n\nURL: {page.url}"
-            return result
+            return self._format_page(page)
             
         except Exception as e:
             return f"Error retrieving information from Wikipedia: {str(e)}"
     
     async def _arun(self, query: str) -> str:
         """Run the tool asynchronously."""
-        # For simplicity, we'll just call the synchronous version
-        return self._run(query) 
\ No newline at end of file
+        try:
+            async with self.semaphore:
+                page = await self._alookup(query)
+            if page is None:
+                return f"No Wikipedia results found for: {query}"
+            
+            return self._format_page(page)
+            
+        except Exception as e:
+            return f"Error retrieving information from Wikipedia: {str(e)}"
\ No newline at end of file